@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Alert , AlertTrigger    
+from .models import Alert , AlertTrigger, NotificationOutbox, WebhookEndpoint
 # Register your models here.
 
 class AlertAdmin(admin.ModelAdmin):
@@ -11,5 +11,16 @@ class AlertTriggerAdmin(admin.ModelAdmin):
     list_display = ('alert', 'triggered_at', 'price')
     list_filter = ('triggered_at',)
 
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'alert', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'channel')
+    search_fields = ('recipient',)
+
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ('user', 'url', 'alert', 'is_active', 'created_at')
+    list_filter = ('is_active',)
+
 admin.site.register(Alert, AlertAdmin)
 admin.site.register(AlertTrigger, AlertTriggerAdmin)
+admin.site.register(NotificationOutbox, NotificationOutboxAdmin)
+admin.site.register(WebhookEndpoint, WebhookEndpointAdmin)
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.alerts.outbox import dispatch_once
+from apps.alerts.webhooks import close_pool
+
+
+class Command(BaseCommand):
+    help = "Drain the notification outbox, sending queued alert notifications in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help="Rows claimed per batch.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain what is due now and exit.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        try:
+            while True:
+                sent, failed = dispatch_once(batch_size)
+                if sent or failed:
+                    self.stdout.write(f"sent={sent} failed={failed}")
+                    continue
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Dispatcher stopped.")
+        finally:
+            close_pool()
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0004_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='urgent',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:40
+
+import apps.alerts.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('alerts', '0005_alert_urgent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificationoutbox',
+            name='channel',
+            field=models.CharField(choices=[('email', 'Email'), ('webhook', 'Webhook')], default='email', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='notificationoutbox',
+            name='recipient',
+            field=models.CharField(max_length=500),
+        ),
+        migrations.AlterField(
+            model_name='notificationoutbox',
+            name='subject',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.CreateModel(
+            name='WebhookEndpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500)),
+                ('secret', models.CharField(default=apps.alerts.models.generate_webhook_secret, max_length=64)),
+                ('max_concurrency', models.PositiveSmallIntegerField(default=4)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('alert', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='webhooks', to='alerts.alert')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='webhooks', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='endpoint',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='alerts.webhookendpoint'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0006_webhookendpoint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alerttrigger',
+            index=models.Index(fields=['alert', '-triggered_at', '-id'], name='alerts_aler_alert_i_fa4b16_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alerttrigger',
+            index=models.Index(fields=['-triggered_at', '-id'], name='alerts_aler_trigger_a50980_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0007_alerttrigger_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alerttrigger',
+            name='evaluated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alerttrigger',
+            name='notified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alerttrigger',
+            name='quote_received_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alerttrigger',
+            name='snapshot_written_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,8 @@
+import secrets
+
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from apps.stocks.models import Stock
 
 # Create your models here.
@@ -28,6 +31,8 @@ class Alert(models.Model):
     last_price = models.DecimalField(max_digits=20, decimal_places=4, null=True, blank=True)
 
     is_active = models.BooleanField(default=True)
+    # urgent alerts skip the per-user notification coalescing window
+    urgent = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     last_triggered_at = models.DateTimeField(null=True, blank=True)
 
@@ -45,9 +50,91 @@ class AlertTrigger(models.Model):
     triggered_at = models.DateTimeField(auto_now_add=True)
     price = models.DecimalField(max_digits=20, decimal_places=4)
     message = models.TextField(blank=True)
+    # pipeline timestamps for latency tracing (see apps.common.tracing);
+    # the quote and snapshot times are unknown for untraced evaluations
+    quote_received_at = models.DateTimeField(null=True, blank=True)
+    snapshot_written_at = models.DateTimeField(null=True, blank=True)
+    evaluated_at = models.DateTimeField(null=True, blank=True)
+    notified_at = models.DateTimeField(null=True, blank=True)  # first successful delivery
 
     class Meta:
         ordering = ['-triggered_at']
+        indexes = [
+            # cursor-paginated trigger feed
+            models.Index(fields=['alert', '-triggered_at', '-id']),
+            models.Index(fields=['-triggered_at', '-id']),
+        ]
+
+    def __str__(self):
+        return f"Trigger for {self.alert} at {self.triggered_at}"
+
+
+def generate_webhook_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    """
+    An HTTP endpoint that receives signed JSON trigger payloads. Endpoints
+    without an alert receive triggers for every alert of their user.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='webhooks')
+    alert = models.ForeignKey(Alert, on_delete=models.CASCADE, null=True, blank=True, related_name='webhooks')
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64, default=generate_webhook_secret)
+    max_concurrency = models.PositiveSmallIntegerField(default=4)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Webhook {self.url} for {self.user}"
+
+
+class NotificationOutbox(models.Model):
+    """
+    Notifications waiting to be delivered. Rows are written in the same
+    transaction as the AlertTrigger they announce and drained by the
+    dispatcher (``manage.py dispatch_notifications``).
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    CHANNEL_EMAIL = 'email'
+    CHANNEL_WEBHOOK = 'webhook'
+    CHANNEL_CHOICES = [
+        (CHANNEL_EMAIL, 'Email'),
+        (CHANNEL_WEBHOOK, 'Webhook'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
+    alert = models.ForeignKey(Alert, on_delete=models.CASCADE, related_name='notifications')
+    trigger = models.ForeignKey(AlertTrigger, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications')
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES, default=CHANNEL_EMAIL)
+    endpoint = models.ForeignKey(WebhookEndpoint, on_delete=models.CASCADE, null=True, blank=True, related_name='deliveries')
+    recipient = models.CharField(max_length=500)
+    subject = models.CharField(max_length=255, blank=True)
+    body = models.TextField()  # email text, or the JSON event for webhooks
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # when the row is next eligible for a dispatcher: retry time while pending,
+    # lease expiry while sending
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
 
     def __str__(self):
-        return f"Trigger for {self.alert} at {self.triggered_at}"
\ No newline at end of file
+        return f"{self.channel} to {self.recipient} ({self.status})"
\ No newline at end of file
@@ -0,0 +1,239 @@
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.alerts.models import AlertTrigger, NotificationOutbox
+from apps.alerts.webhooks import build_requests, deliver_webhooks
+from apps.common.metrics import NOTIFICATION_FAILURES, NOTIFICATION_SEND, PIPELINE_LATENCY
+from apps.common.notifications import combine_notifications
+from apps.common.tracing import TRACE_FIELDS, stage_seconds
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with jitter, capped at NOTIFICATION_RETRY_MAX_SECONDS."""
+    delay = min(
+        settings.NOTIFICATION_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+        settings.NOTIFICATION_RETRY_MAX_SECONDS,
+    )
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(batch_size=None):
+    """
+    Claim up to ``batch_size`` due rows for this dispatcher.
+
+    Rows are locked with ``SELECT ... FOR UPDATE SKIP LOCKED`` so concurrent
+    dispatchers never claim the same row, then leased by moving them to
+    ``sending``. A row whose lease expires (dispatcher died mid-send) becomes
+    due again, which is what makes delivery at-least-once; reclaiming it
+    counts as an attempt, so a row that keeps crashing or hanging the
+    dispatcher still fails after NOTIFICATION_MAX_ATTEMPTS.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('user', 'alert__stock', 'trigger', 'endpoint')
+            .filter(
+                status__in=[NotificationOutbox.STATUS_PENDING, NotificationOutbox.STATUS_SENDING],
+                next_attempt_at__lte=now,
+            )
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        expired = [entry for entry in batch if entry.status == NotificationOutbox.STATUS_SENDING]
+        if expired:
+            NotificationOutbox.objects.filter(id__in=[entry.id for entry in expired]).update(
+                attempts=F('attempts') + 1,
+            )
+            for entry in expired:
+                entry.attempts += 1
+            exhausted = [entry for entry in expired if entry.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS]
+            if exhausted:
+                _give_up_unfinished(exhausted)
+                batch = [entry for entry in batch if entry not in exhausted]
+        if batch:
+            NotificationOutbox.objects.filter(id__in=[entry.id for entry in batch]).update(
+                status=NotificationOutbox.STATUS_SENDING,
+                next_attempt_at=now + timedelta(seconds=settings.NOTIFICATION_LEASE_SECONDS),
+            )
+    return batch
+
+
+def _give_up_unfinished(entries):
+    error = 'Delivery never finished within the lease (dispatcher crashed or hung)'
+    NotificationOutbox.objects.filter(id__in=[entry.id for entry in entries]).update(
+        status=NotificationOutbox.STATUS_FAILED,
+        last_error=error,
+    )
+    for entry in entries:
+        NOTIFICATION_FAILURES.labels(entry.channel).inc()
+        logger.error(f"Giving up on notification {entry.id} to {entry.recipient} after {entry.attempts} attempts: {error}")
+
+
+def _mark_failed(entries, error):
+    """
+    Record a failed send of ``entries``, which went out together (one
+    combined email or webhook batch). They share one retry time, so they
+    come due, are claimed and are sent together again.
+    """
+    now = timezone.now()
+    next_attempt_at = now + retry_delay(max(entry.attempts for entry in entries) + 1)
+    for entry in entries:
+        NOTIFICATION_FAILURES.labels(entry.channel).inc()
+        attempts = entry.attempts + 1
+        if attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+            status, due = NotificationOutbox.STATUS_FAILED, now
+            logger.error(f"Giving up on notification {entry.id} to {entry.recipient} after {attempts} attempts: {error}")
+        else:
+            status, due = NotificationOutbox.STATUS_PENDING, next_attempt_at
+            logger.warning(f"Notification {entry.id} to {entry.recipient} failed (attempt {attempts}), retrying: {error}")
+        NotificationOutbox.objects.filter(id=entry.id).update(
+            status=status,
+            attempts=attempts,
+            next_attempt_at=due,
+            last_error=str(error),
+        )
+
+
+def _group_by_recipient(batch):
+    groups = {}
+    for entry in batch:
+        groups.setdefault(entry.recipient, []).append(entry)
+    return list(groups.values())
+
+
+def _send_emails(entries):
+    """
+    Send email entries over a single SMTP connection. Rows for the same
+    recipient (coalesced into the same window by ``notify_user``) go out as
+    one combined message. Returns (sent ids, failed count).
+    """
+    sent_ids = []
+    failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for group in _group_by_recipient(entries):
+            _mark_failed(group, e)
+        return [], len(entries)
+
+    try:
+        for group in _group_by_recipient(entries):
+            if len(group) == 1:
+                subject, body = group[0].subject, group[0].body
+            else:
+                subject, body = combine_notifications(group)
+            started = time.perf_counter()
+            try:
+                message = EmailMessage(
+                    subject=subject,
+                    body=body,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[group[0].recipient],
+                    connection=connection,
+                )
+                if not message.send():
+                    raise RuntimeError("EmailBackend reported no message sent")
+                sent_ids.extend(entry.id for entry in group)
+            except Exception as e:
+                _mark_failed(group, e)
+                failed += len(group)
+            NOTIFICATION_SEND.labels(NotificationOutbox.CHANNEL_EMAIL).observe(time.perf_counter() - started)
+    finally:
+        connection.close()
+    return sent_ids, failed
+
+
+def _send_webhooks(entries, transport=None):
+    """
+    POST webhook entries, batched per endpoint, through the async pooled
+    client. Returns (sent ids, failed count).
+    """
+    active = [entry for entry in entries if entry.endpoint.is_active]
+    disabled = [entry.id for entry in entries if not entry.endpoint.is_active]
+    if disabled:
+        NotificationOutbox.objects.filter(id__in=disabled).update(
+            status=NotificationOutbox.STATUS_FAILED,
+            last_error='Webhook endpoint disabled',
+        )
+        NOTIFICATION_FAILURES.labels(NotificationOutbox.CHANNEL_WEBHOOK).inc(len(disabled))
+
+    by_id = {entry.id: entry for entry in active}
+    sent_ids = []
+    failed = len(disabled)
+    for request in deliver_webhooks(build_requests(active), transport=transport):
+        if request.error:
+            _mark_failed([by_id[entry_id] for entry_id in request.entry_ids], request.error)
+            failed += len(request.entry_ids)
+        else:
+            sent_ids.extend(request.entry_ids)
+    return sent_ids, failed
+
+
+def _mark_notified(entries, notified_at):
+    """Stamp ``notified_at`` on triggers delivered for the first time and record their stage latencies."""
+    triggers = {entry.trigger_id: entry.trigger for entry in entries if entry.trigger_id}
+    first = [trigger for trigger in triggers.values() if trigger.notified_at is None]
+    if not first:
+        return
+    # a trigger fans out to several rows; only the first delivery counts
+    AlertTrigger.objects.filter(id__in=[trigger.id for trigger in first], notified_at__isnull=True).update(
+        notified_at=notified_at,
+    )
+    for trigger in first:
+        trigger.notified_at = notified_at
+        timestamps = {name: getattr(trigger, name) for name in TRACE_FIELDS}
+        for stage, seconds in stage_seconds(timestamps).items():
+            PIPELINE_LATENCY.labels(stage).observe(seconds)
+
+
+def send_batch(batch, transport=None):
+    """
+    Deliver a claimed batch and record the outcome of every row.
+    Returns (sent, failed) row counts.
+    """
+    emails = [entry for entry in batch if entry.channel == NotificationOutbox.CHANNEL_EMAIL]
+    webhooks = [entry for entry in batch if entry.channel == NotificationOutbox.CHANNEL_WEBHOOK]
+    sent_ids = []
+    failed = 0
+    if emails:
+        email_sent, email_failed = _send_emails(emails)
+        sent_ids += email_sent
+        failed += email_failed
+    if webhooks:
+        webhook_sent, webhook_failed = _send_webhooks(webhooks, transport=transport)
+        sent_ids += webhook_sent
+        failed += webhook_failed
+
+    if sent_ids:
+        sent_at = timezone.now()
+        NotificationOutbox.objects.filter(id__in=sent_ids).update(
+            status=NotificationOutbox.STATUS_SENT,
+            attempts=F('attempts') + 1,
+            sent_at=sent_at,
+            last_error='',
+        )
+        sent = set(sent_ids)
+        _mark_notified([entry for entry in batch if entry.id in sent], sent_at)
+    return len(sent_ids), failed
+
+
+def dispatch_once(batch_size=None, transport=None):
+    """Claim and send one batch. Returns (sent, failed) counts."""
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+    sent, failed = send_batch(batch, transport=transport)
+    logger.info(f"Dispatched notification batch: {sent} sent, {failed} failed")
+    return sent, failed
@@ -1,10 +1,12 @@
 from rest_framework import serializers
 from apps.stocks.models import Stock
 from apps.stocks.serializers import StockSerializer
-from .models import Alert ,AlertTrigger
+from apps.common.fieldsets import SparseFieldsetSerializerMixin
+from .models import Alert ,AlertTrigger, WebhookEndpoint
+from .webhooks import UnsafeDestination, check_url
 
 
-class AlertSerializer(serializers.ModelSerializer):
+class AlertSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     stock = serializers.PrimaryKeyRelatedField(queryset=Stock.objects.all())
 
     class Meta:
@@ -12,7 +14,7 @@ class AlertSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'user', 'stock', 'name', 'alert_type', 'operator',
             'threshold', 'duration_minutes', 'state_is_open', 'state_started',
-            'last_price', 'is_active', 'created_at', 'last_triggered_at'
+            'last_price', 'is_active', 'urgent', 'created_at', 'last_triggered_at'
         )
         read_only_fields = ('user', 'state_is_open', 'state_started', 'last_price', 'created_at', 'last_triggered_at')
 
@@ -29,10 +31,53 @@ class AlertSerializer(serializers.ModelSerializer):
         return data
 
 
-class AlertTriggerSerializer(serializers.ModelSerializer):
+class BulkAlertSerializer(AlertSerializer):
+    """
+    AlertSerializer for bulk requests: stock references are resolved from the
+    ``stocks`` dict in the context (loaded with one IN query for the whole
+    batch) instead of one lookup per item.
+    """
+    id = serializers.IntegerField(required=False)
+    stock = serializers.IntegerField()
+
+    def validate_stock(self, value):
+        stock = self.context['stocks'].get(value)
+        if stock is None:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return stock
+
+
+class AlertTriggerSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     alert = serializers.PrimaryKeyRelatedField(queryset=Alert.objects.all())
     class Meta:
         model = AlertTrigger
         fields = (
             'id', 'alert','triggered_at','price','message'
         )
+
+
+class WebhookEndpointSerializer(serializers.ModelSerializer):
+    alert = serializers.PrimaryKeyRelatedField(queryset=Alert.objects.all(), required=False, allow_null=True)
+
+    class Meta:
+        model = WebhookEndpoint
+        fields = ('id', 'url', 'alert', 'secret', 'max_concurrency', 'is_active', 'created_at')
+        read_only_fields = ('secret', 'created_at')
+
+    def validate_alert(self, alert):
+        request = self.context.get('request')
+        if alert is not None and request and alert.user_id != request.user.id:
+            raise serializers.ValidationError("Alert not found.")
+        return alert
+
+    def validate_url(self, value):
+        try:
+            check_url(value)
+        except UnsafeDestination as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+    def validate_max_concurrency(self, value):
+        if not 1 <= value <= 64:
+            raise serializers.ValidationError("max_concurrency must be between 1 and 64.")
+        return value
@@ -0,0 +1,37 @@
+# apps/alerts/tasks.py
+import logging
+from celery import shared_task
+from apps.alerts.utils import evaluate_alerts_for_stock
+from apps.common.metrics import observe_evaluation
+from apps.common.tracing import PriceTrace, price_trace
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def evaluate_alerts_for_stocks(stock_ids, trace=None):
+    """
+    Evaluate the alerts of every stock in ``stock_ids``; queued once per
+    ingest batch instead of once per snapshot. Each stock is evaluated in its
+    own transaction, so one failing stock doesn't hold back the rest.
+    ``trace`` is the ingest's ``PriceTrace.as_dict()``, stamped on triggers.
+    """
+    with price_trace(PriceTrace.from_dict(trace) if trace else None):
+        return _evaluate_stocks(stock_ids)
+
+
+def _evaluate_stocks(stock_ids):
+    evaluated = 0
+    alerts_evaluated = 0
+    alerts_fired = 0
+    for stock_id in stock_ids:
+        try:
+            checked, fired = evaluate_alerts_for_stock(stock_id)
+            evaluated += 1
+            alerts_evaluated += checked
+            alerts_fired += fired
+        except Exception:
+            logger.exception(f"Error evaluating alerts for stock {stock_id}")
+    observe_evaluation(alerts_evaluated, alerts_fired)
+    logger.info(f"Evaluated alerts for {evaluated}/{len(stock_ids)} stocks")
+    return evaluated
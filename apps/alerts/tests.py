@@ -1,13 +1,23 @@
 # apps/alerts/tests.py
+import asyncio
+import json
+import threading
 import pytest
+import redis
+from datetime import timedelta
 from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from freezegun import freeze_time
+from rest_framework.test import APIClient
 
 from apps.stocks.models import Stock, PriceSnapshot
-from apps.alerts.models import Alert, AlertTrigger
+from apps.alerts.models import Alert, AlertTrigger, NotificationOutbox, WebhookEndpoint
+from apps.alerts.webhooks import SIGNATURE_HEADER, TIMESTAMP_HEADER, sign_payload
+from apps.alerts.outbox import dispatch_once
 from apps.alerts.utils import evaluate_alerts_for_stock
+from apps.common.realtime import stream_events
 
 
 @pytest.fixture
@@ -20,7 +30,7 @@ def test_user(db):
 def test_threshold_alert_triggers_immediately(monkeypatch, test_user):
     called = []
 
-    def fake_notify(alert, message, price):
+    def fake_notify(alert, message, price, **kwargs):
         called.append((alert.id, message, str(price)))
 
     monkeypatch.setattr('apps.alerts.utils.notify_user', fake_notify)
@@ -49,7 +59,7 @@ def test_threshold_alert_triggers_immediately(monkeypatch, test_user):
 def test_duration_alert_opens_and_then_triggers(monkeypatch, test_user):
     called = []
 
-    def fake_notify(alert, message, price):
+    def fake_notify(alert, message, price, **kwargs):
         called.append((alert.id, message, str(price)))
 
     monkeypatch.setattr('apps.alerts.utils.notify_user', fake_notify)
@@ -88,7 +98,7 @@ def test_duration_alert_opens_and_then_triggers(monkeypatch, test_user):
 def test_duration_alert_resets_if_condition_breaks(monkeypatch, test_user):
     called = []
 
-    def fake_notify(alert, message, price):
+    def fake_notify(alert, message, price, **kwargs):
         called.append((alert.id, message, str(price)))
 
     monkeypatch.setattr('apps.alerts.utils.notify_user', fake_notify)
@@ -119,3 +129,485 @@ def test_duration_alert_resets_if_condition_breaks(monkeypatch, test_user):
         assert alert.state_is_open is False
         assert AlertTrigger.objects.filter(alert=alert).count() == 0
         assert len(called) == 0
+
+
+@pytest.fixture
+def triggered_alert(test_user):
+    stock = Stock.objects.create(ticker='OBX', name='Outbox Inc.')
+    alert = Alert.objects.create(
+        user=test_user,
+        stock=stock,
+        alert_type='threshold',
+        operator='gt',
+        threshold=Decimal('100'),
+        is_active=True
+    )
+    PriceSnapshot.objects.create(stock=stock, price=Decimal('150'), timestamp=timezone.now())
+    evaluate_alerts_for_stock(stock.id)
+    return alert
+
+
+@pytest.mark.django_db
+def test_trigger_queues_notification_in_outbox(mailoutbox, triggered_alert):
+    entry = NotificationOutbox.objects.get(alert=triggered_alert)
+
+    assert entry.trigger == AlertTrigger.objects.get(alert=triggered_alert)
+    assert entry.status == NotificationOutbox.STATUS_PENDING
+    assert entry.subject == '[Stock Alert] OBX'
+    assert mailoutbox == []
+
+
+@pytest.mark.django_db
+def test_no_email_is_queued_without_smtp_credentials(settings, test_user):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    settings.EMAIL_HOST_PASSWORD = ''
+    stock = Stock.objects.create(ticker='NOC', name='No Creds')
+    Alert.objects.create(user=test_user, stock=stock, alert_type='threshold', operator='gt', threshold=Decimal('1'))
+    PriceSnapshot.objects.create(stock=stock, price=Decimal('5'), timestamp=timezone.now())
+    evaluate_alerts_for_stock(stock.id)
+
+    assert AlertTrigger.objects.filter(alert__stock=stock).exists()
+    assert not NotificationOutbox.objects.filter(channel=NotificationOutbox.CHANNEL_EMAIL).exists()
+
+
+@pytest.mark.django_db
+def test_dispatcher_sends_and_marks_outbox_rows(mailoutbox, triggered_alert):
+    # held for the coalescing window first
+    assert dispatch_once() == (0, 0)
+
+    with freeze_time(timezone.now() + timedelta(minutes=2)):
+        assert dispatch_once() == (1, 0)
+
+    entry = NotificationOutbox.objects.get(alert=triggered_alert)
+    assert entry.status == NotificationOutbox.STATUS_SENT
+    assert entry.attempts == 1
+    assert entry.sent_at is not None
+    assert [mail.to for mail in mailoutbox] == [['test@example.com']]
+    assert dispatch_once() == (0, 0)
+
+
+@pytest.mark.django_db
+def test_dispatcher_retries_with_backoff_then_gives_up(monkeypatch, settings, triggered_alert):
+    settings.NOTIFICATION_MAX_ATTEMPTS = 2
+
+    def broken_send(self, fail_silently=False):
+        raise ConnectionError("smtp down")
+
+    monkeypatch.setattr('django.core.mail.EmailMessage.send', broken_send)
+
+    with freeze_time("2025-08-12 00:00:00"):
+        NotificationOutbox.objects.update(next_attempt_at=timezone.now())
+        assert dispatch_once() == (0, 1)
+        entry = NotificationOutbox.objects.get(alert=triggered_alert)
+        assert entry.status == NotificationOutbox.STATUS_PENDING
+        assert entry.attempts == 1
+        assert entry.last_error == 'smtp down'
+        assert entry.next_attempt_at > timezone.now()
+        # not due yet
+        assert dispatch_once() == (0, 0)
+
+    with freeze_time("2025-08-12 01:00:00"):
+        assert dispatch_once() == (0, 1)
+        entry.refresh_from_db()
+        assert entry.status == NotificationOutbox.STATUS_FAILED
+        assert entry.attempts == 2
+
+
+@pytest.mark.django_db
+def test_rows_left_sending_by_a_dead_dispatcher_count_attempts(settings, triggered_alert):
+    from apps.alerts.outbox import claim_batch
+
+    settings.NOTIFICATION_MAX_ATTEMPTS = 2
+    with freeze_time("2025-08-12 00:00:00"):
+        NotificationOutbox.objects.update(next_attempt_at=timezone.now())
+        assert len(claim_batch()) == 1  # the dispatcher then dies mid-send
+
+    with freeze_time("2025-08-12 00:10:00"):  # lease expired: reclaimed as a second attempt
+        assert [entry.attempts for entry in claim_batch()] == [1]
+
+    with freeze_time("2025-08-12 00:20:00"):
+        assert claim_batch() == []
+    entry = NotificationOutbox.objects.get(alert=triggered_alert)
+    assert (entry.status, entry.attempts) == (NotificationOutbox.STATUS_FAILED, 2)
+    assert 'never finished' in entry.last_error
+
+
+@pytest.mark.django_db
+def test_notifications_within_window_are_coalesced(mailoutbox, test_user):
+    stocks = [Stock.objects.create(ticker=f'CO{i}', name=f'Coalesce {i}') for i in range(3)]
+    with freeze_time("2025-08-12 00:00:00"):
+        for stock in stocks[:2]:
+            Alert.objects.create(user=test_user, stock=stock, alert_type='threshold', operator='gt', threshold=Decimal('1'))
+            PriceSnapshot.objects.create(stock=stock, price=Decimal('5'), timestamp=timezone.now())
+            evaluate_alerts_for_stock(stock.id)
+
+    with freeze_time("2025-08-12 00:00:30"):
+        Alert.objects.create(user=test_user, stock=stocks[2], alert_type='threshold', operator='gt', threshold=Decimal('1'))
+        PriceSnapshot.objects.create(stock=stocks[2], price=Decimal('5'), timestamp=timezone.now())
+        evaluate_alerts_for_stock(stocks[2].id)
+        assert dispatch_once() == (0, 0)
+
+    with freeze_time("2025-08-12 00:01:00"):
+        assert dispatch_once() == (3, 0)
+
+    assert len(mailoutbox) == 1
+    assert mailoutbox[0].subject == '[Stock Alert] 3 alerts triggered'
+    for stock in stocks:
+        assert stock.ticker in mailoutbox[0].body
+
+
+@pytest.mark.django_db
+def test_failed_combined_email_is_retried_as_one_email(mailoutbox, monkeypatch, test_user):
+    from django.core.mail import EmailMessage
+
+    with freeze_time("2025-08-12 00:00:00"):
+        for i in range(3):
+            stock = Stock.objects.create(ticker=f'RT{i}', name=f'Retry {i}')
+            Alert.objects.create(user=test_user, stock=stock, alert_type='threshold', operator='gt', threshold=Decimal('1'))
+            PriceSnapshot.objects.create(stock=stock, price=Decimal('5'), timestamp=timezone.now())
+            evaluate_alerts_for_stock(stock.id)
+
+    real_send = EmailMessage.send
+    monkeypatch.setattr(EmailMessage, 'send', lambda self, fail_silently=False: 1 / 0)
+    with freeze_time("2025-08-12 00:01:00"):
+        assert dispatch_once() == (0, 3)
+    assert len(set(NotificationOutbox.objects.values_list('next_attempt_at', flat=True))) == 1
+
+    monkeypatch.setattr(EmailMessage, 'send', real_send)
+    with freeze_time("2025-08-12 01:00:00"):
+        assert dispatch_once(batch_size=3) == (3, 0)
+    assert len(mailoutbox) == 1
+    assert mailoutbox[0].subject == '[Stock Alert] 3 alerts triggered'
+
+
+@pytest.mark.django_db
+def test_urgent_alert_bypasses_coalescing_window(mailoutbox, test_user):
+    stock = Stock.objects.create(ticker='URG', name='Urgent Inc.')
+    Alert.objects.create(user=test_user, stock=stock, alert_type='threshold', operator='gt', threshold=Decimal('1'), urgent=True)
+    PriceSnapshot.objects.create(stock=stock, price=Decimal('5'), timestamp=timezone.now())
+    evaluate_alerts_for_stock(stock.id)
+
+    assert dispatch_once() == (1, 0)
+    assert mailoutbox[0].subject == '[Stock Alert] URG'
+
+
+@pytest.fixture
+def webhook_server(settings):
+    """A local stand-in receiver recording every POST; set ``status`` to fail."""
+    settings.WEBHOOK_REQUIRE_HTTPS = False
+    settings.WEBHOOK_ALLOW_PRIVATE_ADDRESSES = True
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            received.append((dict(self.headers), body))
+            self.send_response(server.status)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.status = 204
+    server.received = received
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/hook"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.django_db
+def test_webhook_deliveries_are_batched_and_signed(settings, test_user, webhook_server):
+    settings.NOTIFICATION_COALESCE_SECONDS = 0
+    endpoint = WebhookEndpoint.objects.create(user=test_user, url=webhook_server.url)
+    stocks = [Stock.objects.create(ticker=f'WH{i}', name=f'Webhook {i}') for i in range(3)]
+    for stock in stocks:
+        Alert.objects.create(user=test_user, stock=stock, alert_type='threshold', operator='gt', threshold=Decimal('1'))
+        PriceSnapshot.objects.create(stock=stock, price=Decimal('5'), timestamp=timezone.now())
+        evaluate_alerts_for_stock(stock.id)
+
+    # 3 emails + 3 webhook events, the webhook events in one request
+    assert dispatch_once() == (6, 0)
+    assert len(webhook_server.received) == 1
+    headers, body = webhook_server.received[0]
+    assert headers[SIGNATURE_HEADER] == f"sha256={sign_payload(endpoint.secret, headers[TIMESTAMP_HEADER], body)}"
+    events = json.loads(body)['events']
+    assert sorted(event['ticker'] for event in events) == ['WH0', 'WH1', 'WH2']
+    assert events[0]['price'] == '5.00'
+
+
+@pytest.mark.django_db
+def test_failed_webhook_delivery_is_retried(settings, test_user, webhook_server):
+    settings.NOTIFICATION_COALESCE_SECONDS = 0
+    webhook_server.status = 503
+    stock = Stock.objects.create(ticker='WHF', name='Webhook Fail')
+    alert = Alert.objects.create(user=test_user, stock=stock, alert_type='threshold', operator='gt', threshold=Decimal('1'))
+    WebhookEndpoint.objects.create(user=test_user, alert=alert, url=webhook_server.url)
+    PriceSnapshot.objects.create(stock=stock, price=Decimal('5'), timestamp=timezone.now())
+    evaluate_alerts_for_stock(stock.id)
+
+    assert dispatch_once() == (1, 1)
+    entry = NotificationOutbox.objects.get(channel=NotificationOutbox.CHANNEL_WEBHOOK)
+    assert entry.status == NotificationOutbox.STATUS_PENDING
+    assert entry.last_error == 'HTTP 503'
+
+
+@pytest.mark.django_db
+def test_webhooks_to_internal_addresses_are_refused(settings, test_user, webhook_server):
+    from apps.alerts.serializers import WebhookEndpointSerializer
+
+    settings.WEBHOOK_REQUIRE_HTTPS = True
+    settings.WEBHOOK_ALLOW_PRIVATE_ADDRESSES = False
+    for url in ('http://example.com/hook', 'https://127.0.0.1/hook', 'https://169.254.169.254/latest', 'https://[::1]/'):
+        serializer = WebhookEndpointSerializer(data={'url': url})
+        assert not serializer.is_valid(), url
+        assert 'url' in serializer.errors
+    assert WebhookEndpointSerializer(data={'url': 'https://hooks.example.com/in'}).is_valid()
+
+    # rows stored before the check (or re-pointed by DNS) are refused at delivery
+    settings.NOTIFICATION_COALESCE_SECONDS = 0
+    settings.WEBHOOK_REQUIRE_HTTPS = False
+    stock = Stock.objects.create(ticker='SSRF', name='Internal')
+    alert = Alert.objects.create(user=test_user, stock=stock, alert_type='threshold', operator='gt', threshold=Decimal('1'))
+    WebhookEndpoint.objects.create(user=test_user, alert=alert, url=webhook_server.url)
+    PriceSnapshot.objects.create(stock=stock, price=Decimal('5'), timestamp=timezone.now())
+    evaluate_alerts_for_stock(stock.id)
+
+    assert dispatch_once() == (1, 1)
+    assert webhook_server.received == []
+    entry = NotificationOutbox.objects.get(channel=NotificationOutbox.CHANNEL_WEBHOOK)
+    assert 'internal address' in entry.last_error
+
+
+@pytest.fixture
+def api_client(test_user):
+    client = APIClient()
+    client.force_authenticate(test_user)
+    return client
+
+
+@pytest.mark.django_db
+def test_bulk_create_alerts_reports_per_item_errors(api_client, test_user, django_assert_max_num_queries):
+    stocks = [Stock.objects.create(ticker=f'BK{i}', name=f'Bulk {i}') for i in range(3)]
+    items = [
+        {'stock': stock.id, 'alert_type': 'threshold', 'operator': 'gt', 'threshold': '10', 'duration_minutes': 1}
+        for stock in stocks
+    ]
+    items.append({'stock': 999999, 'alert_type': 'threshold', 'operator': 'gt', 'threshold': '10', 'duration_minutes': 1})
+    items.append({'stock': stocks[0].id, 'alert_type': 'duration', 'operator': 'lt'})
+
+    # stock IN query + bulk insert (+ savepoint/transaction bookkeeping), not one per item
+    with django_assert_max_num_queries(4):
+        response = api_client.post('/api/alerts/bulk/', items, format='json')
+
+    assert response.status_code == 207
+    body = response.json()
+    assert [alert['stock'] for alert in body['created']] == [stock.id for stock in stocks]
+    assert [error['index'] for error in body['errors']] == [3, 4]
+    assert 'stock' in body['errors'][0]['errors']
+    assert Alert.objects.filter(user=test_user).count() == 3
+
+
+@pytest.mark.django_db
+def test_bulk_update_and_delete_alerts(api_client, test_user):
+    stock = Stock.objects.create(ticker='BKU', name='Bulk Update')
+    other_user = get_user_model().objects.create_user(username='other', password='password')
+    mine = [
+        Alert.objects.create(user=test_user, stock=stock, alert_type='threshold', operator='gt', threshold=Decimal('1'))
+        for _ in range(2)
+    ]
+    theirs = Alert.objects.create(user=other_user, stock=stock, alert_type='threshold', operator='gt', threshold=Decimal('1'))
+
+    response = api_client.patch('/api/alerts/bulk/', [
+        {'id': mine[0].id, 'threshold': '5.5', 'is_active': False},
+        {'id': mine[1].id, 'name': 'renamed'},
+        {'id': theirs.id, 'name': 'hijacked'},
+    ], format='json')
+    assert response.status_code == 207
+    assert response.json()['errors'] == [{'index': 2, 'errors': {'id': ['Not found.']}}]
+    mine[0].refresh_from_db()
+    mine[1].refresh_from_db()
+    theirs.refresh_from_db()
+    assert (mine[0].threshold, mine[0].is_active) == (Decimal('5.5'), False)
+    assert mine[1].name == 'renamed'
+    assert theirs.name == ''
+
+    response = api_client.delete('/api/alerts/bulk/', [mine[0].id, mine[1].id, theirs.id], format='json')
+    assert response.status_code == 207
+    assert response.json()['deleted'] == sorted(alert.id for alert in mine)
+    assert list(Alert.objects.values_list('id', flat=True)) == [theirs.id]
+
+
+@pytest.mark.django_db
+def test_trigger_is_published_to_owner_channel_on_commit(settings, mocker, test_user, django_capture_on_commit_callbacks):
+    settings.REALTIME_ENABLED = True
+    published = mocker.patch('apps.common.realtime.publish')
+    stock = Stock.objects.create(ticker='RTX', name='Realtime')
+    alert = Alert.objects.create(user=test_user, stock=stock, alert_type='threshold', operator='gt', threshold=Decimal('1'))
+    PriceSnapshot.objects.create(stock=stock, price=Decimal('2'), timestamp=timezone.now())
+
+    with django_capture_on_commit_callbacks(execute=True):
+        evaluate_alerts_for_stock(stock.id)
+
+    trigger = AlertTrigger.objects.get(alert=alert)
+    published.assert_called_once()
+    channel, payload = published.call_args.args
+    assert channel == f"triggers:{test_user.id}"
+    assert (payload['alert'], payload['trigger'], payload['ticker']) == (alert.id, trigger.id, 'RTX')
+
+
+def test_stream_filters_triggers_by_alert_and_sends_heartbeats():
+    async def collect():
+        queue = asyncio.Queue()
+        for item in [
+            ('triggers:1', json.dumps({'alert': 9})),
+            ('triggers:1', json.dumps({'alert': 3})),
+            ('prices:AAPL', json.dumps({'ticker': 'AAPL', 'price': '1.00'})),
+        ]:
+            queue.put_nowait(item)
+        frames = stream_events(queue, alert_ids={3}, heartbeat=0.01)
+        return [await anext(frames) for _ in range(3)]
+
+    frames = asyncio.run(collect())
+    assert frames[0] == 'event: trigger\ndata: {"alert": 3}\n\n'
+    assert frames[1].startswith('event: price\n')
+    assert frames[2] == ': keep-alive\n\n'
+
+
+@pytest.mark.django_db
+@pytest.mark.urls('config.urls_asgi')
+def test_stream_rejects_invalid_token_and_empty_subscription(client):
+    assert client.get('/api/stream/', {'token': 'garbage'}).status_code == 401
+    assert client.get('/api/stream/').status_code == 400
+
+
+@pytest.mark.django_db
+def test_stream_is_only_routed_by_the_asgi_app(client, settings, mocker):
+    assert client.get('/api/stream/', {'tickers': 'AAPL'}).status_code == 404
+
+    settings.ROOT_URLCONF = 'config.urls_asgi'
+    mocker.patch('apps.common.realtime.Hub.subscribe', side_effect=redis.ConnectionError('refused'))
+    response = client.get('/api/stream/', {'tickers': 'AAPL'})
+    assert response.status_code == 503
+    assert response['Retry-After']
+
+
+@pytest.mark.django_db
+def test_trigger_export_only_includes_own_triggers(api_client, triggered_alert):
+    other_user = get_user_model().objects.create_user(username='other', password='password')
+    other_alert = Alert.objects.create(
+        user=other_user, stock=triggered_alert.stock, alert_type='threshold', operator='gt', threshold=Decimal('1'),
+    )
+    AlertTrigger.objects.create(alert=other_alert, price=Decimal('2'), message='not yours')
+
+    response = api_client.get('/api/alerts/triggers/export/', {'output': 'ndjson'})
+    rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+    assert [(row['alert'], row['ticker'], row['price']) for row in rows] == [(triggered_alert.id, 'OBX', '150.0000')]
+
+
+@pytest.mark.django_db
+def test_alert_list_sparse_fieldset_narrows_query(api_client, triggered_alert, django_assert_num_queries):
+    with django_assert_num_queries(2) as captured:  # count, page
+        response = api_client.get('/api/alerts/', {'fields': 'id,threshold'})
+    assert response.json()['results'] == [{'id': triggered_alert.id, 'threshold': '100.0000'}]
+    assert '"alerts_alert"."name"' not in captured.captured_queries[-1]['sql']
+
+
+@pytest.mark.django_db
+def test_trigger_feed_sparse_fieldset_keeps_cursor_columns(api_client, triggered_alert, django_assert_num_queries):
+    AlertTrigger.objects.create(alert=triggered_alert, price=Decimal('160.00'), message='again')
+
+    with django_assert_num_queries(1):  # the page; the cursor is built from the loaded rows
+        response = api_client.get('/api/alerts/triggers/', {'fields': 'price', 'page_size': 1})
+    body = response.json()
+    assert body['results'] == [{'price': '160.0000'}]
+    assert body['next']
+
+
+@pytest.mark.django_db
+def test_trigger_records_pipeline_stages_and_latency_report(mailoutbox, test_user, settings):
+    from apps.alerts.tasks import evaluate_alerts_for_stocks
+    from apps.common.tracing import PriceTrace
+
+    settings.NOTIFICATION_COALESCE_SECONDS = 0
+    stock = Stock.objects.create(ticker='LAT', name='Latency Inc.')
+    Alert.objects.create(user=test_user, stock=stock, alert_type='threshold', operator='gt', threshold=Decimal('1'))
+    with freeze_time("2025-08-12 00:00:00") as clock:
+        trace = PriceTrace.start()
+        clock.tick(0.5)
+        PriceSnapshot.objects.create(stock=stock, price=Decimal('5'), timestamp=timezone.now())
+        trace.written()
+        clock.tick(2)
+        evaluate_alerts_for_stocks.apply(args=([stock.id],), kwargs={'trace': trace.as_dict()})
+        clock.tick(10)
+        assert dispatch_once() == (1, 0)
+
+    trigger = AlertTrigger.objects.get(alert__stock=stock)
+    assert (trigger.notified_at - trigger.quote_received_at).total_seconds() == 12.5
+
+    staff = get_user_model().objects.create_user(username='ops', password='pw', is_staff=True)
+    client = APIClient()
+    client.force_authenticate(test_user)
+    assert client.get('/api/alerts/triggers/latency/').status_code == 403
+    client.force_authenticate(staff)
+    response = client.get('/api/alerts/triggers/latency/', {'since': '2025-08-11T00:00:00Z', 'until': '2025-08-13T00:00:00Z'})
+    assert response.status_code == 200
+    stages = response.json()['stages']
+    assert {stage: summary['p50'] for stage, summary in stages.items()} == {
+        'write': 0.5, 'evaluate': 2.0, 'notify': 10.0, 'total': 12.5,
+    }
+    assert stages['total']['count'] == 1
+
+
+@pytest.mark.django_db
+def test_alert_list_stays_within_query_budget_and_offenders_are_logged(api_client, triggered_alert, settings, caplog):
+    from apps.common.profiling import assert_query_budget
+
+    with assert_query_budget('alert-list', 'GET'):
+        assert api_client.get('/api/alerts/').status_code == 200
+    with pytest.raises(AssertionError, match='budget of 0 queries'):
+        with assert_query_budget('alert-list', budget=0):
+            api_client.get('/api/alerts/')
+
+    settings.QUERY_BUDGETS = {**settings.QUERY_BUDGETS, 'alert-list': 1}
+    with caplog.at_level('WARNING', logger='apps.common.profiling'):
+        api_client.get('/api/alerts/')
+    assert 'view alert-list over budget (1 queries' in caplog.text
+    assert 'FROM "alerts_alert"' in caplog.text
+
+
+@pytest.mark.django_db(transaction=True)  # the ASGI handler runs the view on its own thread and connection
+def test_query_profiling_runs_async_and_uses_per_unit_time_budgets(test_user, triggered_alert, settings, mocker):
+    from asgiref.sync import iscoroutinefunction
+    from django.core.handlers.asgi import ASGIHandler
+    from rest_framework_simplejwt.tokens import AccessToken
+    from apps.common import profiling
+
+    handler = ASGIHandler()
+    assert iscoroutinefunction(handler._middleware_chain)  # no sync hop in front of async views
+
+    settings.QUERY_TIME_BUDGETS = {'alert-list': 0}
+    reported = mocker.spy(profiling, 'report')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+        'method': 'GET', 'path': '/api/alerts/', 'root_path': '', 'query_string': b'',
+        'headers': [(b'authorization', f'Bearer {AccessToken.for_user(test_user)}'.encode())],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 50000),
+    }
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(handler(scope, receive, send))
+
+    assert sent[0]['status'] == 200
+    kind, name, profile, budget, time_budget = reported.call_args.args
+    assert (kind, name, budget, time_budget) == ('view', 'alert-list', 3, 0)
+    assert profile.count >= 2  # the sync view's queries, run in another thread, are counted
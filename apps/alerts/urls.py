@@ -1,9 +1,14 @@
 from django.urls import path
-from .views import AlertViewSet, AlertTriggerViewSet
+from .views import AlertViewSet, AlertTriggerViewSet, WebhookEndpointViewSet
 
 urlpatterns = [
     path('', AlertViewSet.as_view({'get': 'list', 'post': 'create'}), name='alert-list'),
+    path('bulk/', AlertViewSet.as_view({'post': 'bulk_create', 'patch': 'bulk_update', 'delete': 'bulk_destroy'}), name='alert-bulk'),
     path('<int:pk>/', AlertViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='alert-detail'),
     path('triggers/', AlertTriggerViewSet.as_view({'get': 'list', 'post': 'create'}), name='alert-trigger-list'),
+    path('triggers/export/', AlertTriggerViewSet.as_view({'get': 'export'}), name='alert-trigger-export'),
+    path('triggers/latency/', AlertTriggerViewSet.as_view({'get': 'latency'}), name='alert-trigger-latency'),
     path('triggers/<int:pk>/', AlertTriggerViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='alert-trigger-detail'),
+    path('webhooks/', WebhookEndpointViewSet.as_view({'get': 'list', 'post': 'create'}), name='alert-webhook-list'),
+    path('webhooks/<int:pk>/', WebhookEndpointViewSet.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}), name='alert-webhook-detail'),
 ]
@@ -3,6 +3,7 @@ from django.utils import timezone
 from django.db import transaction
 from apps.alerts.models import Alert, AlertTrigger
 from apps.common.notifications import notify_user
+from apps.common.tracing import trigger_trace_fields
 
 
 def _compare(price: Decimal, operator: str, threshold: Decimal) -> bool:
@@ -20,7 +21,13 @@ def evaluate_alerts_for_stock(stock_id: int):
     Evaluate active alerts for a stock.
     - threshold: trigger immediately when condition true.
     - duration: open state when condition holds, trigger after duration_minutes.
+    Notifications are queued in the outbox inside the same transaction.
+    Triggers record the current price trace, if any (see apps.common.tracing).
+
+    Returns (alerts evaluated, alerts triggered).
     """
+    evaluated = 0
+    fired = 0
     with transaction.atomic():
         alerts = Alert.objects.select_for_update().filter(stock_id=stock_id, is_active=True)
         now = timezone.now()
@@ -31,15 +38,17 @@ def evaluate_alerts_for_stock(stock_id: int):
                 continue
 
             price = Decimal(latest_snapshot.price)
+            evaluated += 1
 
             if alert.alert_type == 'threshold':
                 if alert.threshold is None:
                     continue
                 if _compare(price, alert.operator, alert.threshold):
-                    AlertTrigger.objects.create(
+                    trigger = AlertTrigger.objects.create(
                         alert=alert,
                         price=price,
-                        message=f"Threshold met: {price}"
+                        message=f"Threshold met: {price}",
+                        **trigger_trace_fields(now),
                     )
                     alert.last_triggered_at = now
                     alert.last_price = price
@@ -47,8 +56,10 @@ def evaluate_alerts_for_stock(stock_id: int):
                     notify_user(
                         alert,
                         f"Threshold alert: {alert.stock.ticker} {alert.operator} {alert.threshold}",
-                        price
+                        price,
+                        trigger=trigger,
                     )
+                    fired += 1
 
             elif alert.alert_type == 'duration':
                 if alert.duration_minutes is None or alert.threshold is None:
@@ -60,10 +71,11 @@ def evaluate_alerts_for_stock(stock_id: int):
                     if condition_holds:
                         elapsed = (now - (alert.state_started or now)).total_seconds() / 60.0
                         if elapsed >= alert.duration_minutes:
-                            AlertTrigger.objects.create(
+                            trigger = AlertTrigger.objects.create(
                                 alert=alert,
                                 price=price,
-                                message=f"Duration met: {elapsed:.2f} min"
+                                message=f"Duration met: {elapsed:.2f} min",
+                                **trigger_trace_fields(now),
                             )
                             alert.last_triggered_at = now
                             alert.state_is_open = False
@@ -73,8 +85,10 @@ def evaluate_alerts_for_stock(stock_id: int):
                             notify_user(
                                 alert,
                                 f"Duration alert: {alert.stock.ticker} held {alert.operator} {alert.threshold} for {alert.duration_minutes} minutes",
-                                price
+                                price,
+                                trigger=trigger,
                             )
+                            fired += 1
                         else:
                             alert.last_price = price
                             alert.save(update_fields=['last_price'])
@@ -93,4 +107,5 @@ def evaluate_alerts_for_stock(stock_id: int):
                         alert.save(update_fields=['state_is_open', 'state_started', 'last_price'])
                     else:
                         alert.last_price = price
-                        alert.save(update_fields=['last_price'])
\ No newline at end of file
+                        alert.save(update_fields=['last_price'])
+    return evaluated, fired
@@ -1,11 +1,23 @@
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
-from apps.alerts.serializers import AlertSerializer, AlertTriggerSerializer 
-from .models import Alert, AlertTrigger
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from apps.alerts.serializers import AlertSerializer, AlertTriggerSerializer, BulkAlertSerializer, WebhookEndpointSerializer
+from apps.stocks.models import Stock
+from .models import Alert, AlertTrigger, WebhookEndpoint
+from apps.common.export import export_response
+from apps.common.fieldsets import SparseFieldsetViewMixin
+from apps.common.filters import filter_time_range, parse_datetime_param
+from apps.common.pagination import TriggerCursorPagination
+from apps.common.tracing import STAGES, TRACE_FIELDS, stage_seconds, summarize
 
 # Create your views here.
 
-class AlertViewSet(viewsets.ModelViewSet):
+class AlertViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = AlertSerializer
     permission_classes = [IsAuthenticated]
 
@@ -13,10 +25,156 @@ class AlertViewSet(viewsets.ModelViewSet):
         return Alert.objects.filter(user=self.request.user)
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
-    
-class AlertTriggerViewSet(viewsets.ModelViewSet):
+
+    # Bulk endpoints: each item is validated on its own and reported by index,
+    # valid items are written together in one transaction.
+
+    def _bulk_items(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'detail': 'Expected a non-empty list of items.'})
+        if len(items) > settings.ALERTS_BULK_MAX_ITEMS:
+            raise ValidationError({'detail': f'At most {settings.ALERTS_BULK_MAX_ITEMS} items per request.'})
+        return items
+
+    @staticmethod
+    def _item_pk(item, key):
+        # delete requests may send bare ids instead of {"id": ...} objects
+        value = item.get(key) if isinstance(item, dict) else (item if key == 'id' else None)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    def _ids(self, items, key):
+        return {pk for pk in (self._item_pk(item, key) for item in items) if pk is not None}
+
+    def _bulk_status(self, done, errors, success_status=status.HTTP_200_OK):
+        if not errors:
+            return success_status
+        return status.HTTP_207_MULTI_STATUS if done else status.HTTP_400_BAD_REQUEST
+
+    def bulk_create(self, request):
+        items = self._bulk_items(request)
+        context = {**self.get_serializer_context(), 'stocks': Stock.objects.in_bulk(self._ids(items, 'stock'))}
+        alerts = []
+        errors = []
+        for index, item in enumerate(items):
+            serializer = BulkAlertSerializer(data=item, context=context)
+            if serializer.is_valid():
+                serializer.validated_data.pop('id', None)
+                alerts.append(Alert(user=request.user, **serializer.validated_data))
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        with transaction.atomic():
+            created = Alert.objects.bulk_create(alerts)
+        return Response(
+            {'created': AlertSerializer(created, many=True).data, 'errors': errors},
+            status=self._bulk_status(created, errors, status.HTTP_201_CREATED),
+        )
+
+    def bulk_update(self, request):
+        items = self._bulk_items(request)
+        instances = self.get_queryset().in_bulk(self._ids(items, 'id'))
+        context = {**self.get_serializer_context(), 'stocks': Stock.objects.in_bulk(self._ids(items, 'stock'))}
+        updated = []
+        fields = set()
+        errors = []
+        for index, item in enumerate(items):
+            instance = instances.get(self._item_pk(item, 'id'))
+            if instance is None:
+                errors.append({'index': index, 'errors': {'id': ['Not found.']}})
+                continue
+            serializer = BulkAlertSerializer(instance, data=item, partial=True, context=context)
+            if not serializer.is_valid():
+                errors.append({'index': index, 'errors': serializer.errors})
+                continue
+            serializer.validated_data.pop('id', None)
+            for field, value in serializer.validated_data.items():
+                setattr(instance, field, value)
+            fields.update(serializer.validated_data)
+            updated.append(instance)
+
+        if updated and fields:
+            with transaction.atomic():
+                Alert.objects.bulk_update(updated, list(fields), batch_size=1000)
+        return Response(
+            {'updated': AlertSerializer(updated, many=True).data, 'errors': errors},
+            status=self._bulk_status(updated, errors),
+        )
+
+    def bulk_destroy(self, request):
+        items = self._bulk_items(request)
+        ids = self._ids(items, 'id')
+        with transaction.atomic():
+            queryset = self.get_queryset().filter(id__in=ids)
+            deleted = set(queryset.values_list('id', flat=True))
+            queryset.delete()
+        errors = [
+            {'index': index, 'errors': {'id': ['Not found.']}}
+            for index, item in enumerate(items)
+            if self._item_pk(item, 'id') not in deleted
+        ]
+        return Response(
+            {'deleted': sorted(deleted), 'errors': errors},
+            status=self._bulk_status(deleted, errors),
+        )
+
+class AlertTriggerViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = AlertTriggerSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TriggerCursorPagination
 
     def get_queryset(self):
-        return AlertTrigger.objects.filter(alert__user=self.request.user)
\ No newline at end of file
+        qs = AlertTrigger.objects.filter(alert__user=self.request.user)
+        return filter_time_range(qs, self.request, 'triggered_at')
+
+    def export(self, request, *args, **kwargs):
+        rows = self.get_queryset().order_by('triggered_at', 'id').values_list(
+            'id', 'alert_id', 'alert__name', 'alert__stock__ticker', 'price', 'message', 'triggered_at',
+        )
+        columns = ('id', 'alert', 'alert_name', 'ticker', 'price', 'message', 'triggered_at')
+        return export_response(request, rows, columns, 'alert_triggers')
+
+    def latency(self, request, *args, **kwargs):
+        """
+        Per-stage price-to-notification latency percentiles (seconds) over
+        every user's triggers in ``?since=``/``?until=`` (default: the last
+        TRACE_REPORT_DEFAULT_HOURS hours). Staff only.
+        """
+        until = parse_datetime_param(request, 'until') or timezone.now()
+        since = parse_datetime_param(request, 'since') or until - timedelta(hours=settings.TRACE_REPORT_DEFAULT_HOURS)
+        rows = (
+            AlertTrigger.objects.filter(triggered_at__gte=since, triggered_at__lt=until)
+            .values_list(*TRACE_FIELDS)
+            .iterator(chunk_size=settings.EXPORT_ITERATOR_CHUNK_SIZE)
+        )
+        durations = {stage: [] for stage, _, _ in STAGES}
+        triggers = 0
+        for row in rows:
+            triggers += 1
+            for stage, seconds in stage_seconds(dict(zip(TRACE_FIELDS, row))).items():
+                durations[stage].append(seconds)
+        return Response({
+            'since': since,
+            'until': until,
+            'triggers': triggers,
+            'stages': {stage: summarize(values) for stage, values in durations.items()},
+        })
+
+    def get_permissions(self):
+        if self.action == 'latency':
+            return [IsAdminUser()]
+        return super().get_permissions()
+
+
+class WebhookEndpointViewSet(viewsets.ModelViewSet):
+    serializer_class = WebhookEndpointSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return WebhookEndpoint.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
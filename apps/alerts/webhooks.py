@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass, field
+
+import httpx
+from django.conf import settings
+
+from apps.common.metrics import NOTIFICATION_SEND
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = 'X-Webhook-Signature'
+TIMESTAMP_HEADER = 'X-Webhook-Timestamp'
+
+
+class UnsafeDestination(ValueError):
+    """A webhook URL that must not be posted to (wrong scheme, internal address)."""
+
+
+def _is_public(address):
+    return ipaddress.ip_address(address.split('%', 1)[0]).is_global
+
+
+def check_url(url):
+    """
+    Reject URLs the dispatcher must not call: non-HTTPS schemes and literal
+    loopback, private, link-local or otherwise non-public addresses. Host
+    names are checked again on every delivery, after resolution.
+    """
+    parsed = httpx.URL(url)
+    if parsed.scheme != 'https' and settings.WEBHOOK_REQUIRE_HTTPS:
+        raise UnsafeDestination("Webhook URLs must use https.")
+    if parsed.scheme not in ('http', 'https') or not parsed.host:
+        raise UnsafeDestination("Webhook URLs must be http(s) URLs with a host.")
+    if settings.WEBHOOK_ALLOW_PRIVATE_ADDRESSES:
+        return parsed
+    if parsed.host == 'localhost' or parsed.host.endswith('.localhost'):
+        raise UnsafeDestination("Webhook URLs must not point at internal addresses.")
+    try:
+        public = _is_public(parsed.host)
+    except ValueError:  # a host name
+        return parsed
+    if not public:
+        raise UnsafeDestination("Webhook URLs must not point at internal addresses.")
+    return parsed
+
+
+async def _pinned_url(url):
+    """
+    Resolve the URL's host and return the URL with the host replaced by a
+    public address, so the connection can't be re-pointed at an internal
+    address between the check and the request (DNS rebinding).
+    """
+    parsed = check_url(url)
+    if settings.WEBHOOK_ALLOW_PRIVATE_ADDRESSES:
+        return parsed
+    port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    infos = await asyncio.get_running_loop().getaddrinfo(parsed.host, port, type=socket.SOCK_STREAM)
+    addresses = [info[4][0] for info in infos]
+    if not addresses or not all(_is_public(address) for address in addresses):
+        raise UnsafeDestination(f"{parsed.host} resolves to an internal address.")
+    return parsed.copy_with(host=addresses[0])
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """HMAC-SHA256 over ``"<timestamp>.<body>"``, hex encoded."""
+    message = timestamp.encode() + b'.' + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+@dataclass
+class WebhookRequest:
+    """One POST to an endpoint carrying a batch of already-serialized events."""
+    endpoint_id: int
+    url: str
+    secret: str
+    max_concurrency: int
+    entry_ids: list = field(default_factory=list)
+    events: list = field(default_factory=list)
+    error: str = ''
+
+    @property
+    def body(self) -> bytes:
+        # events are stored as JSON text, so the batch is built without re-parsing
+        return b'{"events":[' + b','.join(event.encode() for event in self.events) + b']}'
+
+
+async def _post(client, semaphore, request):
+    body = request.body
+    timestamp = str(int(time.time()))
+    headers = {
+        'Content-Type': 'application/json',
+        TIMESTAMP_HEADER: timestamp,
+        SIGNATURE_HEADER: f"sha256={sign_payload(request.secret, timestamp, body)}",
+    }
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            url = await _pinned_url(request.url)
+            host = httpx.URL(request.url).host
+            if url.host != host:
+                # connect to the checked address; Host header and TLS name stay the original host
+                headers['Host'] = httpx.URL(request.url).netloc.decode()
+            response = await client.post(url, content=body, headers=headers, extensions={'sni_hostname': host})
+            if response.status_code >= 300:
+                request.error = f"HTTP {response.status_code}"
+        except (httpx.HTTPError, OSError, UnsafeDestination) as e:
+            request.error = f"{type(e).__name__}: {e}"
+        NOTIFICATION_SEND.labels('webhook').observe(time.perf_counter() - started)
+
+
+def _new_client(transport=None):
+    limits = httpx.Limits(
+        max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=settings.WEBHOOK_TIMEOUT_SECONDS, transport=transport)
+
+
+async def _deliver(client, requests):
+    semaphores = {}
+    tasks = []
+    for request in requests:
+        semaphore = semaphores.get(request.endpoint_id)
+        if semaphore is None:
+            semaphore = semaphores[request.endpoint_id] = asyncio.Semaphore(max(request.max_concurrency, 1))
+        tasks.append(_post(client, semaphore, request))
+    await asyncio.gather(*tasks)
+
+
+class _Pool:
+    """
+    One event loop and one pooled client per dispatcher process, reused by
+    every batch so keep-alive connections to endpoints survive between
+    batches. Recreated after a fork.
+    """
+
+    def __init__(self):
+        self.pid = None
+        self.loop = None
+        self.client = None
+
+    def run(self, requests):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.loop = asyncio.new_event_loop()
+            self.client = _new_client()
+        self.loop.run_until_complete(_deliver(self.client, requests))
+
+    def close(self):
+        if self.pid == os.getpid():
+            self.loop.run_until_complete(self.client.aclose())
+            self.loop.close()
+        self.pid = self.loop = self.client = None
+
+
+_pool = _Pool()
+
+
+async def _deliver_once(requests, transport):
+    async with _new_client(transport) as client:
+        await _deliver(client, requests)
+
+
+def deliver_webhooks(requests, transport=None):
+    """
+    POST every request concurrently over the process's pooled async client,
+    with at most ``max_concurrency`` requests in flight per endpoint.
+    Failures are recorded on ``request.error``; nothing is raised. A custom
+    ``transport`` gets a one-off client.
+    """
+    if not requests:
+        return requests
+    if transport is not None:
+        asyncio.run(_deliver_once(requests, transport))
+    else:
+        _pool.run(requests)
+    return requests
+
+
+def close_pool():
+    """Close the pooled client, e.g. when the dispatcher exits."""
+    _pool.close()
+
+
+def build_requests(entries):
+    """Group webhook outbox entries per endpoint into WEBHOOK_BATCH_SIZE batches."""
+    requests = []
+    open_requests = {}
+    for entry in entries:
+        endpoint = entry.endpoint
+        request = open_requests.get(endpoint.id)
+        if request is None or len(request.events) >= settings.WEBHOOK_BATCH_SIZE:
+            request = WebhookRequest(
+                endpoint_id=endpoint.id,
+                url=endpoint.url,
+                secret=endpoint.secret,
+                max_concurrency=endpoint.max_concurrency,
+            )
+            open_requests[endpoint.id] = request
+            requests.append(request)
+        request.entry_ids.append(entry.id)
+        request.events.append(entry.body)
+    return requests
@@ -0,0 +1,105 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+
+STOCKS_NAMESPACE = 'stocks'
+
+
+def redis_client():
+    """
+    The raw redis-py client behind the default cache, for atomic operations
+    Django's cache API lacks; None with any other backend.
+    """
+    backend = caches['default']
+    if isinstance(backend, RedisCache):
+        return backend._cache.get_client(write=True)
+    return None
+
+
+def shared_cache_check(app_configs, **kwargs):
+    """
+    Response versions, the ticker map and task leases only coordinate
+    processes through a shared cache; a per-process one silently breaks them.
+    """
+    if settings.DEBUG or not isinstance(caches['default'], LocMemCache):
+        return []
+    return [checks.Warning(
+        "The default cache is in-process (locmemcache://).",
+        hint="Point CACHE_URL at Redis: cache invalidation from workers and single-flight "
+             "task leases do not reach other processes otherwise.",
+        id='common.W001',
+    )]
+
+
+def _version_key(namespace):
+    return f"resp-version:{namespace}"
+
+
+def get_version(namespace):
+    """
+    The namespace's current version: a random token, so a version key lost
+    to eviction or a restart comes back as a new version rather than an old
+    one whose stale entries may still be cached.
+    """
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        cache.add(_version_key(namespace), uuid.uuid4().hex, None)
+        version = cache.get(_version_key(namespace))
+    return version
+
+
+def bump_version(namespace):
+    """
+    Invalidate every cached response of ``namespace`` at once. Old entries
+    are never read again and simply expire.
+    """
+    version = uuid.uuid4().hex
+    cache.set(_version_key(namespace), version, None)
+    return version
+
+
+def invalidate_stock_responses():
+    return bump_version(STOCKS_NAMESPACE)
+
+
+class CachedResponseMixin:
+    """
+    Serve GET responses of a DRF view from the shared cache.
+
+    Rendered JSON bodies are cached per URL (path and query string) under a
+    namespace version that writers bump, and returned with a strong ETag so
+    clients can revalidate with ``If-None-Match`` and get a 304. Only
+    anonymous-safe, JSON-rendered 200 responses are cached.
+    """
+    cache_namespace = None
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        key = f"resp:{self.cache_namespace}:{get_version(self.cache_namespace)}:{path_hash}"
+        entry = cache.get(key)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response = self.finalize_response(request, response, *args, **kwargs)
+            response.render()
+            etag = quote_etag(hashlib.md5(response.content).hexdigest())
+            cache.set(key, (response.content, response['Content-Type'], etag), settings.RESPONSE_CACHE_TIMEOUT)
+        else:
+            content, content_type, etag = entry
+            response = HttpResponse(content, content_type=content_type)
+
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
@@ -0,0 +1,83 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def requested_fields(request):
+    """
+    Field names asked for with ``?fields=id,price`` on a read request, or
+    None when the full representation is wanted. Writes always get every field.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    value = request.query_params.get('fields')
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetSerializerMixin:
+    """Drop the serializer fields that were not listed in ``?fields=``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = requested_fields(self.context.get('request'))
+        if wanted is None:
+            return
+        unknown = wanted - set(self.fields)
+        if unknown:
+            raise ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}."})
+        for name in set(self.fields) - wanted:
+            self.fields.pop(name)
+
+
+@lru_cache(maxsize=None)
+def _column_sources(serializer_class):
+    """Serializer field name -> concrete model field it reads, where there is one."""
+    model = serializer_class.Meta.model
+    sources = {}
+    for name, field in serializer_class().fields.items():
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if model_field.concrete:
+            sources[name] = model_field.name
+    return sources
+
+
+def _required_columns(queryset, paginator):
+    """
+    Columns that must stay loaded whatever was asked for: the cursor
+    paginator reads its ordering fields off the last row, and ``.only()``
+    may not defer a foreign key that is followed with ``select_related``.
+    """
+    columns = {queryset.model._meta.pk.name}
+    ordering = getattr(paginator, 'ordering', None) or ()
+    if isinstance(ordering, str):
+        ordering = (ordering,)
+    columns.update(name.lstrip('-') for name in ordering)
+    related = queryset.query.select_related
+    if related is True:
+        columns.update(f.name for f in queryset.model._meta.concrete_fields if f.is_relation)
+    elif related:
+        columns.update(related)
+    return columns
+
+
+class SparseFieldsetViewMixin:
+    """
+    With ``?fields=``, load only the matching columns (``.only()``) in
+    addition to trimming the serialized output.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        wanted = requested_fields(self.request)
+        if wanted is None:
+            return queryset
+        sources = _column_sources(self.get_serializer_class())
+        columns = {sources[name] for name in wanted if name in sources}
+        return queryset.only(*_required_columns(queryset, self.paginator), *columns)
@@ -0,0 +1,29 @@
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def parse_datetime_param(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValidationError({name: f"Invalid datetime: {value!r}. Use ISO 8601, e.g. 2025-08-12T00:00:00Z."})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_time_range(queryset, request, field):
+    """
+    Restrict ``queryset`` to ``?since=`` (inclusive) and ``?until=`` (exclusive)
+    ISO 8601 datetimes on ``field``.
+    """
+    since = parse_datetime_param(request, 'since')
+    until = parse_datetime_param(request, 'until')
+    if since:
+        queryset = queryset.filter(**{f"{field}__gte": since})
+    if until:
+        queryset = queryset.filter(**{f"{field}__lt": until})
+    return queryset
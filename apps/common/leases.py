@@ -0,0 +1,120 @@
+"""
+Single-flight leases for beat-driven tasks.
+
+Beat fires periodic tasks whether or not the previous run has finished. A
+run first takes a lease (a Redis key with a TTL, holding a random token);
+while it holds the lease a heartbeat thread keeps extending the TTL, so a
+long run never loses it and a crashed worker's lease expires within one
+TTL. Runs that find the lease taken are skipped: the run in flight already
+covers them.
+
+Leases need Redis or another cache shared by every worker (CACHE_URL): with
+the in-process default each worker process has its own leases, so runs are
+only single-flight within one process (``manage.py check`` warns).
+"""
+import logging
+import threading
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.common.cache import redis_client
+from apps.common.metrics import SCHEDULE_LAG, TASK_SKIPPED
+
+logger = logging.getLogger(__name__)
+
+# delete / extend the key only while it still holds our token
+_RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+_EXTEND = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('expire', KEYS[1], ARGV[2]) end return 0"
+
+
+class Lease:
+    def __init__(self, name, ttl, token=None):
+        self.key = f"lease:{name}"
+        self.ttl = ttl
+        self.token = token or uuid.uuid4().hex
+        self.lost = False
+        self._client = redis_client()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def acquire(self):
+        if self._client is not None:
+            return bool(self._client.set(self.key, self.token, nx=True, ex=self.ttl))
+        return cache.add(self.key, self.token, self.ttl)
+
+    def extend(self):
+        if self._client is not None:
+            return bool(self._client.eval(_EXTEND, 1, self.key, self.token, self.ttl))
+        return cache.get(self.key) == self.token and cache.touch(self.key, self.ttl)
+
+    def release(self):
+        self.stop_heartbeat()
+        if self._client is not None:
+            return bool(self._client.eval(_RELEASE, 1, self.key, self.token))
+        if cache.get(self.key) == self.token:
+            return cache.delete(self.key)
+        return False
+
+    def start_heartbeat(self):
+        """Extend the lease every third of its TTL until released."""
+        self._thread = threading.Thread(target=self._beat, name=f"heartbeat {self.key}", daemon=True)
+        self._thread.start()
+
+    def stop_heartbeat(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _beat(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                if not self.extend():
+                    self.lost = True
+                    logger.warning(f"Lost {self.key}: another run may start before this one finishes")
+                    return
+            except Exception:
+                logger.exception(f"Could not extend {self.key}")
+
+
+def record_schedule_lag(task):
+    """Observe the time between the message being published and the task starting."""
+    request = task.request
+    published_at = request.get('published_at') or (request.headers or {}).get('published_at')
+    if published_at:
+        SCHEDULE_LAG.labels(task.name).observe(max(time.time() - float(published_at), 0))
+
+
+def skip_run(task, lease):
+    TASK_SKIPPED.labels(task.name).inc()
+    logger.info(f"Skipping {task.name}: the previous run still holds {lease.key}")
+    return {"skipped": "already running"}
+
+
+def single_flight(ttl=None):
+    """
+    Decorator for bound periodic tasks: run only if no other run of the
+    task is in flight, holding a heartbeated lease of ``ttl`` seconds
+    (default PERIODIC_TASK_LEASE_SECONDS). Place it below
+    ``@shared_task(bind=True)``.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(task, *args, **kwargs):
+            record_schedule_lag(task)
+            lease = Lease(task.name, ttl or settings.PERIODIC_TASK_LEASE_SECONDS)
+            if not lease.acquire():
+                return skip_run(task, lease)
+            lease.start_heartbeat()
+            try:
+                return func(task, *args, **kwargs)
+            finally:
+                lease.release()
+                if lease.lost:
+                    logger.warning(f"{task.name} ran without its lease for a while; another run may have overlapped")
+        return wrapper
+    return decorator
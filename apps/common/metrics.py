@@ -0,0 +1,118 @@
+"""
+Prometheus metrics, served at /metrics.
+
+Gunicorn and Celery fork worker processes, each with its own counters. With
+PROMETHEUS_MULTIPROC_DIR set, every process writes its samples there as
+``<type>_<pid>.db`` files. PIDs are only unique within a container, so each
+container gets its own directory (emptied when it starts, see
+config/metrics-entrypoint.sh) under a shared PROMETHEUS_MULTIPROC_ROOT, and
+/metrics aggregates every directory there. Without either, the in-process
+registry is served.
+"""
+import glob
+import hmac
+import os
+import time
+from contextlib import contextmanager
+
+from celery.signals import task_postrun, task_prerun, worker_process_shutdown
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client import REGISTRY
+
+COUNT_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+TASK_DURATION = Histogram(
+    'celery_task_duration_seconds', 'Celery task run time.', ['task', 'state'],
+    buckets=(0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+SCHEDULE_LAG = Histogram(
+    'periodic_task_lag_seconds', 'Delay between a periodic task being sent and starting.', ['task'],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+TASK_SKIPPED = Counter('periodic_task_skipped', 'Periodic task runs skipped while a previous run held the lease.', ['task'])
+PROVIDER_LATENCY = Histogram(
+    'price_provider_latency_seconds', 'Quote provider request latency per ticker.', ['ticker', 'outcome'],
+)
+SNAPSHOT_WRITE = Histogram(
+    'snapshot_write_seconds', 'Time to store a batch of price snapshots.', ['source'],
+)
+SNAPSHOTS_WRITTEN = Counter('snapshots_written', 'Price snapshots stored.', ['source'])
+ALERTS_EVALUATED = Histogram('alerts_evaluated_per_tick', 'Alerts evaluated per evaluation pass.', buckets=COUNT_BUCKETS)
+ALERTS_FIRED = Histogram('alerts_fired_per_tick', 'Alerts triggered per evaluation pass.', buckets=COUNT_BUCKETS)
+NOTIFICATION_SEND = Histogram(
+    'notification_send_seconds', 'Time to deliver one notification message or webhook batch.', ['channel'],
+)
+NOTIFICATION_FAILURES = Counter('notification_failures', 'Failed notification deliveries.', ['channel'])
+PIPELINE_LATENCY = Histogram(
+    'price_pipeline_latency_seconds', 'Quote receipt to notification latency per stage (see apps.common.tracing).',
+    ['stage'], buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+DIGEST_EMAILS = Counter('digest_emails', 'Digest emails processed.', ['outcome'])
+DIGEST_THROUGHPUT = Histogram(
+    'digest_chunk_emails_per_second', 'Digest emails sent per second, per chunk.',
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+
+
+@contextmanager
+def timed(histogram, *labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histogram.labels(*labels) if labels else histogram).observe(time.perf_counter() - start)
+
+
+def observe_evaluation(evaluated, fired):
+    ALERTS_EVALUATED.observe(evaluated)
+    ALERTS_FIRED.observe(fired)
+
+
+_task_started = {}
+
+
+@task_prerun.connect
+def _task_prerun(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None and task is not None:
+        TASK_DURATION.labels(task.name, state or 'UNKNOWN').observe(time.perf_counter() - started)
+
+
+@worker_process_shutdown.connect
+def _worker_process_shutdown(pid=None, **kwargs):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+class ContainersCollector:
+    """Merge the per-process files of every container directory under ``root``."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def collect(self):
+        return multiprocess.MultiProcessCollector.merge(glob.glob(os.path.join(self.root, '*', '*.db')))
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponseForbidden("Set METRICS_TOKEN to serve metrics.")
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return HttpResponseForbidden()
+    if settings.PROMETHEUS_MULTIPROC_ROOT:
+        registry = CollectorRegistry()
+        registry.register(ContainersCollector(settings.PROMETHEUS_MULTIPROC_ROOT))
+    elif os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
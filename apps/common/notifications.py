@@ -1,15 +1,81 @@
+import json
 import logging
+from datetime import timedelta
 from decimal import Decimal
-from django.core.mail import send_mail
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
-def notify_user(alert, message: str, price: Decimal):
+
+def _delivery_time(user, urgent: bool):
+    """
+    When a new notification for ``user`` should go out.
+
+    Non-urgent notifications are held for NOTIFICATION_COALESCE_SECONDS; a
+    notification arriving while another is still being held joins that
+    window, so the dispatcher can send them as one message.
+    """
+    from apps.alerts.models import NotificationOutbox
+
+    now = timezone.now()
+    window = settings.NOTIFICATION_COALESCE_SECONDS
+    if urgent or window <= 0:
+        return now
+    held = (
+        NotificationOutbox.objects.filter(
+            user=user,
+            channel=NotificationOutbox.CHANNEL_EMAIL,
+            status=NotificationOutbox.STATUS_PENDING,
+            attempts=0,
+            next_attempt_at__gt=now,
+        )
+        .order_by('next_attempt_at')
+        .values_list('next_attempt_at', flat=True)
+        .first()
+    )
+    return held or now + timedelta(seconds=window)
+
+
+def email_configured():
     """
-    Send a notification email to the user.
+    Whether notification email can be delivered: SMTP needs credentials;
+    other backends (console, locmem in tests) always can.
     """
+    if settings.EMAIL_BACKEND != 'django.core.mail.backends.smtp.EmailBackend':
+        return True
+    return bool(settings.EMAIL_HOST_USER and settings.EMAIL_HOST_PASSWORD)
+
+
+def notify_user(alert, message: str, price: Decimal, trigger=None):
+    """
+    Queue a notification email for the user, plus one webhook delivery per
+    active endpoint configured for the user or this alert.
+
+    The messages are written to the notification outbox using the caller's
+    database transaction, so it is committed (or rolled back) together with
+    the AlertTrigger it announces. Delivery, coalescing and retries are
+    handled by the outbox dispatcher. Subscribed real-time clients are told
+    about the trigger once the transaction commits.
+    """
+    from apps.alerts.models import NotificationOutbox
+    from apps.common.realtime import publish_trigger
+
     user = alert.user
+    _queue_webhooks(alert, message, price, trigger)
+    if trigger is not None:
+        transaction.on_commit(lambda: publish_trigger(alert, trigger))
+    if not user.email:
+        logger.info(f"Notification skipped for alert {alert.id}: {user.username} has no email address")
+        return None
+    if not email_configured():
+        # nothing could deliver it; queuing would only fail and retry until giving up
+        logger.info(f"Notification email skipped for alert {alert.id}: SMTP credentials are not configured")
+        return None
+
     subject = f"[Stock Alert] {alert.stock.ticker}"
     body = f"""
     Hi {user.username},
@@ -24,20 +90,76 @@ def notify_user(alert, message: str, price: Decimal):
     Regards,
     Stock Alerting System
     """
-    email_to = [user.email] if user.email else []
-    try:
-        if settings.EMAIL_HOST_USER and settings.EMAIL_HOST_PASSWORD and email_to:
-            send_mail(
-                subject,
-                body,
-                settings.DEFAULT_FROM_EMAIL,
-                email_to,
-                fail_silently=False,
-            )
-            logger.info(f"Notification sent to {user.email} for alert {alert.id}.")
-            return True
-    except Exception as e:
-        logger.warning(f"Failed to send notification for alert {alert.id} to {user.email}: {e}")
-
-    logger.info(f"Notification fallback for alert {alert.id} to {user.email}: {user.username}, {message}")
-    return False
+    entry = NotificationOutbox.objects.create(
+        user=user,
+        alert=alert,
+        trigger=trigger,
+        recipient=user.email,
+        subject=subject,
+        body=body,
+        next_attempt_at=_delivery_time(user, alert.urgent),
+    )
+    logger.info(f"Notification queued for {user.email} for alert {alert.id}.")
+    return entry
+
+
+def _queue_webhooks(alert, message, price, trigger):
+    from apps.alerts.models import NotificationOutbox, WebhookEndpoint
+
+    endpoints = WebhookEndpoint.objects.filter(
+        Q(alert__isnull=True) | Q(alert=alert),
+        user_id=alert.user_id,
+        is_active=True,
+    ).only('id', 'url')
+    event = None
+    entries = []
+    for endpoint in endpoints:
+        if event is None:
+            event = json.dumps({
+                'alert': alert.id,
+                'alert_name': alert.name,
+                'trigger': trigger.id if trigger else None,
+                'ticker': alert.stock.ticker,
+                'price': price,
+                'message': message,
+                'triggered_at': trigger.triggered_at if trigger else timezone.now(),
+            }, cls=DjangoJSONEncoder)
+        entries.append(NotificationOutbox(
+            user_id=alert.user_id,
+            alert=alert,
+            trigger=trigger,
+            channel=NotificationOutbox.CHANNEL_WEBHOOK,
+            endpoint=endpoint,
+            recipient=endpoint.url,
+            body=event,
+        ))
+    if entries:
+        NotificationOutbox.objects.bulk_create(entries)
+    return entries
+
+
+def combine_notifications(entries):
+    """
+    Build one (subject, body) for several outbox entries of the same user.
+    Entries need ``user``, ``alert__stock`` and ``trigger`` loaded.
+    """
+    user = entries[0].user
+    lines = []
+    for entry in entries:
+        alert = entry.alert
+        price = entry.trigger.price if entry.trigger else alert.last_price
+        detail = f" - {entry.trigger.message}" if entry.trigger and entry.trigger.message else ""
+        lines.append(f"    - {alert.stock.ticker} @ {price}: \"{alert.name or alert.id}\"{detail}")
+
+    subject = f"[Stock Alert] {len(entries)} alerts triggered"
+    body = f"""
+    Hi {user.username},
+
+    {len(entries)} of your alerts were triggered:
+
+{chr(10).join(lines)}
+
+    Regards,
+    Stock Alerting System
+    """
+    return subject, body
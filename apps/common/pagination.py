@@ -0,0 +1,21 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TimeCursorPagination(CursorPagination):
+    """
+    Keyset pagination for append-only time series feeds.
+
+    Pages are addressed by an opaque cursor over (time, id) instead of a page
+    number, so there is no COUNT(*) and no OFFSET scan however deep the client
+    pages. Subclasses set ``ordering`` to match a composite index.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class SnapshotCursorPagination(TimeCursorPagination):
+    ordering = ('-timestamp', '-id')
+
+
+class TriggerCursorPagination(TimeCursorPagination):
+    ordering = ('-triggered_at', '-id')
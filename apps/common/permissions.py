@@ -1,3 +1,6 @@
+import hmac
+
+from django.conf import settings
 from rest_framework import permissions
 
 
@@ -12,4 +15,16 @@ class IsOwnerOrAdmin(permissions.BasePermission):
             return True
         owner = getattr(obj, 'user', None)
         return owner == request.user
-        
\ No newline at end of file
+        
+
+class IsStaffOrIngestService(permissions.BasePermission):
+    """
+    Staff users, or a price feed sending ``X-Ingest-Token: <INGEST_TOKEN>``
+    (no token is accepted while INGEST_TOKEN is unset).
+    """
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        token = settings.INGEST_TOKEN
+        sent = request.headers.get('X-Ingest-Token', '')
+        return bool(token) and hmac.compare_digest(sent.encode(), token.encode())
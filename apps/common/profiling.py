@@ -0,0 +1,196 @@
+"""
+Query-count budgets and slow-query profiling for views and Celery tasks.
+
+Every request (``QueryProfileMiddleware``) and task run (Celery signals
+below) records its query count, total database time and slowest statements
+through ``connection.execute_wrapper``. Units over their budget are logged
+with their slowest statements and counted in Prometheus.
+
+Budgets live in QUERY_BUDGETS (query counts) and QUERY_TIME_BUDGETS
+(database milliseconds), keyed by URL name (optionally prefixed with the
+HTTP method, e.g. ``'POST alert-bulk'``) or task name; anything else gets
+QUERY_BUDGET_DEFAULT / QUERY_TIME_BUDGET_MS. Tests assert query budgets
+with ``assert_query_budget``.
+
+The middleware runs in sync and async chains alike, so the ASGI app stays
+fully async. Under ASGI, sync views run in another thread with its own
+connection; there the profile is found through a context variable, which
+Django's sync_to_async carries into that thread.
+"""
+import heapq
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.dispatch import receiver
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+QUERIES = Histogram(
+    'db_queries_per_unit', 'Database queries per request or task run.', ['kind', 'name'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000),
+)
+DB_TIME = Histogram('db_time_per_unit_seconds', 'Database time per request or task run.', ['kind', 'name'])
+BUDGET_EXCEEDED = Counter('query_budget_exceeded', 'Requests or task runs over their query budget.', ['kind', 'name'])
+
+
+class QueryProfile:
+    """An execute wrapper counting queries and keeping the slowest statements."""
+
+    def __init__(self, slowest=None):
+        self.count = 0
+        self.seconds = 0.0
+        self.keep = slowest or settings.QUERY_PROFILE_SLOWEST
+        self.slowest = []  # min-heap of (seconds, sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, (elapsed, sql))
+            elif elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (elapsed, sql))
+
+    def slowest_statements(self):
+        return sorted(self.slowest, reverse=True)
+
+    def describe(self):
+        lines = [f"{self.count} queries in {self.seconds * 1000:.1f}ms; slowest:"]
+        lines += [f"  {seconds * 1000:.1f}ms {sql}" for seconds, sql in self.slowest_statements()]
+        return '\n'.join(lines)
+
+
+def _lookup(budgets, default, name, method=None):
+    if method and f"{method} {name}" in budgets:
+        return budgets[f"{method} {name}"]
+    return budgets.get(name, default)
+
+
+def query_budget(name, method=None):
+    return _lookup(settings.QUERY_BUDGETS, settings.QUERY_BUDGET_DEFAULT, name, method)
+
+
+def time_budget_ms(name, method=None):
+    return _lookup(settings.QUERY_TIME_BUDGETS, settings.QUERY_TIME_BUDGET_MS, name, method)
+
+
+def report(kind, name, profile, budget, time_budget=None):
+    """Export ``profile`` and log it if it broke the query or time budget."""
+    time_budget = time_budget if time_budget is not None else settings.QUERY_TIME_BUDGET_MS
+    QUERIES.labels(kind, name).observe(profile.count)
+    DB_TIME.labels(kind, name).observe(profile.seconds)
+    over_count = budget is not None and profile.count > budget
+    over_time = profile.seconds * 1000 > time_budget
+    if over_count or over_time:
+        BUDGET_EXCEEDED.labels(kind, name).inc()
+        logger.warning(f"{kind} {name} over budget ({budget} queries, {time_budget}ms): {profile.describe()}")
+    elif profile.slowest and profile.slowest_statements()[0][0] * 1000 > settings.SLOW_QUERY_MS:
+        seconds, sql = profile.slowest_statements()[0]
+        logger.warning(f"Slow query in {kind} {name} ({seconds * 1000:.1f}ms): {sql}")
+
+
+_request_profile = ContextVar('request_profile', default=None)
+
+
+def _profile_request_query(execute, sql, params, many, context):
+    profile = _request_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+
+@receiver(request_started)
+def _install_request_wrapper(**kwargs):
+    # sent from the thread that will run sync views, also under ASGI
+    connection = connections[DEFAULT_DB_ALIAS]
+    if _profile_request_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_profile_request_query)
+
+
+class QueryProfileMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.QUERY_PROFILING_ENABLED:
+            return self.get_response(request)
+        profile = QueryProfile()
+        with connections[DEFAULT_DB_ALIAS].execute_wrapper(profile):
+            response = self.get_response(request)
+        self.report(request, profile)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.QUERY_PROFILING_ENABLED:
+            return await self.get_response(request)
+        profile = QueryProfile()
+        token = _request_profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_profile.reset(token)
+        self.report(request, profile)
+        return response
+
+    def report(self, request, profile):
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.url_name:
+            name, method = match.url_name, request.method
+            report('view', name, profile, query_budget(name, method), time_budget_ms(name, method))
+
+
+# task id -> (execute_wrapper context, profile)
+_task_profiles = {}
+
+
+@task_prerun.connect
+def _profile_task(task_id=None, **kwargs):
+    if settings.QUERY_PROFILING_ENABLED:
+        profile = QueryProfile()
+        wrapper = connections[DEFAULT_DB_ALIAS].execute_wrapper(profile)
+        wrapper.__enter__()
+        _task_profiles[task_id] = (wrapper, profile)
+
+
+@task_postrun.connect
+def _report_task(task_id=None, task=None, **kwargs):
+    entry = _task_profiles.pop(task_id, None)
+    if entry is None:
+        return
+    wrapper, profile = entry
+    wrapper.__exit__(None, None, None)
+    if task is not None:
+        report('task', task.name, profile, query_budget(task.name), time_budget_ms(task.name))
+
+
+@contextmanager
+def assert_query_budget(name, method=None, budget=None):
+    """
+    Test helper: fail if the block runs more queries than the budget
+    declared for ``name`` in QUERY_BUDGETS (or ``budget``, if given).
+    """
+    budget = budget if budget is not None else query_budget(name, method)
+    profile = QueryProfile()
+    with connections[DEFAULT_DB_ALIAS].execute_wrapper(profile):
+        yield profile
+    if budget is not None and profile.count > budget:
+        raise AssertionError(f"{name} ran over its budget of {budget} queries: {profile.describe()}")
@@ -0,0 +1,223 @@
+"""
+Real-time push of prices and alert triggers over Server-Sent Events.
+
+Writers publish JSON messages to Redis channels (``prices:<TICKER>`` and
+``triggers:<user id>``). Each ASGI process holds a single Redis pub/sub
+connection (the ``Hub``) and fans messages out to per-client queues, so an
+idle client costs one queue and one open HTTP response, not a Redis
+connection. ``/api/stream/`` is only routed by the ASGI app (uvicorn, see
+config/urls_asgi.py).
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+_publisher = None
+_publisher_down_until = 0.0
+
+
+def price_channel(ticker):
+    return f"prices:{ticker}"
+
+
+def trigger_channel(user_id):
+    return f"triggers:{user_id}"
+
+
+def publish(channel, payload):
+    """
+    Best-effort publish; real-time push must never break ingest or
+    evaluation. After a connection failure publishing pauses for
+    REALTIME_RETRY_SECONDS instead of paying the connect timeout every call.
+    """
+    global _publisher, _publisher_down_until
+    if not settings.REALTIME_ENABLED or time.monotonic() < _publisher_down_until:
+        return False
+    import redis  # imported on first use: workers that never publish skip loading it
+
+    try:
+        if _publisher is None:
+            _publisher = redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=1, socket_timeout=1)
+        _publisher.publish(channel, json.dumps(payload, cls=DjangoJSONEncoder))
+        return True
+    except redis.RedisError as e:
+        _publisher_down_until = time.monotonic() + settings.REALTIME_RETRY_SECONDS
+        logger.warning(f"Real-time publish to {channel} failed: {e}")
+        return False
+
+
+def publish_price(ticker, price, timestamp):
+    return publish(price_channel(ticker), {'ticker': ticker, 'price': price, 'timestamp': timestamp})
+
+
+def publish_trigger(alert, trigger):
+    return publish(trigger_channel(alert.user_id), {
+        'alert': alert.id,
+        'trigger': trigger.id if trigger else None,
+        'ticker': alert.stock.ticker,
+        'price': trigger.price if trigger else alert.last_price,
+        'message': trigger.message if trigger else '',
+        'triggered_at': trigger.triggered_at if trigger else None,
+    })
+
+
+class Hub:
+    """One Redis pub/sub connection per event loop, fanned out to client queues."""
+
+    def __init__(self):
+        self._queues = defaultdict(set)
+        self._pubsub = None
+        self._reader = None
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, channels):
+        queue = asyncio.Queue(maxsize=settings.REALTIME_QUEUE_SIZE)
+        async with self._lock:
+            if self._pubsub is None:
+                import redis.asyncio as aioredis
+
+                client = aioredis.Redis.from_url(settings.REDIS_URL)
+                self._pubsub = client.pubsub()
+            new = [channel for channel in channels if not self._queues[channel]]
+            if new:
+                await self._pubsub.subscribe(*new)  # raises before the queue is registered
+            for channel in channels:
+                self._queues[channel].add(queue)
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+        return queue
+
+    async def unsubscribe(self, queue, channels):
+        async with self._lock:
+            empty = []
+            for channel in channels:
+                self._queues[channel].discard(queue)
+                if not self._queues[channel]:
+                    del self._queues[channel]
+                    empty.append(channel)
+            if empty and self._pubsub is not None:
+                await self._pubsub.unsubscribe(*empty)
+
+    async def _read(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except Exception:
+                logger.exception("Real-time hub lost its Redis connection")
+                await asyncio.sleep(settings.REALTIME_RETRY_SECONDS)
+                continue
+            if message is None:
+                continue
+            channel = message['channel'].decode()
+            for queue in list(self._queues.get(channel, ())):
+                if queue.full():
+                    # slow client: drop its oldest message rather than block everyone
+                    queue.get_nowait()
+                queue.put_nowait((channel, message['data'].decode()))
+
+
+_hubs = {}
+
+
+def get_hub():
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = Hub()
+    return hub
+
+
+def format_event(channel, data):
+    event = channel.split(':', 1)[0].rstrip('s')  # prices:AAPL -> price, triggers:7 -> trigger
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def stream_events(queue, alert_ids=None, heartbeat=None):
+    """
+    Yield SSE frames from ``queue``; trigger events are limited to
+    ``alert_ids`` when given. A comment line is sent every ``heartbeat``
+    seconds so proxies keep idle connections open.
+    """
+    heartbeat = heartbeat or settings.REALTIME_HEARTBEAT_SECONDS
+    while True:
+        try:
+            channel, data = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+        except asyncio.TimeoutError:
+            yield ": keep-alive\n\n"
+            continue
+        if alert_ids and channel.startswith('triggers:') and json.loads(data).get('alert') not in alert_ids:
+            continue
+        yield format_event(channel, data)
+
+
+def _authenticated_user_id(request):
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    token = request.GET.get('token')
+    if not token:
+        return None
+    try:
+        return AccessToken(token)[api_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+
+
+async def event_stream(request):
+    """
+    GET /api/stream/?tickers=AAPL,MSFT[&token=<access token>[&alerts=1,2]]
+
+    Streams ``price`` events for the requested tickers and, for a valid JWT,
+    ``trigger`` events for the token owner's alerts (optionally only the
+    listed alert ids).
+    """
+    tickers = [t.strip().upper() for t in request.GET.get('tickers', '').split(',') if t.strip()]
+    if len(tickers) > settings.REALTIME_MAX_TICKERS:
+        return JsonResponse({'tickers': f"At most {settings.REALTIME_MAX_TICKERS} tickers per stream."}, status=400)
+    channels = [price_channel(ticker) for ticker in tickers]
+
+    alert_ids = None
+    if request.GET.get('token'):
+        user_id = _authenticated_user_id(request)
+        if user_id is None:
+            return JsonResponse({'detail': 'Token is invalid or expired'}, status=401)
+        channels.append(trigger_channel(user_id))
+        try:
+            alert_ids = {int(a) for a in request.GET.get('alerts', '').split(',') if a.strip()}
+        except ValueError:
+            return JsonResponse({'alerts': 'Expected comma separated alert ids.'}, status=400)
+    if not channels:
+        return JsonResponse({'detail': 'Subscribe to at least one ticker or pass a token.'}, status=400)
+
+    from redis.exceptions import RedisError
+
+    hub = get_hub()
+    try:
+        queue = await hub.subscribe(channels)
+    except (RedisError, OSError) as e:
+        logger.warning(f"Real-time subscribe failed: {e}")
+        response = JsonResponse({'detail': 'Real-time updates are temporarily unavailable.'}, status=503)
+        response['Retry-After'] = str(settings.REALTIME_RETRY_SECONDS)
+        return response
+
+    async def frames():
+        try:
+            yield ": connected\n\n"
+            async for frame in stream_events(queue, alert_ids):
+                yield frame
+        finally:
+            await hub.unsubscribe(queue, channels)
+
+    response = StreamingHttpResponse(frames(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
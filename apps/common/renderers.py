@@ -0,0 +1,30 @@
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_fallback = JSONEncoder()
+
+
+def _default(obj):
+    # Decimal, datetime, lazy strings, etc. are encoded exactly as DRF's
+    # JSONRenderer would, so switching renderers doesn't change any payload.
+    return _fallback.default(obj)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer backed by orjson.
+
+    Output is compact UTF-8, like JSONRenderer's non-browsable default.
+    Datetimes are passed through to DRF's encoder so they keep DRF's
+    ``Z`` suffix format.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_default, option=self.options)
@@ -0,0 +1,97 @@
+import time
+
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from apps.common.cache import redis_client
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+def parse_rate(rate):
+    """'120/min' -> (120, 60), like DRF's SimpleRateThrottle."""
+    num, period = rate.split('/')
+    return int(num), DURATIONS[period[0]]
+
+
+def endpoint_class(request, view):
+    """
+    Budget a request is charged to: the view's ``throttle_scope`` if set
+    (e.g. 'auth'), 'bulk' for ``bulk_*`` actions, otherwise 'read' or 'write'
+    by HTTP method.
+    """
+    scope = getattr(view, 'throttle_scope', None)
+    if scope:
+        return scope
+    if (getattr(view, 'action', None) or '').startswith('bulk_'):
+        return 'bulk'
+    return 'read' if request.method in SAFE_METHODS else 'write'
+
+
+def increment(counters):
+    """Atomically bump ``(key, ttl)`` counters; returns the new values."""
+    # with Redis, each counter costs a pipelined INCR + EXPIRE instead of
+    # Django's EXISTS + INCR
+    client = redis_client()
+    if client is not None:
+        pipe = client.pipeline(transaction=False)
+        for key, ttl in counters:
+            pipe.incr(key)
+            pipe.expire(key, ttl, nx=True)
+        return pipe.execute()[::2]
+
+    values = []
+    for key, ttl in counters:
+        if cache.add(key, 1, ttl):
+            values.append(1)
+            continue
+        try:
+            values.append(cache.incr(key))
+        except ValueError:  # expired between add() and incr()
+            cache.set(key, 1, ttl)
+            values.append(1)
+    return values
+
+
+class EndpointClassThrottle(BaseThrottle):
+    """
+    Fixed-window request budgets per endpoint class (see ``endpoint_class``),
+    counted separately per client IP and per authenticated user.
+
+    Rates come from DEFAULT_THROTTLE_RATES as ``<class>_ip`` and
+    ``<class>_user``; a missing rate means no limit. Both counters are
+    bumped in a single Redis round trip. Rejected requests get a 429 with
+    Retry-After set to the end of the exhausted window.
+    """
+
+    def allow_request(self, request, view):
+        scope = endpoint_class(request, view)
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        subjects = [('ip', self.get_ident(request))]
+        if request.user and request.user.is_authenticated:
+            subjects.append(('user', request.user.pk))
+
+        now = int(time.time())
+        limits = []
+        counters = []
+        for subject, ident in subjects:
+            rate = rates.get(f"{scope}_{subject}")
+            if not rate:
+                continue
+            num_requests, duration = parse_rate(rate)
+            window_start = now - now % duration
+            limits.append((num_requests, window_start + duration - now))
+            counters.append((f"throttle:{scope}:{subject}:{ident}:{window_start}", duration))
+        if not counters:
+            return True
+
+        self.retry_after = None
+        for count, (num_requests, remaining) in zip(increment(counters), limits):
+            if count > num_requests:
+                self.retry_after = max(self.retry_after or 0, remaining)
+        return self.retry_after is None
+
+    def wait(self):
+        return self.retry_after
@@ -0,0 +1,95 @@
+"""
+Price-to-notification latency tracing.
+
+A ``PriceTrace`` is started when a quote arrives (fetched from the provider
+or posted to the API) and stamped once its snapshot is written. It travels
+with the evaluation, in a context variable within a process and as task
+arguments across Celery, and every trigger it causes records its
+timestamps. The outbox dispatcher stamps ``notified_at`` on first delivery,
+so each trigger carries the time spent in every stage.
+"""
+import contextvars
+import math
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.utils import timezone
+
+# (stage, started at, finished at) on AlertTrigger
+STAGES = (
+    ('write', 'quote_received_at', 'snapshot_written_at'),
+    ('evaluate', 'snapshot_written_at', 'evaluated_at'),
+    ('notify', 'evaluated_at', 'notified_at'),
+    ('total', 'quote_received_at', 'notified_at'),
+)
+TRACE_FIELDS = ('quote_received_at', 'snapshot_written_at', 'evaluated_at', 'notified_at')
+PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclass
+class PriceTrace:
+    quote_received_at: datetime
+    snapshot_written_at: datetime = None
+
+    @classmethod
+    def start(cls):
+        return cls(quote_received_at=timezone.now())
+
+    def written(self):
+        self.snapshot_written_at = timezone.now()
+        return self
+
+    def as_dict(self):
+        """JSON-safe form, for task arguments."""
+        return {name: value.isoformat() for name, value in vars(self).items() if value is not None}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: datetime.fromisoformat(value) for name, value in data.items()})
+
+
+_current = contextvars.ContextVar('price_trace', default=None)
+
+
+@contextmanager
+def price_trace(trace):
+    """Make ``trace`` the current trace for triggers created in this block."""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def current_trace():
+    return _current.get()
+
+
+def trigger_trace_fields(evaluated_at):
+    """Trace timestamps for a new AlertTrigger evaluated at ``evaluated_at``."""
+    trace = current_trace()
+    fields = {'evaluated_at': evaluated_at}
+    if trace is not None:
+        fields.update(quote_received_at=trace.quote_received_at, snapshot_written_at=trace.snapshot_written_at)
+    return fields
+
+
+def stage_seconds(timestamps):
+    """{stage: seconds} for the stages both ends of which are recorded."""
+    durations = {}
+    for stage, start, end in STAGES:
+        if timestamps.get(start) and timestamps.get(end):
+            durations[stage] = (timestamps[end] - timestamps[start]).total_seconds()
+    return durations
+
+
+def summarize(values):
+    """Count, nearest-rank percentiles and max of ``values`` (seconds)."""
+    values = sorted(values)
+    summary = {'count': len(values)}
+    for percentile in PERCENTILES:
+        rank = max(math.ceil(percentile / 100 * len(values)), 1)
+        summary[f"p{percentile}"] = round(values[rank - 1], 3) if values else None
+    summary['max'] = round(values[-1], 3) if values else None
+    return summary
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Stock , PriceSnapshot
+from .models import Stock , PriceSnapshot, PriceBar
 # Register your models here.
 
 class StockAdmin(admin.ModelAdmin):
@@ -11,5 +11,11 @@ class PriceSnapshotAdmin(admin.ModelAdmin):
     list_filter = ('stock',)
     ordering = ('-timestamp',)
 
+class PriceBarAdmin(admin.ModelAdmin):
+    list_display = ('stock', 'resolution', 'bucket_start', 'open', 'high', 'low', 'close', 'count')
+    list_filter = ('resolution', 'stock')
+    ordering = ('-bucket_start',)
+
 admin.site.register(Stock, StockAdmin)
-admin.site.register(PriceSnapshot, PriceSnapshotAdmin)  
+admin.site.register(PriceSnapshot, PriceSnapshotAdmin)
+admin.site.register(PriceBar, PriceBarAdmin)
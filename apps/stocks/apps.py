@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class StocksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.stocks'
+
+    def ready(self):
+        from apps.common.cache import shared_cache_check
+
+        checks.register(shared_cache_check, checks.Tags.caches)
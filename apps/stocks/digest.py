@@ -0,0 +1,98 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.html import escape
+
+# Placeholders rendered into the shared body and swapped per user. They only
+# contain characters that HTML autoescaping leaves untouched.
+USERNAME_SLOT = "%%DIGEST_USERNAME%%"
+ROWS_SLOT = "%%DIGEST_ROWS%%"
+
+DEFAULT_HTML_TEMPLATE = 'stocks/digest/body.html'
+DEFAULT_ROW_TEMPLATE = 'stocks/digest/row.html'
+
+
+@lru_cache(maxsize=None)
+def _compiled_template(name):
+    """
+    Resolve a template once per process; Django's cached loader keeps the
+    compiled nodelist so later renders skip lookup and parsing.
+    """
+    return get_template(name)
+
+
+def _price_display(price):
+    return f"${price}" if price != 'N/A' else 'N/A'
+
+
+def _split_slots(content, *slots):
+    parts = []
+    for slot in slots:
+        head, sep, content = content.partition(slot)
+        if not sep:
+            raise ValueError(f"Digest template is missing the {slot} placeholder")
+        parts.append(head)
+    parts.append(content)
+    return parts
+
+
+class DigestRenderer:
+    """
+    Render the price digest for many users from a single ``stock_data`` list.
+
+    Everything that is identical for every recipient (each stock row, the
+    report date and the surrounding markup) is rendered once when the renderer
+    is built. Per user, ``render_html``/``render_text`` splice in the username
+    and the rows of that user's watchlist; the joined rows are memoised per
+    distinct watchlist, since many users follow the same set of tickers.
+    """
+
+    def __init__(self, stock_data, generated_at=None, html_template=None):
+        generated_at = generated_at or timezone.now()
+        html_template = html_template or getattr(settings, 'DIGEST_HTML_TEMPLATE', DEFAULT_HTML_TEMPLATE)
+
+        row_template = _compiled_template(DEFAULT_ROW_TEMPLATE)
+        self._html_rows = {
+            stock['ticker']: row_template.render({
+                'ticker': stock['ticker'],
+                'price_display': _price_display(stock['price']),
+            })
+            for stock in stock_data
+        }
+        body = _compiled_template(html_template).render({
+            'username': USERNAME_SLOT,
+            'rows': ROWS_SLOT,
+            'generated_on': generated_at.strftime('%B %d, %Y'),
+        })
+        self._html_parts = _split_slots(body, USERNAME_SLOT, ROWS_SLOT)
+
+        self._text_rows = {
+            stock['ticker']: f"{stock['ticker']:10} : {_price_display(stock['price'])}\n"
+            for stock in stock_data
+        }
+        self._text_parts = (
+            "Hello ",
+            ",\n\nHere are the latest stock prices from your watchlist:\n\n"
+            "========================================\n",
+            "\nReport generated on: " + generated_at.strftime('%B %d, %Y at %I:%M %p')
+            + "\n\nBest regards,\nStock Alerting System\n",
+        )
+        self._joined_rows = {}
+
+    def _rows(self, kind, rows, tickers):
+        key = (kind, None if tickers is None else frozenset(tickers))
+        joined = self._joined_rows.get(key)
+        if joined is None:
+            joined = "".join(row for ticker, row in rows.items() if key[1] is None or ticker in key[1])
+            self._joined_rows[key] = joined
+        return joined
+
+    def render_html(self, username, tickers=None):
+        head, middle, tail = self._html_parts
+        return head + escape(username) + middle + self._rows('html', self._html_rows, tickers) + tail
+
+    def render_text(self, username, tickers=None):
+        head, middle, tail = self._text_parts
+        return head + username + middle + self._rows('text', self._text_rows, tickers) + tail
@@ -0,0 +1,69 @@
+"""
+Reduce price series to a bounded number of points for charting.
+
+Both reducers take rows sorted by time and stream over them once.
+"""
+from datetime import timedelta
+
+
+def ohlc(rows, start, width):
+    """
+    Re-bucket ``(timestamp, open, high, low, close)`` rows into ``width``
+    second buckets aligned on ``start``. Returns one dict per non-empty bucket.
+    """
+    buckets = []
+    current = None
+    current_index = None
+    for timestamp, open_, high, low, close in rows:
+        index = int((timestamp - start).total_seconds() // width)
+        if index != current_index:
+            current_index = index
+            current = {
+                't': start + timedelta(seconds=index * width),
+                'open': open_, 'high': high, 'low': low, 'close': close,
+            }
+            buckets.append(current)
+        else:
+            current['high'] = max(current['high'], high)
+            current['low'] = min(current['low'], low)
+            current['close'] = close
+    return buckets
+
+
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of ``(timestamp, value)``
+    points to at most ``threshold`` points, keeping the visual shape.
+    """
+    if threshold < 3:
+        raise ValueError("LTTB needs a threshold of at least 3 points")
+    count = len(points)
+    if threshold >= count:
+        return list(points)
+
+    xs = [point[0].timestamp() for point in points]
+    ys = [float(point[1]) for point in points]
+    sampled = [points[0]]
+    every = (count - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, count)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        best_area = -1.0
+        best = range_start
+        for j in range(range_start, range_end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best_area = area
+                best = j
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
@@ -0,0 +1,98 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from apps.common.cache import invalidate_stock_responses
+from apps.common.metrics import SNAPSHOT_WRITE, SNAPSHOTS_WRITTEN, timed
+from apps.common.realtime import publish_price
+from apps.common.tracing import PriceTrace
+from apps.stocks.models import PriceSnapshot, Stock
+from apps.stocks.rollups import record_snapshots
+
+logger = logging.getLogger(__name__)
+
+
+def _ticker_key(ticker):
+    return f"stock-id:{ticker}"
+
+
+def resolve_tickers(tickers):
+    """
+    Map ``tickers`` to stock ids. Ids are cached per ticker, so a batch costs
+    one cache round trip plus one query for the tickers not cached yet.
+    Unknown tickers are left out of the result.
+    """
+    tickers = set(tickers)
+    cached = cache.get_many([_ticker_key(ticker) for ticker in tickers])
+    ids = {key.split(':', 1)[1]: stock_id for key, stock_id in cached.items()}
+    missing = tickers - ids.keys()
+    if missing:
+        found = dict(Stock.objects.filter(ticker__in=missing).values_list('ticker', 'id'))
+        cache.set_many({_ticker_key(ticker): stock_id for ticker, stock_id in found.items()}, settings.STOCK_TICKER_CACHE_TIMEOUT)
+        ids.update(found)
+    return ids
+
+
+def forget_tickers(*tickers):
+    """Drop cached ids, e.g. after a stock is renamed or deleted."""
+    cache.delete_many([_ticker_key(ticker) for ticker in tickers])
+
+
+def _queue_evaluation(stock_ids, trace):
+    from apps.alerts.tasks import evaluate_alerts_for_stocks
+
+    evaluate_alerts_for_stocks.delay(stock_ids, trace=trace.as_dict())
+
+
+def ingest_prices(rows, _retry=True):
+    """
+    Store ``(ticker, price, timestamp)`` rows; ``timestamp`` may be None for
+    "now". Snapshots are written with one bulk insert, folded into the price
+    bars, and a single alert evaluation task covering every touched stock is
+    queued once the transaction commits.
+
+    Returns (created snapshots, unknown tickers).
+    """
+    trace = PriceTrace.start()
+    ids = resolve_tickers(ticker for ticker, _, _ in rows)
+    now = timezone.now()
+    snapshots = []
+    unknown = set()
+    for ticker, price, timestamp in rows:
+        stock_id = ids.get(ticker)
+        if stock_id is None:
+            unknown.add(ticker)
+        else:
+            snapshots.append(PriceSnapshot(stock_id=stock_id, price=price, timestamp=timestamp or now))
+    if not snapshots:
+        return [], unknown
+
+    stock_ids = sorted({snapshot.stock_id for snapshot in snapshots})
+    try:
+        with timed(SNAPSHOT_WRITE, 'bulk'), transaction.atomic():
+            created = PriceSnapshot.objects.bulk_create(snapshots, batch_size=settings.SNAPSHOT_INGEST_BATCH_SIZE)
+            trace.written()
+            record_snapshots([(s.stock_id, s.price, s.timestamp) for s in created])
+            transaction.on_commit(lambda: _queue_evaluation(stock_ids, trace))
+    except IntegrityError:
+        # a cached id pointed at a stock deleted since; resolve again from the database
+        if not _retry:
+            raise
+        forget_tickers(*ids)
+        return ingest_prices(rows, _retry=False)
+    SNAPSHOTS_WRITTEN.labels('bulk').inc(len(created))
+    invalidate_stock_responses()
+
+    tickers = {stock_id: ticker for ticker, stock_id in ids.items()}
+    latest = {}
+    for snapshot in created:
+        current = latest.get(snapshot.stock_id)
+        if current is None or snapshot.timestamp >= current.timestamp:
+            latest[snapshot.stock_id] = snapshot
+    for stock_id, snapshot in latest.items():
+        publish_price(tickers[stock_id], snapshot.price, snapshot.timestamp)
+    logger.info(f"Ingested {len(created)} snapshots for {len(stock_ids)} stocks")
+    return created, unknown
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from apps.stocks.rollups import rebuild_price_bars
+from apps.stocks.synthetic import generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate seeded synthetic users, stocks, alerts and random-walk price history. "
+        "The same seed and arguments (and --end) always produce the same data. Existing users, "
+        "stocks and price history are kept; alerts are added on every run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--stocks', type=int, default=10)
+        parser.add_argument('--alerts', type=int, default=1000)
+        parser.add_argument('--history', type=int, default=1000, help="Snapshots per stock.")
+        parser.add_argument('--interval', type=int, default=60, help="Seconds between snapshots.")
+        parser.add_argument('--end', help="Timestamp of the last snapshot (ISO 8601, default: now).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='synthetic', help="Username prefix.")
+        parser.add_argument('--bars', action='store_true', help="Rebuild the 1m/5m/hourly/daily price bars afterwards.")
+
+    def handle(self, *args, **options):
+        end = None
+        if options['end']:
+            end = parse_datetime(options['end'])
+            if end is None or end.tzinfo is None:
+                raise CommandError("--end must be an ISO 8601 datetime with a timezone, e.g. 2025-01-01T00:00:00Z.")
+        if options['interval'] <= 0 or options['batch_size'] <= 0:
+            raise CommandError("--interval and --batch-size must be positive.")
+
+        result = generate(
+            users=options['users'],
+            stocks=options['stocks'],
+            alerts=options['alerts'],
+            history=options['history'],
+            seed=options['seed'],
+            interval=timedelta(seconds=options['interval']),
+            end=end,
+            batch_size=options['batch_size'],
+            username_prefix=options['prefix'],
+        )
+        counts = result['counts']
+        rows = sum(counts.values())
+        self.stdout.write(
+            f"Generated {counts['users']} users, {counts['stocks']} stocks, {counts['alerts']} alerts "
+            f"and {counts['snapshots']} snapshots in {result['seconds']:.1f}s "
+            f"({rows / max(result['seconds'], 0.001):,.0f} rows/s)."
+        )
+        if options['bars']:
+            total = rebuild_price_bars(result['stocks'])
+            self.stdout.write(f"Rebuilt price bars from {total} snapshots.")
+        self.stdout.write(self.style.SUCCESS("Done."))
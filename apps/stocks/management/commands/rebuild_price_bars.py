@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.stocks.models import Stock
+from apps.stocks.rollups import rebuild_price_bars
+
+
+class Command(BaseCommand):
+    help = "Recompute hourly/daily price bars from raw price snapshots."
+
+    def add_arguments(self, parser):
+        parser.add_argument('tickers', nargs='*', help="Only rebuild these tickers (default: all).")
+
+    def handle(self, *args, **options):
+        stock_ids = None
+        if options['tickers']:
+            stock_ids = list(Stock.objects.filter(ticker__in=options['tickers']).values_list('id', flat=True))
+            if not stock_ids:
+                raise CommandError("No matching stocks.")
+        total = rebuild_price_bars(stock_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt price bars from {total} snapshots."))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pricesnapshot',
+            index=models.Index(fields=['stock', '-timestamp', '-id'], name='stocks_pric_stock_i_203012_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0002_pricesnapshot_latest_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pricesnapshot',
+            index=models.Index(fields=['-timestamp', '-id'], name='stocks_pric_timesta_c16dc3_idx'),
+        ),
+    ]
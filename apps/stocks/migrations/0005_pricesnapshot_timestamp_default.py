@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0004_pricebar'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pricesnapshot',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
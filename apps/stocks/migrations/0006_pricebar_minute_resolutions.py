@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0005_pricesnapshot_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pricebar',
+            name='resolution',
+            field=models.CharField(choices=[('1m', 'Minute'), ('5m', '5 minutes'), ('1h', 'Hourly'), ('1d', 'Daily')], max_length=3),
+        ),
+    ]
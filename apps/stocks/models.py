@@ -1,12 +1,38 @@
 from django.db import models
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
 
 # Create your models here.
 
+class StockQuerySet(models.QuerySet):
+    @staticmethod
+    def _latest_snapshots():
+        return PriceSnapshot.objects.filter(stock=OuterRef('pk')).order_by('-timestamp', '-id')
+
+    def with_latest_price(self):
+        """Annotate each stock with ``latest_price`` in the same query."""
+        return self.annotate(latest_price=Subquery(self._latest_snapshots().values('price')[:1]))
+
+    def with_latest_snapshot(self):
+        """
+        Annotate each stock with its latest snapshot's ``latest_snapshot_id``,
+        ``latest_price`` and ``latest_snapshot_at`` in the same query.
+        """
+        latest = self._latest_snapshots()
+        return self.annotate(
+            latest_snapshot_id=Subquery(latest.values('id')[:1]),
+            latest_price=Subquery(latest.values('price')[:1]),
+            latest_snapshot_at=Subquery(latest.values('timestamp')[:1]),
+        )
+
+
 class Stock(models.Model):
     ticker = models.CharField(max_length=10, unique=True)
     name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = StockQuerySet.as_manager()
+
     def __str__(self):
         return self.ticker
     
@@ -14,10 +40,63 @@ class Stock(models.Model):
 class PriceSnapshot(models.Model):
     stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='snapshots')
     price = models.DecimalField(max_digits=10, decimal_places=2)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # a default rather than auto_now_add, so ingest can record the quote time
+    timestamp = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # latest-snapshot-per-stock lookups
+            models.Index(fields=['stock', '-timestamp', '-id']),
+            # cursor-paginated snapshot feed
+            models.Index(fields=['-timestamp', '-id']),
+        ]
+
+    def __str__(self):
+        return f"{self.stock.ticker} - {self.price} ({self.timestamp})"
+
+
+class PriceBar(models.Model):
+    """
+    OHLC rollup of snapshots per stock and fixed-width time bucket, kept up
+    to date on ingest (see apps.stocks.rollups) so long-range series can be
+    read at a coarser resolution than raw snapshots.
+    """
+    RESOLUTION_MINUTE = '1m'
+    RESOLUTION_5_MINUTES = '5m'
+    RESOLUTION_HOUR = '1h'
+    RESOLUTION_DAY = '1d'
+    RESOLUTION_CHOICES = [
+        (RESOLUTION_MINUTE, 'Minute'),
+        (RESOLUTION_5_MINUTES, '5 minutes'),
+        (RESOLUTION_HOUR, 'Hourly'),
+        (RESOLUTION_DAY, 'Daily'),
+    ]
+    # every width divides a day, so a day's bars can be rebuilt on their own
+    RESOLUTION_SECONDS = {
+        RESOLUTION_MINUTE: 60,
+        RESOLUTION_5_MINUTES: 60 * 5,
+        RESOLUTION_HOUR: 60 * 60,
+        RESOLUTION_DAY: 60 * 60 * 24,
+    }
+
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='bars')
+    resolution = models.CharField(max_length=3, choices=RESOLUTION_CHOICES)
+    bucket_start = models.DateTimeField()
+    open = models.DecimalField(max_digits=10, decimal_places=2)
+    high = models.DecimalField(max_digits=10, decimal_places=2)
+    low = models.DecimalField(max_digits=10, decimal_places=2)
+    close = models.DecimalField(max_digits=10, decimal_places=2)
+    # timestamps of the snapshots that set open/close, so late arrivals land correctly
+    open_at = models.DateTimeField()
+    close_at = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['bucket_start']
+        constraints = [
+            models.UniqueConstraint(fields=['stock', 'resolution', 'bucket_start'], name='unique_price_bar'),
+        ]
 
     def __str__(self):
-        return f"{self.stock.ticker} - {self.price} ({self.timestamp})"
\ No newline at end of file
+        return f"{self.stock.ticker} {self.resolution} {self.bucket_start}"
\ No newline at end of file
@@ -0,0 +1,134 @@
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+
+from apps.stocks.models import PriceBar, PriceSnapshot
+
+logger = logging.getLogger(__name__)
+
+BAR_FIELDS = ('open', 'open_at', 'high', 'low', 'close', 'close_at', 'count')
+
+
+def bucket_start(timestamp, width):
+    """Start of the ``width``-second UTC bucket containing ``timestamp``."""
+    epoch = int(timestamp.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % width, tz=dt_timezone.utc)
+
+
+def _new_bar(price, timestamp, count=1):
+    return {
+        'open': price, 'open_at': timestamp,
+        'high': price, 'low': price,
+        'close': price, 'close_at': timestamp,
+        'count': count,
+    }
+
+
+def _merge(bar, other):
+    """Fold the OHLC values of ``other`` into ``bar`` in place."""
+    if other['open_at'] < bar['open_at']:
+        bar['open'], bar['open_at'] = other['open'], other['open_at']
+    if other['close_at'] >= bar['close_at']:
+        bar['close'], bar['close_at'] = other['close'], other['close_at']
+    bar['high'] = max(bar['high'], other['high'])
+    bar['low'] = min(bar['low'], other['low'])
+    bar['count'] += other['count']
+
+
+def aggregate(snapshots):
+    """
+    Group ``(stock_id, price, timestamp)`` tuples into OHLC values keyed by
+    ``(stock_id, resolution, bucket_start)`` for every stored resolution.
+    """
+    bars = {}
+    for stock_id, price, timestamp in snapshots:
+        for resolution, width in PriceBar.RESOLUTION_SECONDS.items():
+            key = (stock_id, resolution, bucket_start(timestamp, width))
+            if key in bars:
+                _merge(bars[key], _new_bar(price, timestamp))
+            else:
+                bars[key] = _new_bar(price, timestamp)
+    return bars
+
+
+def record_snapshots(snapshots, _retry=True):
+    """
+    Fold new ``(stock_id, price, timestamp)`` snapshots into the stored bars:
+    one locking read of the affected bars, then one bulk update and one bulk
+    insert, however many snapshots are passed.
+    """
+    bars = aggregate(snapshots)
+    if not bars:
+        return 0
+    stock_ids = {key[0] for key in bars}
+    starts = {key[2] for key in bars}
+    try:
+        with transaction.atomic():
+            existing = {
+                (bar.stock_id, bar.resolution, bar.bucket_start): bar
+                for bar in PriceBar.objects.select_for_update().filter(stock_id__in=stock_ids, bucket_start__in=starts)
+            }
+            to_update = []
+            to_create = []
+            for key, values in bars.items():
+                bar = existing.get(key)
+                if bar is None:
+                    stock_id, resolution, start = key
+                    to_create.append(PriceBar(stock_id=stock_id, resolution=resolution, bucket_start=start, **values))
+                else:
+                    merged = {field: getattr(bar, field) for field in BAR_FIELDS}
+                    _merge(merged, values)
+                    for field, value in merged.items():
+                        setattr(bar, field, value)
+                    to_update.append(bar)
+            if to_update:
+                PriceBar.objects.bulk_update(to_update, BAR_FIELDS, batch_size=1000)
+            if to_create:
+                PriceBar.objects.bulk_create(to_create, batch_size=1000)
+    except IntegrityError:
+        # another writer created one of the bars first; merge into it instead
+        if not _retry:
+            raise
+        return record_snapshots(snapshots, _retry=False)
+    return len(bars)
+
+
+def refresh_bars(stock_id, timestamps):
+    """
+    Recompute one stock's bars for the days containing ``timestamps`` from
+    raw snapshots, after snapshots there were edited or deleted (merging
+    can only add prices, not take them out).
+    """
+    width = PriceBar.RESOLUTION_SECONDS[PriceBar.RESOLUTION_DAY]
+    with transaction.atomic():
+        for day in {bucket_start(timestamp, width) for timestamp in timestamps}:
+            end = day + timedelta(seconds=width)
+            PriceBar.objects.filter(stock_id=stock_id, bucket_start__gte=day, bucket_start__lt=end).delete()
+            record_snapshots(PriceSnapshot.objects.filter(
+                stock_id=stock_id, timestamp__gte=day, timestamp__lt=end,
+            ).values_list('stock_id', 'price', 'timestamp'))
+
+
+def rebuild_price_bars(stock_ids=None, chunk_size=10000):
+    """Recompute bars from raw snapshots, e.g. after a backfill."""
+    snapshots = PriceSnapshot.objects.order_by('stock_id', 'timestamp')
+    bars = PriceBar.objects.all()
+    if stock_ids:
+        snapshots = snapshots.filter(stock_id__in=stock_ids)
+        bars = bars.filter(stock_id__in=stock_ids)
+    bars.delete()
+
+    batch = []
+    total = 0
+    for row in snapshots.values_list('stock_id', 'price', 'timestamp').iterator(chunk_size=chunk_size):
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            record_snapshots(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        record_snapshots(batch)
+        total += len(batch)
+    logger.info(f"Rebuilt price bars from {total} snapshots")
+    return total
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Stock , PriceSnapshot
+from apps.common.fieldsets import SparseFieldsetSerializerMixin
 
 class PriceSnapshotSerializer(serializers.ModelSerializer):
     class Meta:
@@ -7,7 +8,17 @@ class PriceSnapshotSerializer(serializers.ModelSerializer):
         fields = ('id', 'stock', 'price', 'timestamp')
         read_only_fields = ('id', 'timestamp')
 
-class StockSerializer(serializers.ModelSerializer):
+class PriceIngestSerializer(serializers.Serializer):
+    """One record of a bulk price ingest; the ticker is resolved by the view."""
+    ticker = serializers.CharField(max_length=10)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    timestamp = serializers.DateTimeField(required=False)
+
+    def validate_ticker(self, value):
+        return value.strip().upper()
+
+
+class StockSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     latest_price_snapshot = serializers.SerializerMethodField()
 
     class Meta:
@@ -15,7 +26,18 @@ class StockSerializer(serializers.ModelSerializer):
         fields = ('id', 'ticker', 'name', 'latest_price_snapshot')
 
     def get_latest_price_snapshot(self, obj):
+        # StockViewSet annotates the latest snapshot (Stock.objects.with_latest_snapshot())
+        if hasattr(obj, 'latest_snapshot_id'):
+            if obj.latest_snapshot_id is None:
+                return None
+            snap = PriceSnapshot(
+                id=obj.latest_snapshot_id,
+                stock_id=obj.id,
+                price=obj.latest_price,
+                timestamp=obj.latest_snapshot_at,
+            )
+        else:
             snap = obj.snapshots.first()
-            if snap:
-                return PriceSnapshotSerializer(snap).data
-            return None
+        if snap:
+            return PriceSnapshotSerializer(snap).data
+        return None
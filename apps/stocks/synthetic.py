@@ -0,0 +1,201 @@
+"""
+Seeded synthetic data for benchmarks, load tests and local development.
+
+The same seed and arguments always produce the same users, stocks, alert
+definitions and price series; timestamps are laid out backwards from
+``end``. Rows are streamed into ``bulk_create`` in fixed-size batches, so
+memory stays flat however many rows are generated.
+"""
+import logging
+import math
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from apps.alerts.models import Alert
+from apps.stocks.models import PriceSnapshot, Stock
+
+logger = logging.getLogger(__name__)
+
+# the README's monitored stocks come first, then generated symbols
+KNOWN_TICKERS = ('AAPL', 'GOOGL', 'MSFT', 'TSLA', 'AMZN', 'META', 'NFLX', 'NVDA', 'AMD', 'INTC')
+
+OPERATOR_WEIGHTS = (('gt', 0.47), ('lt', 0.47), ('eq', 0.06))
+DURATION_CHOICES = ((5, 0.3), (15, 0.35), (30, 0.2), (60, 0.15))
+DURATION_ALERT_SHARE = 0.2
+INACTIVE_ALERT_SHARE = 0.1
+
+
+def ticker_symbol(index):
+    """KNOWN_TICKERS, then XAA, XAB, ... (unique, at most 10 characters)."""
+    if index < len(KNOWN_TICKERS):
+        return KNOWN_TICKERS[index]
+    index -= len(KNOWN_TICKERS)
+    letters = ''
+    while True:
+        index, rest = divmod(index, 26)
+        letters = chr(ord('A') + rest) + letters
+        if index == 0:
+            break
+    return 'X' + letters.rjust(2, 'A')
+
+
+def _insert(model, rows, batch_size, ignore_conflicts=False):
+    rows = iter(rows)
+    total = 0
+    with transaction.atomic():
+        while batch := list(islice(rows, batch_size)):
+            model.objects.bulk_create(batch, ignore_conflicts=ignore_conflicts)
+            total += len(batch)
+    return total
+
+
+def _insert_values(model, field_names, rows, batch_size):
+    """
+    Multi-row INSERTs of tuples of database-ready values. For the snapshot
+    history this skips building a model instance and preparing every value
+    through bulk_create, which dominates at tens of millions of rows.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]  # the wrapper itself, not the thread-local proxy
+    fields = [model._meta.get_field(name) for name in field_names]
+    max_params = connection.features.max_query_params or len(fields) * batch_size
+    per_statement = max(min(batch_size, max_params // len(fields)), 1)
+    placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    head = 'INSERT INTO {} ({}) VALUES '.format(
+        connection.ops.quote_name(model._meta.db_table),
+        ', '.join(connection.ops.quote_name(field.column) for field in fields),
+    )
+    rows = iter(rows)
+    total = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        while batch := list(islice(rows, per_statement)):
+            params = [value for row in batch for value in row]
+            cursor.execute(head + ', '.join([placeholders] * len(batch)), params)
+            total += len(batch)
+    return total
+
+
+def _ids(queryset, field, values, batch_size):
+    """Ids of the rows whose ``field`` is in ``values``, in ``values`` order."""
+    values = list(values)
+    found = {}
+    for start in range(0, len(values), batch_size):
+        chunk = values[start:start + batch_size]
+        found.update(queryset.filter(**{f"{field}__in": chunk}).values_list(field, 'id'))
+    return [found[value] for value in values]
+
+
+def _with_snapshots(stock_ids, batch_size):
+    """The ids among ``stock_ids`` that already have price history."""
+    found = set()
+    for start in range(0, len(stock_ids), batch_size):
+        chunk = stock_ids[start:start + batch_size]
+        found.update(Stock.objects.filter(id__in=chunk, snapshots__isnull=False).values_list('id', flat=True))
+    return found
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def _price_walk(rng, start, steps, volatility):
+    """Geometric random walk: ``steps`` prices, each a small % move from the last."""
+    price = start
+    for _ in range(steps):
+        yield price
+        price = max(price * math.exp(rng.gauss(0, volatility)), 0.01)
+
+
+def generate(users=1000, stocks=10, alerts=1000, history=100, seed=0, interval=timedelta(minutes=1),
+             end=None, batch_size=5000, username_prefix='synthetic', password='password123'):
+    """
+    Create ``users`` users, ``stocks`` stocks with ``history`` snapshots
+    each (spaced ``interval`` apart, the last at ``end``), and ``alerts``
+    alerts spread over users and, with a long-tail popularity, over stocks.
+
+    Existing users and stocks with the generated names are reused, and
+    stocks that already have snapshots get no new history. Alerts are
+    added on every run, so re-running is not idempotent. Returns the
+    counts of rows created and the stock ids.
+    """
+    rng = random.Random(seed)
+    end = end or timezone.now()
+    User = get_user_model()
+    counts = {}
+    started = time.perf_counter()
+
+    hashed = make_password(password)  # hashing is slow; every user shares one hash
+    usernames = [f"{username_prefix}{i}" for i in range(users)]
+    # ignore_conflicts hides which rows already existed: count them instead
+    before = User.objects.count()
+    _insert(User, (
+        User(username=name, email=f"{name}@example.com", password=hashed) for name in usernames
+    ), batch_size, ignore_conflicts=True)
+    counts['users'] = User.objects.count() - before
+    tickers = [ticker_symbol(i) for i in range(stocks)]
+    before = Stock.objects.count()
+    _insert(Stock, (
+        Stock(ticker=ticker, name=f"{ticker} Synthetic Corp.") for ticker in tickers
+    ), batch_size, ignore_conflicts=True)
+    counts['stocks'] = Stock.objects.count() - before
+    user_ids = _ids(User.objects.all(), 'username', usernames, batch_size)
+    stock_ids = _ids(Stock.objects.all(), 'ticker', tickers, batch_size)
+    has_history = _with_snapshots(stock_ids, batch_size)
+
+    # start prices are log-normal (median ~$60); volatility per step varies by stock
+    start_prices = [min(max(math.exp(rng.gauss(4.1, 1.0)), 1.0), 5000.0) for _ in stock_ids]
+    volatilities = [rng.uniform(0.0005, 0.003) for _ in stock_ids]
+    last_prices = []
+
+    def snapshots():
+        # every stock shares the same timestamps: adapt them for the database once
+        adapt = connections[DEFAULT_DB_ALIAS].ops.adapt_datetimefield_value
+        first_at = end - interval * (history - 1)
+        stamps = [adapt(first_at + interval * step) for step in range(history)]
+        for stock_id, start, volatility in zip(stock_ids, start_prices, volatilities):
+            # the walk is drawn either way, so the alerts that follow match a fresh run
+            price = start
+            for stamp, price in zip(stamps, _price_walk(rng, start, history, volatility)):
+                if stock_id not in has_history:
+                    yield stock_id, f"{price:.2f}", stamp
+            last_prices.append(price)
+
+    counts['snapshots'] = _insert_values(PriceSnapshot, ('stock', 'price', 'timestamp'), snapshots(), batch_size)
+
+    # a few stocks draw most of the alerts (Zipf-like popularity)
+    cum_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(stock_ids))))
+
+    def alert_rows():
+        for _ in range(alerts):
+            index = rng.choices(range(len(stock_ids)), cum_weights=cum_weights)[0]
+            price = last_prices[index]
+            operator = _weighted(rng, OPERATOR_WEIGHTS)
+            if operator == 'gt':
+                threshold = price * (1 + abs(rng.gauss(0, 0.05)))
+            elif operator == 'lt':
+                threshold = price * (1 - min(abs(rng.gauss(0, 0.05)), 0.9))
+            else:
+                threshold = round(price)
+            duration = rng.random() < DURATION_ALERT_SHARE
+            yield Alert(
+                user_id=rng.choice(user_ids),
+                stock_id=stock_ids[index],
+                alert_type='duration' if duration else 'threshold',
+                operator=operator,
+                threshold=Decimal(f"{threshold:.4f}"),
+                duration_minutes=_weighted(rng, DURATION_CHOICES) if duration else 0,
+                is_active=rng.random() >= INACTIVE_ALERT_SHARE,
+            )
+
+    counts['alerts'] = _insert(Alert, alert_rows(), batch_size) if user_ids and stock_ids else 0
+    elapsed = time.perf_counter() - started
+    logger.info(f"Generated {counts} in {elapsed:.1f}s (seed {seed})")
+    return {'counts': counts, 'stocks': stock_ids, 'seconds': elapsed}
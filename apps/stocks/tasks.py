@@ -1,14 +1,30 @@
 # apps/stocks/tasks.py
+import time
+import uuid
+from datetime import datetime
 from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
 from celery import shared_task
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Q
 from django.utils import timezone
-from django.core.mail import EmailMultiAlternatives
-import httpx
+from django.core.mail import EmailMultiAlternatives, get_connection
 import random
 import logging
 from apps.stocks.models import Stock, PriceSnapshot
+from apps.alerts.models import Alert
 from apps.alerts.utils import evaluate_alerts_for_stock
+from apps.stocks.digest import DigestRenderer
+from apps.stocks.rollups import record_snapshots
+from apps.common.cache import invalidate_stock_responses
+from apps.common.metrics import (
+    DIGEST_EMAILS, DIGEST_THROUGHPUT, PROVIDER_LATENCY, SNAPSHOT_WRITE, SNAPSHOTS_WRITTEN, observe_evaluation, timed,
+)
+from apps.common.leases import Lease, record_schedule_lag, single_flight, skip_run
+from apps.common.realtime import publish_price
+from apps.common.tracing import PriceTrace, price_trace
 from django.contrib.auth import get_user_model
 
 logger = logging.getLogger(__name__)
@@ -16,7 +32,12 @@ logger = logging.getLogger(__name__)
 FMP_URL = "https://financialmodelingprep.com/api/v3/quote-short/{ticker}?apikey={apikey}"
 
 @shared_task(bind=True, ignore_result=True)
+@single_flight()
 def fetch_stock_prices(self):
+    # task modules import their heavier dependencies when they first run, so
+    # worker processes boot without them (see benchmarks/startup.py)
+    import httpx
+
     logger.info("=== FETCH_STOCK_PRICES TASK STARTED ===")
     
     apikey = getattr(settings, 'FMP_API_KEY', "") or getattr(settings, "TWELVE_API_KEY", "")
@@ -26,6 +47,9 @@ def fetch_stock_prices(self):
     logger.info(f"Found {stocks.count()} stocks to process")
     
     result = []
+    written = []
+    alerts_evaluated = 0
+    alerts_fired = 0
     client_timeout = httpx.Timeout(10.0, read=10.0)
     
     for stock in stocks:
@@ -34,18 +58,25 @@ def fetch_stock_prices(self):
         try:
             if apikey:
                 url = FMP_URL.format(ticker=stock.ticker, apikey=apikey)
-                with httpx.Client(timeout=client_timeout) as client:
-                    response = client.get(url)
-                    response.raise_for_status()
-                    data = response.json()
-                    if isinstance(data, list) and len(data) > 0 and 'price' in data[0]:
-                        price = Decimal(str(data[0]['price']))
-                    else:
-                        logger.warning(f"No price in response for {stock.ticker}: {data}")
+                started = time.perf_counter()
+                outcome = 'error'
+                try:
+                    with httpx.Client(timeout=client_timeout) as client:
+                        response = client.get(url)
+                        response.raise_for_status()
+                        data = response.json()
+                    outcome = 'ok'
+                finally:
+                    PROVIDER_LATENCY.labels(stock.ticker, outcome).observe(time.perf_counter() - started)
+                if isinstance(data, list) and len(data) > 0 and 'price' in data[0]:
+                    price = Decimal(str(data[0]['price']))
+                else:
+                    logger.warning(f"No price in response for {stock.ticker}: {data}")
             else:
                 # mock price when API key is not available
                 price = Decimal(str(round(random.uniform(10, 1000), 2)))
                 logger.info(f"Using mock price for {stock.ticker}: {price}")
+            trace = PriceTrace.start()
         except Exception as e:
             logger.exception(f"Error fetching price for {stock.ticker}")
             result.append({"ticker": stock.ticker, "error": str(e)})
@@ -53,17 +84,25 @@ def fetch_stock_prices(self):
 
         if price is not None:
             try:
-                snap = PriceSnapshot.objects.create(
-                    stock=stock,
-                    price=price,
-                    timestamp=timezone.now()
-                )
+                with timed(SNAPSHOT_WRITE, 'fetch'):
+                    snap = PriceSnapshot.objects.create(
+                        stock=stock,
+                        price=price,
+                        timestamp=timezone.now()
+                    )
+                trace.written()
+                SNAPSHOTS_WRITTEN.labels('fetch').inc()
                 logger.info(f"Created price snapshot for {stock.ticker}: {price}")
+                written.append((stock.id, snap.price, snap.timestamp))
+                publish_price(stock.ticker, snap.price, snap.timestamp)
                 result.append({"ticker": stock.ticker, "price": str(price)})
 
                 # Evaluate alerts for this stock — pass stock.id (int)
                 try:
-                    evaluate_alerts_for_stock(stock.id)
+                    with price_trace(trace):
+                        checked, fired = evaluate_alerts_for_stock(stock.id)
+                    alerts_evaluated += checked
+                    alerts_fired += fired
                     logger.info(f"Evaluated alerts for {stock.ticker}")
                 except Exception:
                     logger.exception(f"Error evaluating alerts for {stock.ticker}")
@@ -73,121 +112,216 @@ def fetch_stock_prices(self):
         else:
             result.append({"ticker": stock.ticker, "skipped": True})
 
+    if written:
+        try:
+            record_snapshots(written)
+        except Exception:
+            logger.exception("Error updating price bars")
+        invalidate_stock_responses()
+    observe_evaluation(alerts_evaluated, alerts_fired)
+
     logger.info(f"=== FETCH_STOCK_PRICES TASK COMPLETED. Processed {len(result)} stocks ===")
     return {"fetched": result}
 
 
-def generate_stock_digest_html(username, stock_data):
-    stock_rows = ""
-    for stock in stock_data:
-        price_display = f"${stock['price']}" if stock['price'] != 'N/A' else 'N/A'
-        stock_rows += f"""
-        <tr>
-            <td style="padding: 12px; border-bottom: 1px solid #e0e0e0; font-weight: 600; color: #2c3e50;">
-                {stock['ticker']}
-            </td>
-            <td style="padding: 12px; border-bottom: 1px solid #e0e0e0; text-align: right; color: #27ae60; font-weight: 600;">
-                {price_display}
-            </td>
-        </tr>
-        """
-
-    html_template = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head><meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Daily Stock Digest</title></head>
-    <body style="font-family: Arial, sans-serif; background:#f8f9fa; margin:0; padding:20px;">
-    <div style="max-width:600px; margin:0 auto; background:#fff; padding:0; border-radius:6px; overflow:hidden;">
-      <div style="background:#34495e; padding:20px; color:#fff; text-align:center;">
-        <h2 style="margin:0;">Daily Stock Digest</h2>
-        <p style="margin:0;">{timezone.now().strftime('%B %d, %Y')}</p>
-      </div>
-      <div style="padding:20px;">
-        <p>Hello <strong>{username}</strong>,</p>
-        <p>Here are the latest stock prices from your watchlist:</p>
-        <table style="width:100%; border-collapse:collapse;">
-          <thead><tr style="background:#2c3e50; color:#fff;">
-            <th style="text-align:left; padding:10px;">Stock Symbol</th>
-            <th style="text-align:right; padding:10px;">Current Price</th>
-          </tr></thead>
-          <tbody>
-            {stock_rows}
-          </tbody>
-        </table>
-        <p style="margin-top:20px;">Best regards,<br>Stock Alerting System</p>
-      </div>
-    </div>
-    </body></html>
+def _digest_recipients():
+    """Active users with an email address and at least one active alert."""
+    User = get_user_model()
+    watching = Alert.objects.filter(user=OuterRef('pk'), is_active=True)
+    return User.objects.filter(Exists(watching), is_active=True, email__isnull=False).exclude(email='')
+
+
+def _digest_watchlists(first_id, last_id, resume_after=0, retry_ids=()):
     """
-    return html_template
+    One query for a whole chunk: (user_id, username, email, ticker) for every
+    stock each user has an active alert on, ordered so rows group by user.
+    Only users after ``resume_after``, or listed in ``retry_ids``, are included.
+    """
+    return (
+        Alert.objects.filter(
+            Q(user_id__gt=resume_after) | Q(user_id__in=retry_ids),
+            is_active=True,
+            user_id__gte=first_id,
+            user_id__lte=last_id,
+            user__is_active=True,
+            user__email__isnull=False,
+        )
+        .exclude(user__email='')
+        .values_list('user_id', 'user__username', 'user__email', 'stock__ticker')
+        .distinct()
+        .order_by('user_id', 'stock__ticker')
+    )
 
 
-def generate_stock_digest_text(username, stock_data):
-    text_content = f"Hello {username},\n\nHere are the latest stock prices from your watchlist:\n\n"
-    text_content += "========================================\n"
-    for stock in stock_data:
-        price_display = f"${stock['price']}" if stock['price'] != 'N/A' else 'N/A'
-        text_content += f"{stock['ticker']:10} : {price_display}\n"
-    text_content += "\nReport generated on: " + timezone.now().strftime('%B %d, %Y at %I:%M %p') + "\n\nBest regards,\nStock Alerting System\n"
-    return text_content
+def _digest_id_ranges(queryset, chunk_size):
+    """
+    Yield (first_id, last_id) ranges of at most ``chunk_size`` rows using
+    keyset pagination, so no page ever needs an OFFSET scan or a full load.
+    """
+    last_id = 0
+    while True:
+        ids = list(
+            queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return
+        yield ids[0], ids[-1]
+        last_id = ids[-1]
+
+
+def _digest_checkpoint_key(run_id, first_id):
+    return f"digest:{run_id}:{first_id}"
+
+
+def _digest_pending_key(run_id):
+    return f"digest:{run_id}:pending"
+
+
+def _digest_chunk_done(run_id, first_id, lease):
+    """
+    Count a chunk of the run as finished, once even if its message is
+    redelivered, and release the run's lease after the last one.
+    """
+    if not cache.add(f"{_digest_checkpoint_key(run_id, first_id)}:done", True, settings.DIGEST_CHECKPOINT_TTL):
+        return  # a redelivered chunk that was already counted
+    try:
+        remaining = cache.decr(_digest_pending_key(run_id))
+    except ValueError:  # count expired; the lease expires on its own
+        return
+    if remaining <= 0:
+        lease.release()
+        cache.delete(_digest_pending_key(run_id))
 
 
 @shared_task(bind=True, ignore_result=True)
 def send_price_digest(self):
+    """
+    Fan the digest out into chunk subtasks over user id ranges.
+    Latest prices are read once here, in one query, and shipped to every chunk.
+
+    A run holds a short lease (DIGEST_LEASE_SECONDS) that its chunks extend
+    while they run and the last one to finish releases, so a run fired while
+    the previous one is still sending is skipped, and a run whose workers
+    died frees the schedule within one TTL.
+    """
+    record_schedule_lag(self)
+    lease = Lease(self.name, settings.DIGEST_LEASE_SECONDS)
+    if not lease.acquire():
+        return skip_run(self, lease)
     logger.info("=== SEND_PRICE_DIGEST TASK STARTED ===")
-    
-    User = get_user_model()
-    users = User.objects.filter(is_active=True, email__isnull=False).exclude(email='')
-    logger.info(f"Found {users.count()} active users with email addresses")
-    
-    if users.count() == 0:
-        logger.warning("No users found with email addresses!")
+
+    try:
+        stock_data = [
+            {'ticker': ticker, 'price': f"{price:.2f}" if price is not None else 'N/A'}
+            for ticker, price in Stock.objects.with_latest_price().order_by('ticker').values_list('ticker', 'latest_price')
+        ]
+        ranges = list(_digest_id_ranges(_digest_recipients(), settings.DIGEST_CHUNK_SIZE))
+    except Exception:
+        lease.release()
+        raise
+    logger.info(f"Prepared digest data for {len(stock_data)} stocks")
+
+    run_id = self.request.id or uuid.uuid4().hex
+    generated_at = timezone.now().isoformat()
+    chunks = len(ranges)
+    if chunks == 0:
+        lease.release()
+        logger.warning("No users with email addresses and active alerts found!")
         return {"status": "no_users"}
 
-    stocks = Stock.objects.all()
-    logger.info(f"Found {stocks.count()} stocks for digest")
-    
-    # Prepare stock data
-    stock_data = []
-    for stock in stocks:
-        snap = stock.snapshots.first()
-        price = str(snap.price) if snap else 'N/A'
-        stock_data.append({'ticker': stock.ticker, 'price': price})
-        logger.info(f"Stock {stock.ticker}: {price}")
+    cache.set(_digest_pending_key(run_id), chunks, settings.DIGEST_CHECKPOINT_TTL)
+    for first_id, last_id in ranges:
+        # routed to the dedicated digest queue via CELERY_TASK_ROUTES
+        send_price_digest_chunk.apply_async(
+            args=(run_id, first_id, last_id, stock_data, generated_at),
+            kwargs={'lease_token': lease.token},
+        )
+
+    logger.info(f"=== SEND_PRICE_DIGEST TASK COMPLETED. Dispatched {chunks} chunks (run {run_id}) ===")
+    return {"run_id": run_id, "chunks": chunks}
+
+
+@shared_task(bind=True, ignore_result=True, acks_late=True, reject_on_worker_lost=True)
+def send_price_digest_chunk(self, run_id, first_id, last_id, stock_data, generated_at, lease_token=None):
+    """
+    Send the digest to active users with ids in [first_id, last_id], each
+    listing only the stocks that user has active alerts on.
 
+    Progress is checkpointed in the cache after each email; if the worker dies
+    the message is redelivered (acks_late) and the chunk resumes after the last
+    user it reached instead of sending duplicates, retrying only the users
+    whose send failed. While it runs the chunk
+    heartbeats the run's lease (``lease_token``); the last chunk of a run to
+    finish, successfully or not, releases it.
+    """
+    lease = None
+    if lease_token:
+        lease = Lease(send_price_digest.name, settings.DIGEST_LEASE_SECONDS, token=lease_token)
+        if not lease.extend():
+            logger.warning(f"Digest run {run_id} lost its lease before chunk {first_id}-{last_id}; runs may overlap")
+        lease.start_heartbeat()
+    try:
+        return _send_digest_chunk(run_id, first_id, last_id, stock_data, generated_at)
+    finally:
+        if lease is not None:
+            lease.stop_heartbeat()
+            _digest_chunk_done(run_id, first_id, lease)
+
+
+def _send_digest_chunk(run_id, first_id, last_id, stock_data, generated_at):
+    checkpoint_key = _digest_checkpoint_key(run_id, first_id)
+    failed_key = f"{checkpoint_key}:failed"
+    resume_after = cache.get(checkpoint_key, 0)
+    # users passed over because their send failed; a redelivered chunk retries them
+    failed_ids = set(cache.get(failed_key, ()))
+    rows = _digest_watchlists(first_id, last_id, resume_after, failed_ids).iterator(
+        chunk_size=settings.DIGEST_ITERATOR_CHUNK_SIZE
+    )
+    if resume_after:
+        logger.info(f"Resuming digest chunk {first_id}-{last_id} after user {resume_after}, retrying {len(failed_ids)}")
+
+    renderer = DigestRenderer(stock_data, generated_at=datetime.fromisoformat(generated_at))
     emails_sent = 0
     emails_failed = 0
-    
-    for user in users:
-        logger.info(f"Preparing email for user: {user.username} ({user.email})")
-        
-        try:
-            subject = "Daily Stock Price Digest"
-            html_content = generate_stock_digest_html(user.username, stock_data)
-            text_content = generate_stock_digest_text(user.username, stock_data)
-            
-            logger.info(f"Attempting to send email to {user.email}")
-            logger.info(f"Email settings - FROM: {settings.DEFAULT_FROM_EMAIL}")
-            
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[user.email]
-            )
-            email.attach_alternative(html_content, "text/html")
-            send_result = email.send()
-            logger.info(f"Email send result for {user.email}: {send_result}")
-            if send_result:
+    started = time.perf_counter()
+
+    # One SMTP session for the whole chunk instead of one per recipient
+    connection = get_connection()
+    with connection:
+        for (user_id, username, email_address), watchlist in groupby(rows, key=itemgetter(0, 1, 2)):
+            tickers = [row[3] for row in watchlist]
+            sent = False
+            try:
+                email = EmailMultiAlternatives(
+                    subject="Daily Stock Price Digest",
+                    body=renderer.render_text(username, tickers),
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[email_address],
+                    connection=connection,
+                )
+                email.attach_alternative(renderer.render_html(username, tickers), "text/html")
+                sent = bool(email.send())
+                if not sent:
+                    logger.error(f"EmailBackend reported failure sending to {email_address}")
+            except Exception:
+                logger.exception(f"❌ Email send failed for {email_address}")
+            if sent:
                 emails_sent += 1
+                if user_id in failed_ids:
+                    failed_ids.discard(user_id)
+                    cache.set(failed_key, sorted(failed_ids), settings.DIGEST_CHECKPOINT_TTL)
             else:
                 emails_failed += 1
-                logger.error(f"EmailBackend reported failure sending to {user.email}")
-            
-        except Exception:
-            logger.exception(f"❌ Email send failed for {user.email}")
-            emails_failed += 1
+                failed_ids.add(user_id)
+                cache.set(failed_key, sorted(failed_ids), settings.DIGEST_CHECKPOINT_TTL)
+            if user_id > resume_after:
+                resume_after = user_id
+                cache.set(checkpoint_key, user_id, settings.DIGEST_CHECKPOINT_TTL)
 
-    logger.info(f"=== SEND_PRICE_DIGEST TASK COMPLETED. Sent: {emails_sent}, Failed: {emails_failed} ===")
+    elapsed = time.perf_counter() - started
+    DIGEST_EMAILS.labels('sent').inc(emails_sent)
+    DIGEST_EMAILS.labels('failed').inc(emails_failed)
+    if emails_sent and elapsed > 0:
+        DIGEST_THROUGHPUT.observe(emails_sent / elapsed)
+    logger.info(f"Digest chunk {first_id}-{last_id} done. Sent: {emails_sent}, Failed: {emails_failed}")
     return {"emails_sent": emails_sent, "emails_failed": emails_failed}
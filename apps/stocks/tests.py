@@ -1,3 +1,573 @@
-from django.test import TestCase
+# apps/stocks/tests.py
+import gzip
+import time
+import json
+import pytest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from freezegun import freeze_time
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.alerts.models import Alert
+from apps.stocks import digest
+from apps.stocks.downsampling import lttb
+from apps.stocks.models import Stock, PriceSnapshot, PriceBar
+from apps.stocks.rollups import record_snapshots
+from apps.stocks.digest import DigestRenderer
+from apps.stocks.tasks import _digest_checkpoint_key, send_price_digest, send_price_digest_chunk
+
+
+STOCK_DATA = [
+    {'ticker': 'AAPL', 'price': '190.12'},
+    {'ticker': 'MSFT', 'price': 'N/A'},
+]
+
+
+def test_digest_renderer_fills_per_user_fields():
+    renderer = DigestRenderer(STOCK_DATA, generated_at=datetime(2025, 8, 12, 9, 30, tzinfo=dt_timezone.utc))
+
+    html = renderer.render_html('alice')
+    text = renderer.render_text('alice')
+
+    assert 'Hello <strong>alice</strong>' in html
+    assert '$190.12' in html and 'N/A' in html
+    assert 'August 12, 2025' in html
+    assert text.startswith('Hello alice,\n')
+    assert 'AAPL       : $190.12' in text
+    assert 'Report generated on: August 12, 2025 at 09:30 AM' in text
+
+
+def test_digest_renderer_escapes_username_in_html():
+    renderer = DigestRenderer(STOCK_DATA)
+
+    assert '&lt;b&gt;eve&lt;/b&gt;' in renderer.render_html('<b>eve</b>')
+
+
+def test_digest_renderer_renders_templates_once_per_run(monkeypatch):
+    renders = []
+    real_compiled_template = digest._compiled_template
+
+    class CountingTemplate:
+        def __init__(self, template):
+            self.template = template
+
+        def render(self, context):
+            renders.append(context)
+            return self.template.render(context)
+
+    monkeypatch.setattr(digest, '_compiled_template', lambda name: CountingTemplate(real_compiled_template(name)))
+
+    renderer = DigestRenderer(STOCK_DATA)
+    for i in range(50):
+        renderer.render_html(f'user{i}')
+        renderer.render_text(f'user{i}')
+
+    # one render per stock row plus one for the shared body
+    assert len(renders) == len(STOCK_DATA) + 1
+
+
+def test_digest_renderer_limits_rows_to_watchlist():
+    renderer = DigestRenderer(STOCK_DATA)
+
+    html = renderer.render_html('alice', ['MSFT'])
+    text = renderer.render_text('alice', ['MSFT'])
+
+    assert 'MSFT' in html and 'AAPL' not in html
+    assert 'MSFT' in text and 'AAPL' not in text
+
+
+@pytest.fixture
+def digest_users(db):
+    User = get_user_model()
+    stock = Stock.objects.create(ticker='AAPL', name='Apple Inc.')
+    users = [
+        User.objects.create_user(username=f'digest{i}', email=f'digest{i}@example.com', password='password')
+        for i in range(5)
+    ]
+    for user in users:
+        Alert.objects.create(user=user, stock=stock, alert_type='threshold', operator='gt', threshold=1)
+    Alert.objects.create(
+        user=User.objects.create_user(username='noemail', email='', password='password'),
+        stock=stock, alert_type='threshold', operator='gt', threshold=1,
+    )
+    User.objects.create_user(username='noalerts', email='noalerts@example.com', password='password')
+    return users
+
+
+@pytest.mark.django_db
+def test_send_price_digest_fans_out_id_range_chunks(monkeypatch, settings, digest_users):
+    settings.DIGEST_CHUNK_SIZE = 2
+    dispatched = []
+    monkeypatch.setattr(send_price_digest_chunk, 'apply_async', lambda args, kwargs: dispatched.append(args))
+
+    result = send_price_digest()
+
+    ids = [user.id for user in digest_users]
+    assert result['chunks'] == 3
+    assert [(args[1], args[2]) for args in dispatched] == [(ids[0], ids[1]), (ids[2], ids[3]), (ids[4], ids[4])]
+
+
+@pytest.mark.django_db
+def test_send_price_digest_chunk_resumes_after_checkpoint(mailoutbox, digest_users):
+    ids = [user.id for user in digest_users]
+    cache.set(_digest_checkpoint_key('run-1', ids[0]), ids[1])
+
+    result = send_price_digest_chunk('run-1', ids[0], ids[-1], [{'ticker': 'AAPL', 'price': '1.00'}], '2025-08-12T00:00:00+00:00')
+
+    assert result == {'emails_sent': 3, 'emails_failed': 0}
+    assert [mail.to for mail in mailoutbox] == [[user.email] for user in digest_users[2:]]
+    assert cache.get(_digest_checkpoint_key('run-1', ids[0])) == ids[-1]
+
+
+@pytest.mark.django_db
+def test_redelivered_digest_chunk_retries_users_whose_send_failed(mailoutbox, monkeypatch, digest_users):
+    from django.core.mail import EmailMultiAlternatives
+
+    ids = [user.id for user in digest_users]
+    args = ('run-2', ids[0], ids[-1], [{'ticker': 'AAPL', 'price': '1.00'}], '2025-08-12T00:00:00+00:00')
+    real_send = EmailMultiAlternatives.send
+
+    def flaky_send(message, *a, **kw):
+        if message.to == [digest_users[1].email]:
+            raise ConnectionError('SMTP dropped')
+        return real_send(message, *a, **kw)
+
+    monkeypatch.setattr(EmailMultiAlternatives, 'send', flaky_send)
+    assert send_price_digest_chunk(*args) == {'emails_sent': len(ids) - 1, 'emails_failed': 1}
+    assert cache.get(_digest_checkpoint_key('run-2', ids[0])) == ids[-1]
+
+    # the message is redelivered: only the user who missed out is sent to
+    monkeypatch.setattr(EmailMultiAlternatives, 'send', real_send)
+    mailoutbox.clear()
+    assert send_price_digest_chunk(*args) == {'emails_sent': 1, 'emails_failed': 0}
+    assert [mail.to for mail in mailoutbox] == [[digest_users[1].email]]
+
+
+@pytest.mark.django_db
+def test_send_price_digest_chunk_sends_each_user_their_watchlist(mailoutbox, django_assert_num_queries):
+    User = get_user_model()
+    aapl = Stock.objects.create(ticker='AAPL', name='Apple Inc.')
+    msft = Stock.objects.create(ticker='MSFT', name='Microsoft Corporation')
+    PriceSnapshot.objects.create(stock=aapl, price='190.12')
+    alice = User.objects.create_user(username='alice', email='alice@example.com', password='password')
+    bob = User.objects.create_user(username='bob', email='bob@example.com', password='password')
+    for stock in (aapl, msft):
+        Alert.objects.create(user=alice, stock=stock, alert_type='threshold', operator='gt', threshold=1)
+    Alert.objects.create(user=bob, stock=msft, alert_type='threshold', operator='lt', threshold=1)
+    Alert.objects.create(user=bob, stock=aapl, alert_type='threshold', operator='lt', threshold=1, is_active=False)
+
+    stock_data = [
+        {'ticker': ticker, 'price': f"{price:.2f}" if price is not None else 'N/A'}
+        for ticker, price in Stock.objects.with_latest_price().values_list('ticker', 'latest_price')
+    ]
+    assert stock_data == [{'ticker': 'AAPL', 'price': '190.12'}, {'ticker': 'MSFT', 'price': 'N/A'}]
+
+    with django_assert_num_queries(1):
+        send_price_digest_chunk('run-2', alice.id, bob.id, stock_data, '2025-08-12T00:00:00+00:00')
+
+    alice_mail, bob_mail = mailoutbox
+    assert 'AAPL' in alice_mail.body and 'MSFT' in alice_mail.body
+    assert 'MSFT' in bob_mail.body and 'AAPL' not in bob_mail.body
+
+
+@pytest.mark.django_db
+def test_stock_list_runs_constant_number_of_queries(django_assert_num_queries):
+    for i in range(5):
+        stock = Stock.objects.create(ticker=f'Q{i}', name=f'Query {i}')
+        PriceSnapshot.objects.create(stock=stock, price='10.00')
+        PriceSnapshot.objects.create(stock=stock, price=f'{20 + i}.50')
+    Stock.objects.create(ticker='NOSNAP', name='No Snapshots')
+
+    # one COUNT for pagination, one SELECT with the latest snapshot annotated
+    with django_assert_num_queries(2):
+        response = APIClient().get('/api/stocks/')
+
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert results[0]['latest_price_snapshot']['price'] == '20.50'
+    assert results[0]['latest_price_snapshot']['stock'] == results[0]['id']
+    assert results[-1]['latest_price_snapshot'] is None
+
+
+@pytest.mark.django_db
+def test_snapshot_feed_uses_cursor_pages_and_time_filters(django_assert_max_num_queries):
+    stock = Stock.objects.create(ticker='CUR', name='Cursor Inc.')
+    for minute in range(5):
+        with freeze_time(f"2025-08-12 00:0{minute}:00"):
+            PriceSnapshot.objects.create(stock=stock, price=f'{minute}.00')
+    client = APIClient()
+
+    with django_assert_max_num_queries(1):
+        page = client.get('/api/stocks/price_snapshots/', {'stock': stock.id, 'page_size': 2}).json()
+    assert 'count' not in page
+    assert [snap['price'] for snap in page['results']] == ['4.00', '3.00']
+
+    page = client.get(page['next']).json()
+    assert [snap['price'] for snap in page['results']] == ['2.00', '1.00']
+
+    page = client.get('/api/stocks/price_snapshots/', {
+        'since': '2025-08-12T00:01:00Z', 'until': '2025-08-12T00:03:00Z',
+    }).json()
+    assert [snap['price'] for snap in page['results']] == ['2.00', '1.00']
+
+    response = client.get('/api/stocks/price_snapshots/', {'since': 'yesterday'})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_stock_responses_are_cached_until_prices_change(django_assert_num_queries):
+    stock = Stock.objects.create(ticker='CCH', name='Cache Inc.')
+    PriceSnapshot.objects.create(stock=stock, price='10.00')
+    client = APIClient()
+
+    first = client.get(f'/api/stocks/{stock.id}/')
+    etag = first['ETag']
+    with django_assert_num_queries(0):
+        second = client.get(f'/api/stocks/{stock.id}/')
+        not_modified = client.get(f'/api/stocks/{stock.id}/', HTTP_IF_NONE_MATCH=etag)
+    assert second.content == first.content
+    assert not_modified.status_code == 304
+
+    assert client.post('/api/stocks/price_snapshots/', {'stock': stock.id, 'price': '11.00'}).status_code == 401
+    client.force_authenticate(get_user_model().objects.create_user(username='feed', password='x'))
+    client.post('/api/stocks/price_snapshots/', {'stock': stock.id, 'price': '11.00'})
+
+    fresh = client.get(f'/api/stocks/{stock.id}/', HTTP_IF_NONE_MATCH=etag)
+    assert fresh.status_code == 200
+    assert fresh.json()['latest_price_snapshot']['price'] == '11.00'
+    assert fresh['ETag'] != etag
+
+    # losing the version key must not bring back an older version's entries
+    cache.delete('resp-version:stocks')
+    after_eviction = client.get(f'/api/stocks/{stock.id}/')
+    assert after_eviction.json()['latest_price_snapshot']['price'] == '11.00'
+
+
+def test_lttb_keeps_endpoints_and_bounds_point_count():
+    start = datetime(2025, 8, 12, tzinfo=dt_timezone.utc)
+    points = [(start + timedelta(minutes=i), Decimal(i % 7)) for i in range(1000)]
+
+    sampled = lttb(points, 50)
+
+    assert len(sampled) == 50
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    assert [p[0] for p in sampled] == sorted(p[0] for p in sampled)
+
+
+@pytest.mark.django_db
+def test_record_snapshots_merges_out_of_order_prices_into_bars():
+    stock = Stock.objects.create(ticker='BAR', name='Bar Inc.')
+    at = datetime(2025, 8, 12, 10, 0, tzinfo=dt_timezone.utc)
+    record_snapshots([(stock.id, Decimal('10'), at + timedelta(minutes=30))])
+    record_snapshots([
+        (stock.id, Decimal('12'), at + timedelta(minutes=45)),
+        (stock.id, Decimal('8'), at + timedelta(minutes=5)),
+    ])
+
+    bar = PriceBar.objects.get(stock=stock, resolution=PriceBar.RESOLUTION_HOUR)
+    assert bar.bucket_start == at
+    assert (bar.open, bar.high, bar.low, bar.close, bar.count) == (8, 12, 8, 12, 3)
+    assert PriceBar.objects.get(stock=stock, resolution=PriceBar.RESOLUTION_DAY).count == 3
+
+
+@pytest.mark.django_db
+def test_series_downsamples_raw_snapshots_with_ohlc():
+    stock = Stock.objects.create(ticker='SER', name='Series Inc.')
+    for second, price in enumerate([5, 7, 6, 9, 8, 4, 3, 6, 2, 1]):
+        with freeze_time(datetime(2025, 8, 12, tzinfo=dt_timezone.utc) + timedelta(seconds=10 * second)):
+            PriceSnapshot.objects.create(stock=stock, price=price)
+
+    response = APIClient().get(f'/api/stocks/{stock.id}/series/', {
+        'since': '2025-08-12T00:00:00Z', 'until': '2025-08-12T00:01:40Z', 'points': 5,
+    })
+
+    body = response.json()
+    assert body['resolution'] == 'raw'
+    assert [(p['open'], p['high'], p['low'], p['close']) for p in body['points']] == [
+        (5.0, 7.0, 5.0, 7.0), (6.0, 9.0, 6.0, 9.0), (8.0, 8.0, 4.0, 4.0), (3.0, 6.0, 3.0, 6.0), (2.0, 2.0, 1.0, 1.0),
+    ]
+
+
+@pytest.mark.django_db
+def test_series_caps_raw_scans_and_reads_minute_bars(settings):
+    settings.SERIES_RAW_MAX_SECONDS = 3600
+    stock = Stock.objects.create(ticker='MIN', name='Minute Inc.')
+    start = datetime(2025, 8, 12, tzinfo=dt_timezone.utc)
+    record_snapshots([(stock.id, Decimal(10 + i % 3), start + timedelta(seconds=20 * i)) for i in range(90)])
+    client = APIClient()
+
+    minutes = client.get(f'/api/stocks/{stock.id}/series/', {
+        'since': '2025-08-12T00:00:00Z', 'until': '2025-08-12T00:30:00Z', 'points': 5,
+    }).json()
+    assert minutes['resolution'] == '5m'
+    assert len(minutes['points']) == 5
+
+    bars = client.get(f'/api/stocks/{stock.id}/series/', {
+        'since': '2025-08-12T00:00:00Z', 'until': '2025-08-12T00:30:00Z', 'points': 30,
+    }).json()
+    assert bars['resolution'] == '1m'
+    assert len(bars['points']) == 30
+    assert {(p['open'], p['high'], p['low'], p['close']) for p in bars['points']} == {(10, 12, 10, 12)}
+
+    response = client.get(f'/api/stocks/{stock.id}/series/', {
+        'since': '2025-08-12T00:00:00Z', 'until': '2025-08-12T02:00:00Z', 'points': 5000,
+    })
+    assert response.status_code == 400
+    assert 'points' in response.json()
+
+
+@pytest.mark.django_db
+def test_snapshot_edits_and_deletes_refresh_bars():
+    stock = Stock.objects.create(ticker='FIX', name='Fix Inc.')
+    at = datetime(2025, 8, 12, 10, 0, tzinfo=dt_timezone.utc)
+    low, high = (PriceSnapshot.objects.create(stock=stock, price=price, timestamp=at + timedelta(minutes=minute))
+                 for price, minute in (('5.00', 1), ('9.00', 2)))
+    record_snapshots([(stock.id, snap.price, snap.timestamp) for snap in (low, high)])
+    client = APIClient()
+    client.force_authenticate(get_user_model().objects.create_user(username='ops', password='x', is_staff=True))
+
+    client.put(f'/api/stocks/price_snapshots/{high.id}/', {'stock': stock.id, 'price': '7.00', 'timestamp': high.timestamp})
+    bar = PriceBar.objects.get(stock=stock, resolution=PriceBar.RESOLUTION_HOUR)
+    assert (bar.high, bar.close, bar.count) == (7, 7, 2)
+
+    client.delete(f'/api/stocks/price_snapshots/{low.id}/')
+    bar = PriceBar.objects.get(stock=stock, resolution=PriceBar.RESOLUTION_DAY)
+    assert (bar.open, bar.low, bar.count) == (7, 7, 1)
+
+
+@pytest.mark.django_db
+def test_series_reads_hourly_bars_for_long_ranges(django_assert_max_num_queries):
+    stock = Stock.objects.create(ticker='LNG', name='Long Inc.')
+    start = datetime(2025, 8, 1, tzinfo=dt_timezone.utc)
+    record_snapshots([
+        (stock.id, Decimal(100 + i % 10), start + timedelta(minutes=15 * i))
+        for i in range(4 * 24 * 3)
+    ])
+
+    with django_assert_max_num_queries(2):
+        response = APIClient().get(f'/api/stocks/{stock.id}/series/', {
+            'since': '2025-08-01T00:00:00Z', 'until': '2025-08-04T00:00:00Z', 'points': 10, 'method': 'lttb',
+        })
+
+    body = response.json()
+    assert body['resolution'] == '1h'
+    assert len(body['points']) == 10
+
+
+@pytest.mark.django_db
+def test_snapshot_export_streams_csv_and_gzipped_ndjson(django_assert_num_queries):
+    stock = Stock.objects.create(ticker='EXP', name='Export Co')
+    snapshots = [PriceSnapshot.objects.create(stock=stock, price=Decimal(p)) for p in ('1.50', '2.25', '3.00')]
+    client = APIClient()
+
+    with django_assert_num_queries(1):
+        response = client.get('/api/stocks/price_snapshots/export/')
+        body = b''.join(response.streaming_content).decode()
+    assert response['Content-Disposition'] == 'attachment; filename="price_snapshots.csv"'
+    lines = body.splitlines()
+    assert lines[0] == 'id,ticker,price,timestamp'
+    assert lines[1] == f"{snapshots[0].id},EXP,1.50,{snapshots[0].timestamp.isoformat()}"
+    assert len(lines) == 4
+
+    response = client.get('/api/stocks/price_snapshots/export/', {'output': 'ndjson', 'gzip': '1', 'stock': stock.id})
+    assert response['Content-Type'] == 'application/gzip'
+    rows = [json.loads(line) for line in gzip.decompress(b''.join(response.streaming_content)).splitlines()]
+    assert [row['price'] for row in rows] == ['1.50', '2.25', '3.00']
+    assert rows[-1]['ticker'] == 'EXP'
+
+    assert client.get('/api/stocks/price_snapshots/export/', {'output': 'xml'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_stock_list_sparse_fieldset_skips_latest_snapshot(django_assert_num_queries):
+    stock = Stock.objects.create(ticker='SPF', name='Sparse')
+    PriceSnapshot.objects.create(stock=stock, price=Decimal('4.20'))
+
+    with django_assert_num_queries(2) as captured:
+        response = APIClient().get('/api/stocks/', {'fields': 'id,ticker'})
+    assert response.json()['results'] == [{'id': stock.id, 'ticker': 'SPF'}]
+    assert 'pricesnapshot' not in captured.captured_queries[-1]['sql']
+    assert '"stocks_stock"."name"' not in captured.captured_queries[-1]['sql']
+
+    response = APIClient().get('/api/stocks/', {'fields': 'ticker,bogus'})
+    assert response.status_code == 400
+
+
+def test_orjson_renderer_matches_drf_encoding():
+    from rest_framework.renderers import JSONRenderer
+    from apps.common.renderers import ORJSONRenderer
+
+    data = {'price': Decimal('1.50'), 'at': datetime(2025, 1, 2, 3, 4, 5, 600000, tzinfo=dt_timezone.utc), 'name': 'café'}
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+@pytest.mark.django_db
+def test_bulk_ingest_requires_staff_or_ingest_token(settings):
+    settings.INGEST_TOKEN = 'feed-secret'
+    stock = Stock.objects.create(ticker='SEC', name='Secure')
+    records = [{'ticker': 'SEC', 'price': '1.00'}]
+    client = APIClient()
+
+    assert client.post('/api/stocks/price_snapshots/bulk/', records, format='json').status_code == 401
+    response = client.post('/api/stocks/price_snapshots/bulk/', records, format='json', HTTP_X_INGEST_TOKEN='wrong')
+    assert response.status_code == 401
+    client.force_authenticate(get_user_model().objects.create_user(username='plain', password='x'))
+    assert client.post('/api/stocks/price_snapshots/bulk/', records, format='json').status_code == 403
+    assert not PriceSnapshot.objects.filter(stock=stock).exists()
+
+
+@pytest.mark.django_db
+def test_bulk_ingest_writes_snapshots_and_queues_one_evaluation(monkeypatch, settings, django_capture_on_commit_callbacks, django_assert_max_num_queries):
+    from apps.alerts.tasks import evaluate_alerts_for_stocks
+
+    settings.INGEST_TOKEN = 'feed-secret'
+
+    queued = []
+    monkeypatch.setattr(evaluate_alerts_for_stocks, 'delay', lambda stock_ids, trace=None: queued.append(stock_ids))
+    first = Stock.objects.create(ticker='ING', name='Ingest')
+    second = Stock.objects.create(ticker='BLK', name='Bulk')
+    records = [
+        {'ticker': 'ing', 'price': '10.00', 'timestamp': '2025-08-12T10:00:00Z'},
+        {'ticker': 'BLK', 'price': '20.00', 'timestamp': '2025-08-12T10:00:00Z'},
+        {'ticker': 'NOPE', 'price': '1.00'},
+        {'ticker': 'ING', 'price': 'abc'},
+        {'ticker': 'ING', 'price': '12.00', 'timestamp': '2025-08-12T10:30:00Z'},
+    ]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = APIClient().post('/api/stocks/price_snapshots/bulk/', records, format='json', HTTP_X_INGEST_TOKEN='feed-secret')
+    assert response.status_code == 207
+    body = response.json()
+    assert (body['created'], body['stocks']) == (3, 2)
+    assert [error['index'] for error in body['errors']] == [2, 3]
+    assert queued == [sorted([first.id, second.id])]
+
+    snapshot = PriceSnapshot.objects.filter(stock=first).first()
+    assert (snapshot.price, snapshot.timestamp) == (Decimal('12.00'), datetime(2025, 8, 12, 10, 30, tzinfo=dt_timezone.utc))
+    bar = PriceBar.objects.get(stock=first, resolution=PriceBar.RESOLUTION_HOUR)
+    assert (bar.open, bar.close, bar.count) == (Decimal('10.00'), Decimal('12.00'), 2)
+
+    # tickers resolve from the cache: no stock lookup on the next batch
+    with django_assert_max_num_queries(8) as captured:  # incl. savepoints
+        APIClient().post('/api/stocks/price_snapshots/bulk/', records[:2], format='json', HTTP_X_INGEST_TOKEN='feed-secret')
+    assert not any('"stocks_stock"' in query['sql'] for query in captured.captured_queries)
+
+
+@pytest.mark.django_db
+def test_generate_synthetic_data_is_deterministic():
+    from django.core.management import call_command
+    from apps.stocks.synthetic import generate
+
+    call_command('generate_synthetic_data', users=5, stocks=3, alerts=20, history=50, seed=7, end='2025-01-01T00:00:00Z')
+    assert Stock.objects.count() == 3
+    assert PriceSnapshot.objects.count() == 150
+    assert Alert.objects.count() == 20
+    latest = PriceSnapshot.objects.filter(stock__ticker='AAPL').first()
+    assert latest.timestamp == datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+    first_run = list(PriceSnapshot.objects.order_by('id').values_list('stock__ticker', 'price', 'timestamp'))
+    first_alerts = list(Alert.objects.order_by('id').values_list('stock__ticker', 'operator', 'threshold'))
+    PriceSnapshot.objects.all().delete()
+    Alert.objects.all().delete()
+    generate(users=5, stocks=3, alerts=20, history=50, seed=7, end=datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+    assert list(PriceSnapshot.objects.order_by('id').values_list('stock__ticker', 'price', 'timestamp')) == first_run
+    assert list(Alert.objects.order_by('id').values_list('stock__ticker', 'operator', 'threshold')) == first_alerts
+
+    counts = generate(users=5, stocks=4, alerts=0, history=50, seed=7, end=datetime(2025, 1, 1, tzinfo=dt_timezone.utc))['counts']
+    assert (counts['users'], counts['stocks'], counts['snapshots']) == (0, 1, 50)
+    assert PriceSnapshot.objects.count() == 200
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_reports_fetch_and_evaluation(settings):
+    from prometheus_client import REGISTRY
+    from apps.stocks.tasks import fetch_stock_prices
+
+    settings.FMP_API_KEY = ''
+    settings.TWELVE_API_KEY = ''
+    stock = Stock.objects.create(ticker='MET', name='Metrics')
+    user = get_user_model().objects.create_user(username='metrics', password='pw')
+    Alert.objects.create(user=user, stock=stock, alert_type='threshold', operator='gt', threshold=Decimal('0.01'))
+    before = REGISTRY.get_sample_value('alerts_fired_per_tick_sum') or 0
+    written = REGISTRY.get_sample_value('snapshots_written_total', {'source': 'fetch'}) or 0
+
+    fetch_stock_prices.apply()
+    assert REGISTRY.get_sample_value('alerts_fired_per_tick_sum') == before + 1
+    assert REGISTRY.get_sample_value('snapshots_written_total', {'source': 'fetch'}) == written + 1
+
+    settings.METRICS_TOKEN = 'scrape'
+    response = APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer scrape')
+    assert response.status_code == 200
+    body = response.content.decode()
+    assert 'celery_task_duration_seconds_count{state="SUCCESS",task="apps.stocks.tasks.fetch_stock_prices"}' in body
+    assert 'snapshot_write_seconds_bucket' in body
+    assert APIClient().get('/metrics').status_code == 403
+
+    # without a token, metrics are only public in development
+    settings.METRICS_TOKEN = ''
+    assert APIClient().get('/metrics').status_code == 403
+    settings.DEBUG = True
+    assert APIClient().get('/metrics').status_code == 200
+
+
+def test_metrics_aggregate_every_container_directory(tmp_path):
+    import subprocess
+    import sys
+    from apps.common.metrics import ContainersCollector
+
+    # two containers whose processes share a PID number write to their own directories
+    script = (
+        "from prometheus_client import Counter, values; values.ValueClass = values.MultiProcessValue(lambda: 7)\n"
+        "Counter('deliveries', 'Deliveries.').inc(3)"
+    )
+    for container in ('web', 'worker'):
+        (tmp_path / container).mkdir()
+        subprocess.run([sys.executable, '-c', script], check=True, env={'PROMETHEUS_MULTIPROC_DIR': str(tmp_path / container)})
+
+    samples = {
+        sample.name: sample.value
+        for metric in ContainersCollector(str(tmp_path)).collect()
+        for sample in metric.samples
+    }
+    assert samples['deliveries_total'] == 6
+
+
+@pytest.mark.django_db
+def test_periodic_runs_skip_while_previous_run_holds_lease(monkeypatch, settings, digest_users):
+    from prometheus_client import REGISTRY
+    from apps.common.leases import Lease
+    from apps.stocks.tasks import fetch_stock_prices
+
+    def skipped(task):
+        return REGISTRY.get_sample_value('periodic_task_skipped_total', {'task': task.name}) or 0
+
+    held = Lease(fetch_stock_prices.name, 60)
+    assert held.acquire()
+    before = skipped(fetch_stock_prices)
+    assert fetch_stock_prices.apply(headers={'published_at': time.time() - 5}).get() == {'skipped': 'already running'}
+    assert skipped(fetch_stock_prices) == before + 1
+    assert REGISTRY.get_sample_value('periodic_task_lag_seconds_sum', {'task': fetch_stock_prices.name}) >= 5
+    held.release()
+    assert 'fetched' in fetch_stock_prices.apply().get()
+
+    # a digest run holds its lease until its last chunk is done
+    settings.DIGEST_CHUNK_SIZE = 3
+    dispatched = []
+    monkeypatch.setattr(send_price_digest_chunk, 'apply_async', lambda args, kwargs: dispatched.append((args, kwargs)))
+    assert send_price_digest()['chunks'] == 2
+    assert send_price_digest() == {'skipped': 'already running'}
+    for args, kwargs in dispatched:
+        send_price_digest_chunk(*args, **kwargs)
+    assert send_price_digest()['chunks'] == 2
+
+    # a redelivered chunk is counted once, and a failing chunk still counts
+    (first, first_kwargs), (second, second_kwargs) = dispatched[-2:]
+    send_price_digest_chunk(*first, **first_kwargs)
+    send_price_digest_chunk(*first, **first_kwargs)
+    assert send_price_digest() == {'skipped': 'already running'}
+    monkeypatch.setattr('apps.stocks.tasks._send_digest_chunk', lambda *args: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        send_price_digest_chunk(*second, **second_kwargs)
+    assert send_price_digest()['chunks'] == 2
@@ -5,6 +5,9 @@ from .views import StockViewSet, PriceSnapshotViewSet
 urlpatterns = [
     path('', StockViewSet.as_view({'get': 'list', 'post': 'create'}), name='stock-list'),
     path('<int:pk>/', StockViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='stock-detail'),
+    path('<int:pk>/series/', StockViewSet.as_view({'get': 'series'}), name='stock-series'),
     path('price_snapshots/', PriceSnapshotViewSet.as_view({'get': 'list', 'post': 'create'}), name='snapshot-list'),
+    path('price_snapshots/bulk/', PriceSnapshotViewSet.as_view({'post': 'bulk_ingest'}), name='snapshot-bulk'),
+    path('price_snapshots/export/', PriceSnapshotViewSet.as_view({'get': 'export'}), name='snapshot-export'),
     path('price_snapshots/<int:pk>/', PriceSnapshotViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='snapshot-detail'),
 ]
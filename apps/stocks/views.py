@@ -1,23 +1,222 @@
-from rest_framework import viewsets
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated,AllowAny
-from .models import Stock, PriceSnapshot
-from .serializers import StockSerializer, PriceSnapshotSerializer
+from rest_framework.response import Response
+from .models import Stock, PriceSnapshot, PriceBar
+from .serializers import StockSerializer, PriceSnapshotSerializer, PriceIngestSerializer
+from .ingest import forget_tickers, ingest_prices
+from .downsampling import lttb, ohlc
+from .rollups import record_snapshots, refresh_bars
+from apps.common.export import export_response
+from apps.alerts.tasks import evaluate_alerts_for_stocks
+from apps.common.cache import STOCKS_NAMESPACE, CachedResponseMixin, invalidate_stock_responses
+from apps.common.realtime import publish_price
+from apps.common.metrics import SNAPSHOT_WRITE, SNAPSHOTS_WRITTEN, timed
+from apps.common.tracing import PriceTrace
+from apps.common.fieldsets import SparseFieldsetViewMixin, requested_fields
+from apps.common.filters import filter_time_range, parse_datetime_param
+from apps.common.pagination import SnapshotCursorPagination
+from apps.common.permissions import IsStaffOrIngestService
 
 # Create your views here.
 
-class StockViewSet(viewsets.ModelViewSet):
+class StockViewSet(CachedResponseMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Stock.objects.all()
     serializer_class = StockSerializer
     permission_classes = [AllowAny]
+    cache_namespace = STOCKS_NAMESPACE
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        wanted = requested_fields(self.request)
+        if wanted is None or 'latest_price_snapshot' in wanted:
+            qs = qs.with_latest_snapshot()
+        return qs.order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def series(self, request, *args, **kwargs):
+        return self.cached_response(self._series, request, *args, **kwargs)
+
+    def _series(self, request, *args, **kwargs):
+        """
+        Price series for charting, downsampled on the server to at most
+        ``points`` points over [since, until) with OHLC bucketing (default)
+        or LTTB. Reads minute to daily bars when the bucket width allows it;
+        narrower buckets scan raw snapshots, so their range is capped at
+        SERIES_RAW_MAX_SECONDS.
+        """
+        stock = self.get_object()
+        until = parse_datetime_param(request, 'until') or timezone.now()
+        since = parse_datetime_param(request, 'since') or until - timedelta(days=1)
+        method = request.query_params.get('method', 'ohlc')
+        try:
+            points = int(request.query_params.get('points', settings.SERIES_DEFAULT_POINTS))
+        except ValueError:
+            raise ValidationError({'points': 'Must be an integer.'})
+        if not 3 <= points <= settings.SERIES_MAX_POINTS:
+            raise ValidationError({'points': f'Must be between 3 and {settings.SERIES_MAX_POINTS}.'})
+        if method not in ('ohlc', 'lttb'):
+            raise ValidationError({'method': 'Must be "ohlc" or "lttb".'})
+        if since >= until:
+            raise ValidationError({'since': 'Must be before until.'})
+
+        width = (until - since).total_seconds() / points
+        resolution = 'raw'
+        for name, seconds in sorted(PriceBar.RESOLUTION_SECONDS.items(), key=lambda item: -item[1]):
+            if seconds <= width:
+                resolution = name
+                break
+
+        if resolution == 'raw':
+            if (until - since).total_seconds() > settings.SERIES_RAW_MAX_SECONDS:
+                raise ValidationError({'points': (
+                    f'Buckets under {min(PriceBar.RESOLUTION_SECONDS.values())}s read raw snapshots, which is '
+                    f'limited to {settings.SERIES_RAW_MAX_SECONDS}s ranges; request fewer points or a shorter range.'
+                )})
+            rows = (
+                (timestamp, price, price, price, price)
+                for timestamp, price in PriceSnapshot.objects.filter(
+                    stock=stock, timestamp__gte=since, timestamp__lt=until
+                ).order_by('timestamp', 'id').values_list('timestamp', 'price').iterator()
+            )
+        else:
+            rows = PriceBar.objects.filter(
+                stock=stock, resolution=resolution, bucket_start__gte=since, bucket_start__lt=until
+            ).order_by('bucket_start').values_list('bucket_start', 'open', 'high', 'low', 'close').iterator()
+
+        if method == 'ohlc':
+            data = ohlc(rows, since, width)
+        else:
+            data = [
+                {'t': timestamp, 'price': close}
+                for timestamp, close in lttb([(row[0], row[4]) for row in rows], points)
+            ]
+        return Response({
+            'stock': stock.id,
+            'ticker': stock.ticker,
+            'since': since,
+            'until': until,
+            'resolution': resolution,
+            'method': method,
+            'points': data,
+        })
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        invalidate_stock_responses()
+
+    def perform_update(self, serializer):
+        old_ticker = serializer.instance.ticker
+        super().perform_update(serializer)
+        forget_tickers(old_ticker)
+        invalidate_stock_responses()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        forget_tickers(instance.ticker)
+        invalidate_stock_responses()
 
 class PriceSnapshotViewSet(viewsets.ModelViewSet):
     queryset = PriceSnapshot.objects.all()
     serializer_class = PriceSnapshotSerializer
     permission_classes = [AllowAny]
+    pagination_class = SnapshotCursorPagination
+
+    def get_permissions(self):
+        # writes feed alert evaluation (real emails and webhooks), bars and cached responses
+        if self.action == 'bulk_ingest':
+            return [IsStaffOrIngestService()]
+        if self.action not in ('list', 'retrieve', 'export'):
+            return [IsAuthenticated()]
+        return super().get_permissions()
 
     def get_queryset(self):
         qs = super().get_queryset()
         stock_id = self.request.query_params.get('stock')
         if stock_id:
             qs = qs.filter(stock_id=stock_id)
-        return qs
\ No newline at end of file
+        return filter_time_range(qs, self.request, 'timestamp')
+
+    def export(self, request, *args, **kwargs):
+        rows = self.get_queryset().order_by('timestamp', 'id').values_list(
+            'id', 'stock__ticker', 'price', 'timestamp',
+        )
+        return export_response(request, rows, ('id', 'ticker', 'price', 'timestamp'), 'price_snapshots')
+
+    # snapshot writes change the latest price embedded in stock responses
+    def perform_create(self, serializer):
+        trace = PriceTrace.start()
+        with timed(SNAPSHOT_WRITE, 'api'):
+            super().perform_create(serializer)
+        trace.written()
+        SNAPSHOTS_WRITTEN.labels('api').inc()
+        snapshot = serializer.instance
+        record_snapshots([(snapshot.stock_id, snapshot.price, snapshot.timestamp)])
+        invalidate_stock_responses()
+        publish_price(snapshot.stock.ticker, snapshot.price, snapshot.timestamp)
+        transaction.on_commit(lambda: evaluate_alerts_for_stocks.delay([snapshot.stock_id], trace=trace.as_dict()))
+
+    def bulk_ingest(self, request):
+        """
+        POST a list of ``{ticker, price, timestamp}`` records. Valid records
+        are stored together; invalid ones and unknown tickers are reported
+        by index.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'detail': 'Expected a non-empty list of items.'})
+        if len(items) > settings.SNAPSHOT_INGEST_MAX_ITEMS:
+            raise ValidationError({'detail': f'At most {settings.SNAPSHOT_INGEST_MAX_ITEMS} items per request.'})
+
+        rows = []
+        indexes = []
+        errors = []
+        for index, item in enumerate(items):
+            serializer = PriceIngestSerializer(data=item)
+            if serializer.is_valid():
+                data = serializer.validated_data
+                rows.append((data['ticker'], data['price'], data.get('timestamp')))
+                indexes.append(index)
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        created, unknown = ingest_prices(rows) if rows else ([], set())
+        errors += [
+            {'index': index, 'errors': {'ticker': [f'Unknown ticker "{row[0]}".']}}
+            for index, row in zip(indexes, rows)
+            if row[0] in unknown
+        ]
+        errors.sort(key=lambda error: error['index'])
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS if created else status.HTTP_400_BAD_REQUEST
+        return Response(
+            {'created': len(created), 'stocks': len({s.stock_id for s in created}), 'errors': errors},
+            status=response_status,
+        )
+
+    def perform_update(self, serializer):
+        old = serializer.instance.stock_id, serializer.instance.timestamp
+        with transaction.atomic():
+            super().perform_update(serializer)
+            snapshot = serializer.instance
+            refresh_bars(old[0], [old[1]])
+            if (snapshot.stock_id, snapshot.timestamp) != old:
+                refresh_bars(snapshot.stock_id, [snapshot.timestamp])
+        invalidate_stock_responses()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            super().perform_destroy(instance)
+            refresh_bars(instance.stock_id, [instance.timestamp])
+        invalidate_stock_responses()
\ No newline at end of file
@@ -0,0 +1,93 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+# Everything request handling reads from request.user. The password hash is
+# deliberately not cached: it is loaded on access (e.g. by the change
+# password endpoint) like any deferred field.
+CACHED_USER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser', 'last_login', 'date_joined',
+)
+
+# per-process copy in front of the shared cache: user_id -> (expires at, values)
+_local = {}
+
+
+def _field_names():
+    # Model.from_db() expects values in the model's field order
+    return tuple(
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.attname in CACHED_USER_FIELDS
+    )
+
+
+def _user_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def forget_user(user_id):
+    """Drop the cached copy of a user; called whenever the user row changes."""
+    _local.pop(user_id, None)
+    cache.delete(_user_key(user_id))
+
+
+def _cached_values(user_id):
+    now = time.monotonic()
+    entry = _local.get(user_id)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    values = cache.get(_user_key(user_id))
+    if values is None:
+        values = (
+            get_user_model().objects.filter(id=user_id)
+            .values_list(*_field_names())
+            .first()
+        )
+        if values is None:
+            return None
+        cache.set(_user_key(user_id), values, settings.AUTH_USER_CACHE_TIMEOUT)
+
+    if len(_local) >= settings.AUTH_USER_LOCAL_CACHE_SIZE:
+        _local.clear()
+    _local[user_id] = (now + settings.AUTH_USER_LOCAL_CACHE_TIMEOUT, values)
+    return values
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that builds ``request.user`` from a cached copy of the
+    user's fields instead of querying the user table on every request.
+
+    The copy lives in the shared cache for AUTH_USER_CACHE_TIMEOUT seconds
+    and in process memory for AUTH_USER_LOCAL_CACHE_TIMEOUT seconds. Saving
+    or deleting a user (password change, deactivation, admin edits) drops
+    the shared copy; other processes may keep serving their local copy for
+    at most AUTH_USER_LOCAL_CACHE_TIMEOUT seconds.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # needs the password hash on every request
+            return super().get_user(validated_token)
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError) as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        values = _cached_values(user_id)
+        if values is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        user = get_user_model().from_db(DEFAULT_DB_ALIAS, _field_names(), values)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
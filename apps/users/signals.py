@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    # imported here: authentication pulls in the REST framework stack, which
+    # worker processes (config.settings_worker) otherwise never load
+    from .authentication import forget_user
+
+    # password changes, deactivation and admin edits all go through save()
+    forget_user(instance.pk)
@@ -1,3 +1,77 @@
-from django.test import TestCase
+# apps/users/tests.py
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+
+@pytest.fixture
+def jwt_client(db):
+    user = get_user_model().objects.create_user(username='jwt', email='jwt@example.com', password='Old-pass-123')
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+    return client, user
+
+
+def test_jwt_user_is_served_from_cache(jwt_client, django_assert_num_queries):
+    client, user = jwt_client
+    client.get('/api/alerts/')
+
+    with django_assert_num_queries(1):  # the alert page only; no user lookup
+        response = client.get('/api/alerts/', {'fields': 'id'})
+    assert response.status_code == 200
+
+
+def test_deactivation_invalidates_cached_user(jwt_client):
+    client, user = jwt_client
+    assert client.get('/api/users/profile/me/').json()['email'] == 'jwt@example.com'
+
+    user.is_active = False
+    user.save()
+    assert client.get('/api/users/profile/me/').status_code == 401
+
+
+def test_change_password_with_cached_user(jwt_client):
+    client, user = jwt_client
+    client.get('/api/users/profile/me/')
+
+    response = client.post('/api/users/change-password/', {
+        'old_password': 'Old-pass-123',
+        'new_password': 'New-pass-456',
+        'new_password_confirm': 'New-pass-456',
+    }, format='json')
+    assert response.status_code == 200, response.json()
+    user.refresh_from_db()
+    assert user.check_password('New-pass-456')
+    assert user.email == 'jwt@example.com'
+
+
+def test_profile_update_keeps_a_deactivation_the_cache_has_not_seen(jwt_client):
+    client, user = jwt_client
+    client.get('/api/users/profile/me/')
+    # an admin deactivation the cached copy has not seen yet (no save signal)
+    get_user_model().objects.filter(id=user.id).update(is_active=False)
+
+    response = client.patch('/api/users/profile/me/', {'first_name': 'Jay'}, format='json')
+    assert response.status_code == 200, response.json()
+    user.refresh_from_db()
+    assert (user.first_name, user.is_active) == ('Jay', False)
+
+
+@pytest.mark.django_db
+def test_login_is_throttled_per_ip_with_retry_after(settings):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'auth_ip': '3/min'},
+    }
+    client = APIClient()
+    statuses = [
+        client.post('/api/users/login/', {'username': 'nobody', 'password': 'wrong'}, format='json').status_code
+        for _ in range(4)
+    ]
+    assert statuses == [401, 401, 401, 429]
+
+    response = client.post('/api/users/login/', {'username': 'nobody', 'password': 'wrong'}, format='json')
+    assert 0 < int(response['Retry-After']) <= 60
+    # other endpoint classes have their own budget
+    assert client.get('/api/stocks/').status_code == 200
@@ -1,6 +1,5 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenRefreshView
 from . import views
 
 # Create router for ViewSets
@@ -18,7 +17,7 @@ urlpatterns = [
     # ViewSet URLs
     path('', include(router.urls)),
     
-    # JWT Token refresh (using DRF SimpleJWT's built-in view)
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    # JWT Token refresh (DRF SimpleJWT's view, throttled as an auth endpoint)
+    path('token/refresh/', views.TokenRefreshView.as_view(), name='token_refresh'),
 ]
 
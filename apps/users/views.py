@@ -4,7 +4,7 @@ from django.shortcuts import get_object_or_404
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView as BaseTokenRefreshView
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiTypes
@@ -35,6 +35,7 @@ class UserRegistrationViewSet(viewsets.GenericViewSet):
     """
     serializer_class = UserRegistrationSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'auth'
     http_method_names = ['post']
     
     def create(self, request):
@@ -88,6 +89,7 @@ class UserLoginViewSet(viewsets.GenericViewSet):
     """
     serializer_class = UserLoginSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'auth'
     http_method_names = ['post']
     
     def create(self, request):
@@ -127,6 +129,10 @@ class UserLoginViewSet(viewsets.GenericViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class TokenRefreshView(BaseTokenRefreshView):
+    throttle_scope = 'auth'
+
+
 class UserLogoutViewSet(viewsets.GenericViewSet):
     """
     ViewSet for user logout (no blacklist)
@@ -164,8 +170,10 @@ class UserProfileViewSet(viewsets.GenericViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        # used by serializer.save() when calling .save() without passing instance
-        return self.request.user
+        # request.user may be a cached copy up to AUTH_USER_CACHE_TIMEOUT
+        # seconds old; saving it would write back stale is_active/is_staff
+        # flags, so writes go through a fresh row.
+        return get_object_or_404(User, id=self.request.user.id)
 
     @extend_schema(
         summary="Get user profile",
@@ -183,10 +191,10 @@ class UserProfileViewSet(viewsets.GenericViewSet):
         request=UserProfileSerializer,
         responses={200: UserProfileSerializer}
     )
-    @action(detail=False, methods=['patch'], url_path='me')
+    @me.mapping.patch
     def partial_update_me(self, request):
         serializer = self.get_serializer(
-            request.user,
+            self.get_object(),
             data=request.data,
             partial=True
         )
@@ -210,6 +218,7 @@ class ChangePasswordViewSet(viewsets.GenericViewSet):
     """
     serializer_class = ChangePasswordSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'auth'
     
     def create(self, request):
         serializer = self.get_serializer(data=request.data)
@@ -220,7 +229,8 @@ class ChangePasswordViewSet(viewsets.GenericViewSet):
             if user.check_password(serializer.validated_data['old_password']):
                 # Set new password
                 user.set_password(serializer.validated_data['new_password'])
-                user.save()
+                # request.user may be a stale cached copy; write only the hash
+                user.save(update_fields=['password'])
                 
                 return Response(
                     {'message': 'Password changed successfully'}, 
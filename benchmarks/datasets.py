@@ -0,0 +1,23 @@
+"""
+Dataset sizes for the benchmarks. Rows come from the seeded synthetic data
+generator (apps.stocks.synthetic), so the same size always produces the
+same data.
+"""
+from datetime import datetime, timezone
+
+from apps.stocks.synthetic import generate
+
+SIZES = {
+    'small': {'users': 1_000, 'tickers': 10, 'alerts': 1_000, 'history': 20},
+    'medium': {'users': 100_000, 'tickers': 1_000, 'alerts': 100_000, 'history': 20},
+    'large': {'users': 1_000_000, 'tickers': 10_000, 'alerts': 1_000_000, 'history': 20},
+}
+
+# history ends at a fixed time; only a baseline's own dataset is comparable
+END = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def build(users, tickers, alerts, history, seed=0):
+    """Create the dataset; returns the stock ids."""
+    result = generate(users=users, stocks=tickers, alerts=alerts, history=history, seed=seed, end=END)
+    return {'stocks': result['stocks']}
@@ -0,0 +1,188 @@
+"""
+Micro-benchmarks for the hot paths: alert evaluation, price ingest and the
+price digest.
+
+Each scenario runs against a synthetic dataset in a throwaway test
+database (SQLite by default; set DATABASE_URL to benchmark on PostgreSQL).
+Every run is rolled back, so repeats see identical data. Reported per
+scenario: best and median wall time, query count and peak Python memory.
+The last two come from one extra run under tracemalloc.
+
+    python -m benchmarks.run --size small
+    python -m benchmarks.run --size small --save        # write the baseline
+    python -m benchmarks.run --size small --compare     # exit 1 on regression
+
+Baselines live in benchmarks/baselines/<size>.json.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import override_settings, setup_test_environment  # noqa: E402
+
+from benchmarks import datasets  # noqa: E402
+
+BASELINE_DIR = Path(__file__).resolve().parent / 'baselines'
+METRICS = ('wall_seconds', 'queries', 'peak_memory_mb')
+# differences below these are noise, whatever the relative change
+ABSOLUTE_SLACK = {'wall_seconds': 0.005, 'queries': 0, 'peak_memory_mb': 0.5}
+
+
+@contextmanager
+def count_queries():
+    counter = {'queries': 0}
+
+    def wrapper(execute, sql, params, many, context):
+        counter['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield counter
+
+
+def _rolled_back(run):
+    with transaction.atomic():
+        run()
+        transaction.set_rollback(True)
+
+
+def measure(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _rolled_back(run)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    with count_queries() as counter:
+        _rolled_back(run)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'wall_seconds': round(min(timings), 4),
+        'median_seconds': round(statistics.median(timings), 4),
+        'queries': counter['queries'],
+        'peak_memory_mb': round(peak / 2 ** 20, 2),
+    }
+
+
+def scenarios(data, ticks, seed):
+    from apps.alerts.tasks import evaluate_alerts_for_stocks
+    from apps.stocks.ingest import ingest_prices
+    from apps.stocks.models import Stock
+    from apps.stocks.tasks import fetch_stock_prices, send_price_digest
+
+    tickers = list(Stock.objects.order_by('id').values_list('ticker', flat=True))
+    rng = random.Random(seed)
+    rows = [(ticker, f"{rng.uniform(10, 500):.2f}", None) for _ in range(ticks) for ticker in tickers]
+
+    def fetch():
+        random.seed(seed)  # fetch_stock_prices draws mock prices without an API key
+        fetch_stock_prices()
+
+    return {
+        'evaluate': lambda: evaluate_alerts_for_stocks(data['stocks']),
+        'ingest': lambda: ingest_prices(rows),
+        'fetch': fetch,
+        'digest': lambda: send_price_digest(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Metrics that grew by more than ``threshold`` (a fraction) over the baseline."""
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric in METRICS:
+            limit = base[metric] * (1 + threshold) + ABSOLUTE_SLACK[metric]
+            if metrics[metric] > limit:
+                regressions.append(f"{name}.{metric}: {metrics[metric]} > {base[metric]} (+{threshold:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', choices=datasets.SIZES, default='small')
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--tickers', type=int)
+    parser.add_argument('--alerts', type=int)
+    parser.add_argument('--scenario', action='append', help='run only these (repeatable)')
+    parser.add_argument('--ticks', type=int, default=10, help='ingest: prices per ticker')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', action='store_true', help='store results as the baseline')
+    parser.add_argument('--compare', action='store_true', help='fail when worse than the baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed regression, as a fraction')
+    args = parser.parse_args(argv)
+
+    params = dict(datasets.SIZES[args.size])
+    for key in ('users', 'tickers', 'alerts'):
+        if getattr(args, key):
+            params[key] = getattr(args, key)
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.dummy.EmailBackend',
+            REALTIME_ENABLED=False,
+            FMP_API_KEY='',
+            TWELVE_API_KEY='',
+            CELERY_TASK_ALWAYS_EAGER=True,
+        ):
+            from config.celery import app
+            app.conf.task_always_eager = True  # digest chunks run inline
+
+            start = time.perf_counter()
+            data = datasets.build(seed=args.seed, **params)
+            print(f"Built dataset {params} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+            results = {}
+            for name, run in scenarios(data, args.ticks, args.seed).items():
+                if args.scenario and name not in args.scenario:
+                    continue
+                results[name] = measure(run, args.repeat)
+                print(f"{name}: {results[name]}", file=sys.stderr)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    report = {'size': args.size, 'params': params, 'results': results}
+    print(json.dumps(report, indent=2))
+
+    baseline_path = BASELINE_DIR / f"{args.size}.json"
+    if args.save:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + '\n')
+        print(f"Saved baseline to {baseline_path}", file=sys.stderr)
+    if args.compare:
+        if not baseline_path.exists():
+            print(f"No baseline at {baseline_path}", file=sys.stderr)
+            return 1
+        baseline = json.loads(baseline_path.read_text())
+        if baseline['params'] != params:
+            print(f"Baseline was recorded with {baseline['params']}, not {params}", file=sys.stderr)
+            return 1
+        regressions = compare(results, baseline['results'], args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Worker startup report: boot time, peak RSS and heavy modules loaded.
+
+Each sample is a fresh interpreter that boots the way ``celery -A config
+worker`` does: configure Django, then import every task module. Compare
+the full web settings with the slim worker profile:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --settings config.settings_worker --repeat 10
+
+Times are best/median over ``--repeat`` cold starts; RSS is the largest
+resident set seen (Linux reports it in KiB).
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+DEFAULT_SETTINGS = ('config.settings', 'config.settings_worker')
+# modules a worker has no use for at boot (Django itself always loads mail and
+# templates, via logging and forms)
+WATCHED = (
+    'rest_framework', 'rest_framework_simplejwt', 'drf_spectacular', 'drf_spectacular_sidecar',
+    'corsheaders', 'django.contrib.admin', 'django.contrib.messages', 'django.contrib.staticfiles',
+    'httpx', 'redis',
+)
+
+
+def _boot():
+    """Boot a worker in this process and print its measurements as JSON."""
+    start = time.perf_counter()
+    import django
+    from config.celery import app
+
+    django.setup()
+    app.loader.import_default_modules()  # the task modules, like a worker at startup
+    seconds = time.perf_counter() - start
+    print(json.dumps({
+        'seconds': seconds,
+        'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'modules': len(sys.modules),
+        'tasks': len([name for name in app.tasks if not name.startswith('celery.')]),
+        'loaded': [name for name in WATCHED if name in sys.modules],
+    }))
+
+
+def sample(settings_module):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.startup', '--child'],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(settings_module, repeat):
+    samples = [sample(settings_module) for _ in range(repeat)]
+    times = [s['seconds'] for s in samples]
+    return {
+        'settings': settings_module,
+        'best_seconds': min(times),
+        'median_seconds': statistics.median(times),
+        'rss_mb': max(s['rss_mb'] for s in samples),
+        'modules': samples[-1]['modules'],
+        'tasks': samples[-1]['tasks'],
+        'loaded': samples[-1]['loaded'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', action='append', help='settings modules to compare (repeatable)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='print the raw results')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        return _boot()
+
+    results = [report(name, args.repeat) for name in args.settings or DEFAULT_SETTINGS]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'settings':<26} {'best s':>8} {'median s':>9} {'RSS MB':>8} {'modules':>8} {'tasks':>6}  unneeded modules loaded")
+    for result in results:
+        print(
+            f"{result['settings']:<26} {result['best_seconds']:>8.3f} {result['median_seconds']:>9.3f} "
+            f"{result['rss_mb']:>8.1f} {result['modules']:>8} {result['tasks']:>6}  {', '.join(result['loaded']) or '-'}"
+        )
+
+
+if __name__ == '__main__':
+    main()
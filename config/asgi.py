@@ -2,6 +2,9 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The real-time stream (/api/stream/) is only routed here (config.urls_asgi),
+e.g. ``uvicorn config.asgi:application``; under WSGI a stream would hold a
+worker for as long as the client stays connected.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -12,5 +15,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('ROOT_URLCONF', 'config.urls_asgi')
 
 application = get_asgi_application()
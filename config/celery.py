@@ -1,5 +1,7 @@
 import os 
+import time
 from celery import Celery
+from celery.signals import before_task_publish
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
@@ -8,4 +10,11 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
 # استخدام Django Database Scheduler
-app.conf.beat_scheduler = 'django_celery_beat.schedulers:DatabaseScheduler'
\ No newline at end of file
+app.conf.beat_scheduler = 'django_celery_beat.schedulers:DatabaseScheduler'
+
+
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    # lets workers measure schedule lag (see apps.common.leases.record_schedule_lag)
+    if headers is not None:
+        headers.setdefault('published_at', time.time())
@@ -0,0 +1,10 @@
+"""Gunicorn settings: gunicorn config.wsgi:application -c config/gunicorn.py"""
+import os
+
+
+def child_exit(server, worker):
+    # drop the exited worker's live gauges from the multiprocess metrics directory
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
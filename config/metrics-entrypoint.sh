@@ -0,0 +1,10 @@
+#!/bin/sh
+# Container entrypoint: start with an empty PROMETHEUS_MULTIPROC_DIR (files
+# left by a previous run of this container would be merged into its metrics,
+# and PIDs get reused), then run the command.
+set -e
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+    rm -f "$PROMETHEUS_MULTIPROC_DIR"/*.db
+fi
+exec "$@"
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.common.profiling.QueryProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -48,7 +49,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'config.urls'
+# config/asgi.py switches to config.urls_asgi, which adds the SSE stream
+ROOT_URLCONF = env('ROOT_URLCONF', default='config.urls')
 
 # TEMPLATES configuration - KEEP THIS ONE, REMOVE THE DUPLICATE
 TEMPLATES = [
@@ -106,11 +108,19 @@ REDIS_URL = env('REDIS_URL', default='redis://redis:6379/0')
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
 
+# Cache: in-process by default, point CACHE_URL at Redis (e.g. redis://redis:6379/1) in deployments
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://')
+}
+# Cached API responses are versioned and invalidated on writes; this only bounds memory
+RESPONSE_CACHE_TIMEOUT = env.int('RESPONSE_CACHE_TIMEOUT', default=300)
+
 # REST framework + JWT
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        # API clients send a JWT; resolve it first, without a user query
+        'apps.users.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -118,10 +128,23 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
-    'rest_framework.renderers.JSONRenderer',
-    'rest_framework.renderers.BrowsableAPIRenderer',
+        'apps.common.renderers.ORJSONRenderer',
+        # the browsable API is a development aid only
+        *(['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # budgets per endpoint class, counted per client IP and per user (apps.common.throttling)
+    'DEFAULT_THROTTLE_CLASSES': ['apps.common.throttling.EndpointClassThrottle'],
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': env('THROTTLE_AUTH_IP', default='20/min'),
+        'auth_user': env('THROTTLE_AUTH_USER', default='10/min'),
+        'read_ip': env('THROTTLE_READ_IP', default='1200/min'),
+        'read_user': env('THROTTLE_READ_USER', default='600/min'),
+        'write_ip': env('THROTTLE_WRITE_IP', default='240/min'),
+        'write_user': env('THROTTLE_WRITE_USER', default='120/min'),
+        'bulk_ip': env('THROTTLE_BULK_IP', default='20/min'),
+        'bulk_user': env('THROTTLE_BULK_USER', default='10/min'),
+    },
 }
 
 # DRF Spectacular Configuration
@@ -187,6 +210,11 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
 }
 
+# CachedJWTAuthentication: how long resolved users are reused
+AUTH_USER_CACHE_TIMEOUT = 60  # shared cache, invalidated when the user is saved
+AUTH_USER_LOCAL_CACHE_TIMEOUT = 5  # per process; bounds staleness in other processes
+AUTH_USER_LOCAL_CACHE_SIZE = 10000
+
 # Email settings (for SMTP)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = env('EMAIL_HOST', default='smtp.gmail.com')
@@ -198,6 +226,100 @@ DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='moradyousef954@gmail.com
 
 AUTH_USER_MODEL = 'users.User'
 
+# Downsampled price series (api/stocks/<pk>/series/)
+SERIES_DEFAULT_POINTS = 500
+SERIES_MAX_POINTS = 5000
+# buckets under a minute read raw snapshots; bound the range they may scan
+SERIES_RAW_MAX_SECONDS = env.int('SERIES_RAW_MAX_SECONDS', default=6 * 60 * 60)
+
+# Max items per request to api/alerts/bulk/
+ALERTS_BULK_MAX_ITEMS = env.int('ALERTS_BULK_MAX_ITEMS', default=10000)
+
+# Notification outbox dispatcher
+NOTIFICATION_OUTBOX_BATCH_SIZE = env.int('NOTIFICATION_OUTBOX_BATCH_SIZE', default=100)
+NOTIFICATION_LEASE_SECONDS = 300  # a claimed row is retried if not finished within this
+NOTIFICATION_MAX_ATTEMPTS = 8
+NOTIFICATION_RETRY_BASE_SECONDS = 30
+NOTIFICATION_RETRY_MAX_SECONDS = 60 * 60
+# Non-urgent notifications for a user are held this long and sent as one message (0 disables)
+NOTIFICATION_COALESCE_SECONDS = env.int('NOTIFICATION_COALESCE_SECONDS', default=60)
+
+# Webhook notification channel
+WEBHOOK_BATCH_SIZE = 50  # trigger events per POST
+WEBHOOK_MAX_CONNECTIONS = 100  # pooled connections across all endpoints
+WEBHOOK_TIMEOUT_SECONDS = 10
+# endpoints must be https and resolve to public addresses; relax only for local development
+WEBHOOK_REQUIRE_HTTPS = env.bool('WEBHOOK_REQUIRE_HTTPS', default=True)
+WEBHOOK_ALLOW_PRIVATE_ADDRESSES = env.bool('WEBHOOK_ALLOW_PRIVATE_ADDRESSES', default=False)
+
+# Bulk price ingest (POST /api/stocks/price_snapshots/bulk/)
+SNAPSHOT_INGEST_MAX_ITEMS = env.int('SNAPSHOT_INGEST_MAX_ITEMS', default=10000)
+INGEST_TOKEN = env('INGEST_TOKEN', default='')  # price feeds send "X-Ingest-Token: <token>"; staff need none
+SNAPSHOT_INGEST_BATCH_SIZE = 1000  # rows per INSERT
+STOCK_TICKER_CACHE_TIMEOUT = 60 * 60  # ticker -> stock id map
+
+# Streaming CSV/NDJSON exports
+EXPORT_ITERATOR_CHUNK_SIZE = 2000  # rows fetched per round trip
+EXPORT_CHUNK_BYTES = 64 * 1024  # response body is written in chunks of about this size
+
+# Real-time push (/api/stream/): prices and triggers fanned out over Redis pub/sub
+REALTIME_ENABLED = env.bool('REALTIME_ENABLED', default=True)
+REALTIME_HEARTBEAT_SECONDS = 15
+REALTIME_QUEUE_SIZE = 100  # buffered events per client before the oldest are dropped
+REALTIME_MAX_TICKERS = 50
+REALTIME_RETRY_SECONDS = 30  # publishing pauses this long after Redis is unreachable
+
+# Prometheus /metrics; set PROMETHEUS_MULTIPROC_DIR in the environment to aggregate across processes
+# scrapes must send "Authorization: Bearer <token>"; without a token /metrics is only served with DEBUG on
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+# parent of the per-container PROMETHEUS_MULTIPROC_DIRs; /metrics aggregates all of them
+PROMETHEUS_MULTIPROC_ROOT = env('PROMETHEUS_MULTIPROC_ROOT', default='')
+
+# Query budgets (see apps.common.profiling): max queries per request, keyed by
+# URL name or "<METHOD> <URL name>", or per task run, keyed by task name
+QUERY_PROFILING_ENABLED = env.bool('QUERY_PROFILING_ENABLED', default=True)
+QUERY_BUDGETS = {
+    'alert-list': 3,
+    'alert-detail': 3,
+    'alert-trigger-list': 3,
+    'POST alert-bulk': 6,
+    'stock-list': 3,
+    'GET snapshot-list': 3,
+    'POST snapshot-list': 8,
+    'snapshot-bulk': 10,
+    # these scale with the number of stocks and alerts
+    'apps.stocks.tasks.fetch_stock_prices': 1000,
+    'apps.alerts.tasks.evaluate_alerts_for_stocks': 1000,
+}
+QUERY_BUDGET_DEFAULT = 50
+# total database time (ms) per request or task run, keyed like QUERY_BUDGETS
+QUERY_TIME_BUDGETS = {
+    'apps.stocks.tasks.fetch_stock_prices': 10000,
+    'apps.alerts.tasks.evaluate_alerts_for_stocks': 5000,
+    'apps.stocks.tasks.send_price_digest': 5000,
+    'apps.stocks.tasks.send_price_digest_chunk': 5000,
+}
+QUERY_TIME_BUDGET_MS = 500
+SLOW_QUERY_MS = 100
+QUERY_PROFILE_SLOWEST = 5  # statements listed when a budget is exceeded
+
+# GET /api/alerts/triggers/latency/ reports over this many hours unless ?since= is given
+TRACE_REPORT_DEFAULT_HOURS = 24
+
+# Price digest: the HTML body template must output {{ username }} and {{ rows }} unfiltered
+DIGEST_HTML_TEMPLATE = env('DIGEST_HTML_TEMPLATE', default='stocks/digest/body.html')
+DIGEST_QUEUE = 'digest'
+DIGEST_CHUNK_SIZE = env.int('DIGEST_CHUNK_SIZE', default=500)  # users per chunk subtask
+DIGEST_ITERATOR_CHUNK_SIZE = 200  # rows fetched per round trip inside a chunk
+DIGEST_CHECKPOINT_TTL = 60 * 60 * 24
+# a digest run's lease: heartbeated by its running chunks, released by the last;
+# it outlives a dead run by at most this long
+DIGEST_LEASE_SECONDS = 5 * 60
+
+# Beat-driven tasks take a single-flight lease (apps.common.leases), extended
+# by a heartbeat while they run; a run that finds it taken is skipped
+PERIODIC_TASK_LEASE_SECONDS = 60
+
 # Celery configuration
 from celery.schedules import crontab
 
@@ -205,6 +327,13 @@ from celery.schedules import crontab
 CELERY_TIMEZONE = 'Africa/Cairo'
 CELERY_ENABLE_UTC = False
 
+# task signal handlers: run time metrics and query budgets
+CELERY_IMPORTS = ('apps.common.metrics', 'apps.common.profiling')
+
+CELERY_TASK_ROUTES = {
+    'apps.stocks.tasks.send_price_digest_chunk': {'queue': DIGEST_QUEUE},
+}
+
 CELERY_BEAT_SCHEDULE = {
     'fetch-stock-prices-every-minute': {
         'task': 'apps.stocks.tasks.fetch_stock_prices',
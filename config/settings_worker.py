@@ -0,0 +1,27 @@
+"""
+Settings for Celery workers and beat: the web settings minus everything
+only HTTP requests use (admin, API docs, CORS, the REST framework stack,
+middleware), so worker processes boot faster and hold less memory.
+
+    DJANGO_SETTINGS_MODULE=config.settings_worker celery -A config worker
+
+Compare boot time and RSS with ``python -m benchmarks.startup``.
+"""
+from config.settings import *  # noqa: F401,F403
+from config.settings import INSTALLED_APPS
+
+WEB_ONLY_APPS = {
+    'django.contrib.admin',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'django.contrib.sessions',
+    'rest_framework',
+    'rest_framework_simplejwt',
+    'drf_spectacular',
+    'drf_spectacular_sidecar',
+    'corsheaders',
+}
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in WEB_ONLY_APPS]
+MIDDLEWARE = []
+ROOT_URLCONF = None
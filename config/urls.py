@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
+from apps.common.metrics import metrics_view
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 
 urlpatterns = [
@@ -25,6 +26,8 @@ urlpatterns = [
     path('api/stocks/', include('apps.stocks.urls')),
     path('api/users/', include('apps.users.urls')),
     path('api/users/', include('apps.users.urls')),
+    # the SSE stream (api/stream/) is only routed by the ASGI app, see config/urls_asgi.py
+    path('metrics', metrics_view, name='metrics'),
 
     # Swagger/OpenAPI
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
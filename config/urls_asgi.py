@@ -0,0 +1,14 @@
+"""
+URL configuration for the ASGI app (config/asgi.py): everything in
+config.urls plus the long-lived SSE stream, which only ASGI can serve
+without tying up a worker per connection.
+"""
+from django.urls import path
+
+from apps.common.realtime import event_stream
+from config.urls import urlpatterns as base_urlpatterns
+
+urlpatterns = [
+    path('api/stream/', event_stream, name='event-stream'),
+    *base_urlpatterns,
+]
@@ -0,0 +1,16 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # the locmem cache outlives each test's database rollback
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def disable_realtime(settings):
+    # no Redis in the test environment; tests that care patch the publisher
+    settings.REALTIME_ENABLED = False
@@ -0,0 +1,160 @@
+"""
+Load-test harness for a running server.
+
+    gunicorn config.wsgi:application --workers 4 --bind 127.0.0.1:8000
+    python manage.py generate_synthetic_data --users 1000 --seed 1   # login credentials
+    python -m loadtest.run --scenario dashboard --users 50 --iterations 200
+
+Each virtual user runs its scenario ``--iterations`` times (or for
+``--duration`` seconds) with a per-user RNG derived from ``--seed``, so a
+fixed-iteration run sends the same request sequence every time. The report
+gives p50/p95/p99 latency, throughput and error rate per endpoint; write it
+with ``--output`` to compare runs before and after a change. Raise the
+THROTTLE_* rates on the server first, or 429s will count as errors.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from loadtest.scenarios import SCENARIOS
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, label, seconds, status):
+        self.latencies[label].append(seconds)
+        self.statuses[label][status] += 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        for label, latencies in sorted(self.latencies.items()):
+            statuses = self.statuses[label]
+            errors = sum(count for status, count in statuses.items() if status == 'error' or status >= 400)
+            endpoints[label] = {
+                'requests': len(latencies),
+                'throughput_rps': round(len(latencies) / elapsed, 1),
+                'error_rate': round(errors / len(latencies), 4),
+                'p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+                'p95_ms': round(_percentile(latencies, 95) * 1000, 1),
+                'p99_ms': round(_percentile(latencies, 99) * 1000, 1),
+                'max_ms': round(max(latencies) * 1000, 1),
+                'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            'elapsed_seconds': round(elapsed, 2),
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 1) if elapsed else 0,
+            'endpoints': endpoints,
+        }
+
+
+def _percentile(values, percent):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
+
+
+class VirtualUser:
+    def __init__(self, index, client, recorder, seed, username, password):
+        self.index = index
+        self.client = client
+        self.recorder = recorder
+        self.rng = random.Random(seed * 1_000_003 + index)
+        self.username = username
+        self.password = password
+        self.token = None
+        self.etag = None
+        self.stock_ids = None
+
+    async def request(self, method, url, label=None, headers=None, **kwargs):
+        """Send and record one request; returns None when it failed to complete."""
+        label = label or f"{method} {url}"
+        headers = dict(headers or {})
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(label, time.perf_counter() - start, 'error')
+            return None
+        self.recorder.record(label, time.perf_counter() - start, response.status_code)
+        return response
+
+
+async def _run_user(user, scenario, iterations, deadline, think_time):
+    done = 0
+    while (iterations is None or done < iterations) and (deadline is None or time.monotonic() < deadline):
+        await scenario(user)
+        done += 1
+        if think_time:
+            await asyncio.sleep(user.rng.uniform(0, 2 * think_time))
+
+
+async def run(args):
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    deadline = time.monotonic() + args.duration if args.duration else None
+    iterations = None if args.duration else args.iterations
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        users = [
+            VirtualUser(i, client, recorder, args.seed, f"{args.username_prefix}{i % args.accounts}", args.password)
+            for i in range(args.users)
+        ]
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _run_user(user, SCENARIOS[args.scenario], iterations, deadline, args.think_time) for user in users
+        ))
+        elapsed = time.perf_counter() - start
+    return recorder.report(elapsed)
+
+
+def _print_table(report, out):
+    print(f"{'endpoint':<40} {'reqs':>7} {'rps':>8} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}", file=out)
+    for label, stats in report['endpoints'].items():
+        print(
+            f"{label:<40} {stats['requests']:>7} {stats['throughput_rps']:>8} {stats['error_rate'] * 100:>5.1f}% "
+            f"{stats['p50_ms']:>7}ms {stats['p95_ms']:>7}ms {stats['p99_ms']:>7}ms",
+            file=out,
+        )
+    print(f"total: {report['requests']} requests in {report['elapsed_seconds']}s ({report['throughput_rps']} rps)", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--scenario', choices=SCENARIOS, required=True)
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--iterations', type=int, default=50, help='scenario runs per virtual user')
+    parser.add_argument('--duration', type=float, help='run for this many seconds instead of --iterations')
+    parser.add_argument('--think-time', type=float, default=0.0, help='mean pause between iterations, seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--accounts', type=int, default=1000, help='distinct accounts to log in with')
+    parser.add_argument('--username-prefix', default='synthetic')
+    parser.add_argument('--password', default='password123')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--output', help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    report = {'config': {k: v for k, v in vars(args).items() if k != 'password'}, **report}
+    _print_table(report, sys.stdout)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
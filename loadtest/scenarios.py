@@ -0,0 +1,83 @@
+"""
+Load test scenarios. Each one is a coroutine run by every virtual user:
+``scenario(user)`` where ``user`` is a ``VirtualUser`` with its own
+seeded RNG, HTTP client and (after ``login``) JWT.
+"""
+
+
+async def login(user):
+    response = await user.request(
+        'POST', '/api/users/login/',
+        json={'username': user.username, 'password': user.password},
+    )
+    if response is not None and response.status_code == 200:
+        user.token = response.json()['tokens']['access']
+    return user.token
+
+
+async def _stock_ids(user):
+    if user.stock_ids is None:
+        response = await user.request('GET', '/api/stocks/', label='GET /api/stocks/ (setup)', params={'fields': 'id'})
+        user.stock_ids = [row['id'] for row in response.json()['results']] if response is not None and response.status_code == 200 else []
+    return user.stock_ids
+
+
+async def dashboard(user):
+    """Poll the stock list like an open dashboard, revalidating with the ETag."""
+    headers = {'If-None-Match': user.etag} if user.etag else {}
+    response = await user.request('GET', '/api/stocks/', headers=headers)
+    if response is not None and 'ETag' in response.headers:
+        user.etag = response.headers['ETag']
+
+
+async def alert_crud(user):
+    """Create, read, update, list and delete one alert."""
+    if not user.token and not await login(user):
+        return
+    stock_ids = await _stock_ids(user)
+    if not stock_ids:
+        return
+    payload = {
+        'stock': user.rng.choice(stock_ids),
+        'name': 'loadtest',
+        'alert_type': 'threshold',
+        'operator': user.rng.choice(('gt', 'lt')),
+        'threshold': f"{user.rng.uniform(10, 500):.2f}",
+        'duration_minutes': 0,
+    }
+    response = await user.request('POST', '/api/alerts/', json=payload)
+    if response is None or response.status_code != 201:
+        return
+    alert_id = response.json()['id']
+    await user.request('GET', f'/api/alerts/{alert_id}/', label='GET /api/alerts/{id}/')
+    payload['threshold'] = f"{user.rng.uniform(10, 500):.2f}"
+    await user.request('PUT', f'/api/alerts/{alert_id}/', label='PUT /api/alerts/{id}/', json=payload)
+    await user.request('GET', '/api/alerts/', params={'fields': 'id,threshold'})
+    await user.request('DELETE', f'/api/alerts/{alert_id}/', label='DELETE /api/alerts/{id}/')
+
+
+async def trigger_paging(user, max_pages=5):
+    """Page through the trigger feed by following the cursor links."""
+    if not user.token and not await login(user):
+        return
+    url = '/api/alerts/triggers/'
+    for page in range(max_pages):
+        response = await user.request('GET', url, label='GET /api/alerts/triggers/' + (' (next)' if page else ''))
+        if response is None or response.status_code != 200:
+            return
+        url = response.json().get('next')
+        if not url:
+            return
+
+
+async def login_storm(user):
+    """Log in over and over; every login hashes a password."""
+    await login(user)
+
+
+SCENARIOS = {
+    'dashboard': dashboard,
+    'alerts': alert_crud,
+    'triggers': trigger_paging,
+    'login': login_storm,
+}